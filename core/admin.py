@@ -2,8 +2,26 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.contrib.auth.models import User
 
+from .models import OutboundEmail
+from .outbox import requeue_emails
+
 class CustomUserAdmin(UserAdmin):
     list_display = ('username', 'email', 'first_name', 'last_name', 'is_active', 'date_joined')
 
 admin.site.unregister(User)
 admin.site.register(User, CustomUserAdmin)
+
+
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'from_email', 'status', 'attempts', 'run_after', 'sent_at')
+    list_filter = ('status',)
+    search_fields = ('subject', 'recipients')
+    readonly_fields = ('attempts', 'last_error', 'started_at', 'sent_at', 'date_created')
+    actions = ['requeue']
+
+    @admin.action(description='Re-enqueue selected emails')
+    def requeue(self, request, queryset):
+        requeued = requeue_emails(queryset)
+        self.message_user(request, f'Re-enqueued {requeued} emails.')
+
+admin.site.register(OutboundEmail, OutboundEmailAdmin)
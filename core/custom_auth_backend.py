@@ -1,17 +1,49 @@
+from functools import lru_cache
+
 from django.contrib.auth.backends import ModelBackend
 from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import check_password, get_hasher, make_password
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.db.models.functions import Lower
+from django.utils.crypto import get_random_string
+
+
+@lru_cache
+def dummy_password(algorithm):
+    return make_password(get_random_string(32), hasher=algorithm)
+
 
 class CustomAuthenticationBackend(ModelBackend):
-    def authenticate(self, request, username=None, password=None, **kwargs):
+    # Log in with an email (any case) or a username, in a single query.
+    # An email match wins over a username match; duplicate emails resolve
+    # to the oldest account.
+    def get_user_by_identifier(self, identifier):
         User = get_user_model()
-        try:
-            user = User.objects.get(email=username)
-        except User.DoesNotExist:
-            try:
-                user = User.objects.get(username=username)
-            except User.DoesNotExist:
-                return None
+        return (
+            User._default_manager.alias(email_lower=Lower('email'))
+            .filter(Q(email_lower=identifier.lower()) | Q(username=identifier))
+            .annotate(
+                email_match=Case(
+                    When(email_lower=identifier.lower(), then=Value(0)),
+                    default=Value(1),
+                    output_field=IntegerField(),
+                )
+            )
+            .order_by('email_match', 'pk')
+            .first()
+        )
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(get_user_model().USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        user = self.get_user_by_identifier(username)
+        if user is None:
+            # Check a dummy hash made with the default hasher so unknown
+            # accounts take as long as a wrong password for a current one
+            check_password(password, dummy_password(get_hasher().algorithm))
+            return None
         if user.check_password(password):
             return user
         return None
-    
\ No newline at end of file
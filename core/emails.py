@@ -0,0 +1,26 @@
+from django.template.loader import get_template
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from .tokens import account_activation_token
+
+
+NOREPLY_EMAIL = 'allforms@limited.com'
+ACTIVATION_EMAIL_SUBJECT = 'Activate your account.'
+ACTIVATION_EMAIL_TEMPLATE = 'core/acct_active_email.html'
+
+
+def activation_email_context(user, domain, protocol):
+    return {
+        'user': user,
+        'domain': domain,
+        'uid': urlsafe_base64_encode(force_bytes(user.pk)),
+        'token': account_activation_token.make_token(user),
+        'protocol': protocol,
+    }
+
+
+def render_activation_email(user, domain, protocol, template=None):
+    # Pass a template from get_template() to reuse it across many emails
+    template = template or get_template(ACTIVATION_EMAIL_TEMPLATE)
+    return template.render(activation_email_context(user, domain, protocol))
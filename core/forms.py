@@ -1,6 +1,9 @@
 from django import forms
-from django.contrib.auth.forms import AuthenticationForm, UserCreationForm
+from django.contrib.auth.forms import AuthenticationForm, PasswordResetForm, UserCreationForm
 from django.contrib.auth.models import User
+from django.template import loader
+
+from .outbox import enqueue_email
 
 
 # SIGNUP FORM
@@ -30,3 +33,15 @@ class LoginForm(AuthenticationForm):
 
     password = forms.CharField(widget=forms.PasswordInput(
         attrs={'class': 'form-control', 'placeholder': 'Password'}))
+
+
+# PASSWORD RESET FORM
+class QueuedPasswordResetForm(PasswordResetForm):
+    # Queue the reset email for the send_queued_email worker instead of sending it inline
+    def send_mail(self, subject_template_name, email_template_name, context, from_email, to_email, html_email_template_name=None):
+        subject = ''.join(loader.render_to_string(subject_template_name, context).splitlines())
+        body = loader.render_to_string(email_template_name, context)
+        html_message = None
+        if html_email_template_name is not None:
+            html_message = loader.render_to_string(html_email_template_name, context)
+        enqueue_email(subject, body, from_email, [to_email], html_message=html_message)
@@ -0,0 +1,111 @@
+import time
+from dataclasses import dataclass, field
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import Lower
+from django.template.loader import get_template
+
+from .emails import (
+    ACTIVATION_EMAIL_SUBJECT,
+    ACTIVATION_EMAIL_TEMPLATE,
+    NOREPLY_EMAIL,
+    render_activation_email,
+)
+from .models import OutboundEmail
+
+
+@dataclass
+class InviteResult:
+    created: list = field(default_factory=list)
+    skipped: list = field(default_factory=list)
+    sent: int = 0
+    queued: int = 0
+    seconds: float = 0.0
+
+    @property
+    def per_second(self):
+        return len(self.created) / self.seconds if self.seconds else 0.0
+
+
+def invite_users(rows, domain, protocol='https', queue=False, batch_size=100):
+    # rows: dicts with email and optional username/first_name/last_name.
+    # Creates inactive users in one INSERT and mails their activation links,
+    # rendering one compiled template and sending over one connection.
+    started = time.perf_counter()
+    result = InviteResult()
+
+    rows = [
+        {**row, 'email': User.objects.normalize_email(row['email'].strip())}
+        for row in rows
+        if row.get('email')
+    ]
+    for row in rows:
+        row['username'] = (row.get('username') or row['email']).strip()
+
+    # Emails are compared case-insensitively, as the login backend does
+    taken_usernames = set()
+    taken_emails = set()
+    existing = User.objects.alias(email_lower=Lower('email')).filter(
+        Q(username__in={row['username'] for row in rows})
+        | Q(email_lower__in={row['email'].lower() for row in rows})
+    )
+    for username, email in existing.values_list('username', 'email'):
+        taken_usernames.add(username)
+        taken_emails.add(email.lower())
+
+    new_users = []
+    unusable_password = make_password(None)
+    for row in rows:
+        email = row['email'].lower()
+        if row['username'] in taken_usernames or email in taken_emails:
+            result.skipped.append(row['email'])
+            continue
+        # Later rows repeating an email or username in the batch are skipped too
+        taken_usernames.add(row['username'])
+        taken_emails.add(email)
+        new_users.append(
+            User(
+                username=row['username'],
+                email=row['email'],
+                first_name=row.get('first_name', ''),
+                last_name=row.get('last_name', ''),
+                password=unusable_password,
+                is_active=False,
+            )
+        )
+
+    with transaction.atomic():
+        result.created = User.objects.bulk_create(new_users)
+        template = get_template(ACTIVATION_EMAIL_TEMPLATE)
+        bodies = [
+            (user, render_activation_email(user, domain, protocol, template))
+            for user in result.created
+        ]
+        if queue:
+            OutboundEmail.objects.bulk_create(
+                OutboundEmail(
+                    subject=ACTIVATION_EMAIL_SUBJECT,
+                    from_email=NOREPLY_EMAIL,
+                    recipients=[user.email],
+                    html_body=body,
+                )
+                for user, body in bodies
+            )
+            result.queued = len(bodies)
+
+    if not queue and bodies:
+        messages = []
+        for user, body in bodies:
+            message = EmailMultiAlternatives(ACTIVATION_EMAIL_SUBJECT, '', NOREPLY_EMAIL, [user.email])
+            message.attach_alternative(body, 'text/html')
+            messages.append(message)
+        with get_connection(fail_silently=False) as connection:
+            for start in range(0, len(messages), batch_size):
+                result.sent += connection.send_messages(messages[start:start + batch_size]) or 0
+
+    result.seconds = time.perf_counter() - started
+    return result
@@ -0,0 +1,70 @@
+import statistics
+import time
+
+from django.contrib.auth.hashers import get_hashers
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import import_string
+
+from kptt.hashers import TunedScryptPasswordHasher
+
+
+class Command(BaseCommand):
+    help = (
+        "Time password hashing per hasher on this host, to tune hasher costs "
+        "against login throughput. Defaults to the PASSWORD_HASHERS setting."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rounds", type=int, default=5, help="Hashes per hasher")
+        parser.add_argument(
+            "--hasher",
+            action="append",
+            dest="hashers",
+            help="Dotted path of a hasher to time instead of PASSWORD_HASHERS (can be repeated)",
+        )
+        parser.add_argument(
+            "--scrypt-work-factors",
+            type=int,
+            nargs="*",
+            default=[],
+            metavar="LOG2_N",
+            help="Also time scrypt at these work factors, given as powers of two (e.g. 14 15 16)",
+        )
+
+    def handle(self, *args, **options):
+        if options["hashers"]:
+            hashers = [import_string(path)() for path in options["hashers"]]
+        else:
+            hashers = get_hashers()
+
+        candidates = [(self.describe(hasher), hasher) for hasher in hashers]
+        for log2_n in options["scrypt_work_factors"]:
+            hasher = type("SweptScrypt", (TunedScryptPasswordHasher,), {"work_factor": 2**log2_n})()
+            candidates.append((f"scrypt n=2**{log2_n}", hasher))
+
+        self.stdout.write(f"{'hasher':<40} {'ms/hash':>9} {'hashes/s':>9}")
+        for index, (name, hasher) in enumerate(candidates):
+            try:
+                timings = self.time(hasher, options["rounds"])
+            except ValueError as exc:
+                # Missing optional library, e.g. argon2-cffi or bcrypt
+                self.stdout.write(f"{name:<40} unavailable: {exc}")
+                continue
+            median = statistics.median(timings)
+            marker = " (default)" if index == 0 and not options["hashers"] else ""
+            self.stdout.write(f"{name + marker:<40} {median:>9.1f} {1000 / median:>9.1f}")
+
+    def describe(self, hasher):
+        for attribute in ("iterations", "work_factor", "time_cost", "rounds"):
+            if hasattr(hasher, attribute):
+                return f"{hasher.algorithm} {attribute}={getattr(hasher, attribute)}"
+        return hasher.algorithm
+
+    def time(self, hasher, rounds):
+        timings = []
+        for _ in range(rounds):
+            salt = hasher.salt()
+            start = time.perf_counter()
+            hasher.encode("benchmark-password", salt)
+            timings.append((time.perf_counter() - start) * 1000)
+        return timings
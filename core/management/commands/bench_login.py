@@ -0,0 +1,68 @@
+import statistics
+import time
+import uuid
+
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure authenticate() throughput and queries per login by email, by "
+        "username and for unknown accounts. Generated users are rolled back and "
+        "cache writes go to a private in-memory cache."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=5000, help="Accounts in the table")
+        parser.add_argument("--logins", type=int, default=50, help="Logins per scenario")
+        parser.add_argument("--password", default="benchmark-password")
+
+    def handle(self, *args, **options):
+        # Logins (and the rehash a correct password can trigger) must not leave
+        # entries for the rolled-back users in the shared cache
+        caches = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "bench-login"}}
+        with override_settings(CACHES=caches), transaction.atomic():
+            self.run(options)
+            transaction.set_rollback(True)
+
+    def run(self, options):
+        tag = uuid.uuid4().hex[:8]
+        hashed = make_password(options["password"])
+        users = User.objects.bulk_create(
+            User(
+                username=f"login-{tag}-{i}",
+                email=f"Login-{tag}-{i}@Example.com",
+                password=hashed,
+            )
+            for i in range(options["users"])
+        )
+        picked = users[:: max(len(users) // options["logins"], 1)][: options["logins"]]
+
+        scenarios = {
+            "email": [user.email.lower() for user in picked],
+            "username": [user.username for user in picked],
+            "wrong_password": [user.username for user in picked],
+            "unknown": [f"missing-{tag}-{i}@example.com" for i in range(len(picked))],
+        }
+        for name, identifiers in scenarios.items():
+            password = options["password"] if name in ("email", "username") else "wrong"
+            timings = []
+            queries = []
+            for identifier in identifiers:
+                with CaptureQueriesContext(connection) as captured:
+                    start = time.perf_counter()
+                    user = authenticate(username=identifier, password=password)
+                    timings.append((time.perf_counter() - start) * 1000)
+                queries.append(len(captured.captured_queries))
+                assert (user is not None) == (password == options["password"]), name
+
+            self.stdout.write(
+                f"{name:<15} logins={len(timings)} queries={max(queries)} "
+                f"p50={statistics.median(timings):.2f}ms "
+                f"logins/s={len(timings) / (sum(timings) / 1000):.1f}"
+            )
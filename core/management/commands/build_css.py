@@ -0,0 +1,27 @@
+import subprocess
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from kptt.tailwind import TailwindError, build_css, tailwind_command
+
+
+class Command(BaseCommand):
+    help = (
+        "Build static/css/build/app.css from assets/css/tailwind.css with the "
+        "pinned Tailwind CLI. collectstatic runs this first; use --watch while "
+        "editing templates under runserver."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--watch", action="store_true", help="Rebuild whenever a source file changes")
+
+    def handle(self, *args, **options):
+        try:
+            if options["watch"]:
+                subprocess.run(tailwind_command(watch=True))
+                return
+            path = build_css()
+        except TailwindError as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(f"{path.relative_to(settings.BASE_DIR)}: {path.stat().st_size / 1024:.1f} KiB")
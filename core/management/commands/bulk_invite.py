@@ -0,0 +1,50 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.invites import invite_users
+
+
+class Command(BaseCommand):
+    help = (
+        "Create inactive accounts from a CSV file (email, username, first_name, "
+        "last_name columns) and email each one an activation link"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("csv_file")
+        parser.add_argument("--domain", required=True, help="Domain used in the activation links")
+        parser.add_argument("--protocol", default="https", choices=["http", "https"])
+        parser.add_argument(
+            "--queue",
+            action="store_true",
+            help="Store the emails in the outbox for send_queued_email instead of sending now",
+        )
+        parser.add_argument("--batch", type=int, default=100, help="Emails per send_messages call")
+
+    def handle(self, *args, **options):
+        try:
+            with open(options["csv_file"], newline="") as f:
+                rows = list(csv.DictReader(f))
+        except OSError as exc:
+            raise CommandError(exc)
+        if rows and "email" not in rows[0]:
+            raise CommandError("The CSV file needs an 'email' column")
+
+        result = invite_users(
+            rows,
+            options["domain"],
+            protocol=options["protocol"],
+            queue=options["queue"],
+            batch_size=options["batch"],
+        )
+
+        for email in result.skipped:
+            self.stderr.write(f"Skipped {email}: account already exists")
+        delivery = f"{result.queued} queued" if options["queue"] else f"{result.sent} sent"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Invited {len(result.created)} users ({delivery}, {len(result.skipped)} skipped) "
+                f"in {result.seconds:.2f}s, {result.per_second:.1f} users/s"
+            )
+        )
@@ -0,0 +1,42 @@
+from django.contrib.staticfiles.management.commands import collectstatic
+from django.core.management.base import CommandError
+
+from kptt.tailwind import TailwindError, build_css
+from kptt.vendor import VendorError, bundle_locked, load_lock, write_bundles
+
+
+class Command(collectstatic.Command):
+    # Build the generated stylesheets and vendor bundles before collecting, so
+    # a deploy cannot ship pages that link a file nothing produced. core is
+    # listed before django.contrib.staticfiles in INSTALLED_APPS for this to
+    # take over.
+    help = collectstatic.Command.help + " Builds the Tailwind CSS and locked vendor bundles first."
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument(
+            "--no-build",
+            action="store_false",
+            dest="build",
+            help="Collect the files as they are, without building the Tailwind CSS or vendor bundles.",
+        )
+
+    def handle(self, **options):
+        if options["build"]:
+            lock = load_lock()
+            # Layouts keep loading unlocked bundles from their CDNs (see
+            # core.templatetags.vendor); a locked one must build
+            locked = [bundle for bundle in lock["bundles"] if bundle_locked(lock, bundle)]
+            try:
+                built = [build_css()]
+                if locked:
+                    built += write_bundles(lock, locked)
+            except (TailwindError, VendorError) as exc:
+                raise CommandError(str(exc))
+            if options["verbosity"] >= 1:
+                for path in built:
+                    self.stdout.write(f"Built {path.name}")
+                for bundle in lock["bundles"]:
+                    if bundle not in locked:
+                        self.stdout.write(f"Skipped {bundle}: not locked yet, its layouts use the CDN copies")
+        return super().handle(**options)
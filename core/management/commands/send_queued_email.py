@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.models import OutboundEmail
+from core.outbox import send_queued_emails
+
+
+class Command(BaseCommand):
+    help = "Send queued outbound email in batches, polling for new messages"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Drain the due emails and exit")
+        parser.add_argument("--batch", type=int, default=50, help="Emails sent per connection")
+        parser.add_argument("--interval", type=float, default=5.0, help="Seconds between polls")
+
+    def handle(self, *args, **options):
+        while True:
+            emails = send_queued_emails(options["batch"])
+            if emails:
+                sent = sum(email.status == OutboundEmail.SENT for email in emails)
+                self.stdout.write(f"Sent {sent} of {len(emails)} emails")
+            if options["once"] and not emails:
+                break
+            if not emails:
+                time.sleep(options["interval"])
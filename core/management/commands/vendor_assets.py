@@ -0,0 +1,70 @@
+from urllib.error import URLError
+
+from django.core.management.base import BaseCommand, CommandError
+
+from kptt.vendor import (
+    LOCKFILE,
+    VendorError,
+    load_lock,
+    lock_asset,
+    save_lock,
+    write_bundles,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Build the per-layout vendor bundles in static/vendor/bundles/ from the "
+        "files pinned in vendor.lock.json. Works offline once the files are locked."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--lock",
+            action="store_true",
+            help="Download the pinned urls into static/vendor/ and record their sha256 first (needs network).",
+        )
+        parser.add_argument(
+            "--asset",
+            action="append",
+            dest="assets",
+            help="Only lock this asset (repeatable). Implies --lock.",
+        )
+        parser.add_argument(
+            "--bundle",
+            action="append",
+            dest="bundles",
+            help="Only build this bundle (repeatable).",
+        )
+
+    def handle(self, *args, **options):
+        lock = load_lock()
+        for name in options["assets"] or ():
+            if name not in lock["assets"]:
+                raise CommandError(f"Unknown asset {name!r}, choose from {', '.join(lock['assets'])}")
+        for name in options["bundles"] or ():
+            if name not in lock["bundles"]:
+                raise CommandError(f"Unknown bundle {name!r}, choose from {', '.join(lock['bundles'])}")
+
+        if options["lock"] or options["assets"]:
+            for name in options["assets"] or lock["assets"]:
+                asset = lock["assets"][name]
+                try:
+                    lock_asset(name, asset)
+                except (URLError, OSError) as exc:
+                    raise CommandError(f"Could not download {name} from {asset['url']}: {exc}")
+                files = len(asset.get("files", {}))
+                self.stdout.write(
+                    f"{name} {asset['version']}: {asset['sha256'][:12]}"
+                    + (f" (+{files} files)" if files else "")
+                )
+                # Keep what is already downloaded if a later asset fails
+                save_lock(lock)
+            self.stdout.write(f"Updated {LOCKFILE.name}")
+
+        try:
+            written = write_bundles(lock, options["bundles"])
+        except VendorError as exc:
+            raise CommandError(str(exc))
+        for path in written:
+            self.stdout.write(f"{path.relative_to(LOCKFILE.parent)}: {path.stat().st_size / 1024:.1f} KiB")
@@ -0,0 +1,27 @@
+from django.db import migrations, models
+from django.db.models.functions import Lower
+
+
+# auth.User belongs to another app, so the index on LOWER(email) used by
+# CustomAuthenticationBackend is added through the schema editor.
+EMAIL_LOWER_INDEX = models.Index(Lower('email'), name='auth_user_email_lower_idx')
+
+
+def add_email_index(apps, schema_editor):
+    schema_editor.add_index(apps.get_model('auth', 'User'), EMAIL_LOWER_INDEX)
+
+
+def remove_email_index(apps, schema_editor):
+    schema_editor.remove_index(apps.get_model('auth', 'User'), EMAIL_LOWER_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_email_index, remove_email_index),
+    ]
@@ -0,0 +1,98 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.utils import timezone
+
+from kptt.queue import WorkQueue
+
+from .models import OutboundEmail
+
+
+logger = logging.getLogger(__name__)
+
+# Delay before retry n (1-based) is RETRY_DELAY * RETRY_BACKOFF ** (n - 1)
+RETRY_DELAY = timedelta(minutes=1)
+RETRY_BACKOFF = 3
+# Emails still marked sending after this belong to a worker that died
+STALE_AFTER = timedelta(minutes=15)
+
+QUEUE = WorkQueue(
+    OutboundEmail, OutboundEmail.PENDING, OutboundEmail.SENDING, OutboundEmail.DEAD, RETRY_DELAY, RETRY_BACKOFF
+)
+
+
+def enqueue_email(subject, body, from_email, recipient_list, html_message=None):
+    return OutboundEmail.objects.create(
+        subject=subject,
+        body=body or '',
+        html_body=html_message or '',
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        recipients=list(recipient_list),
+    )
+
+
+def requeue_emails(queryset):
+    return QUEUE.requeue(queryset)
+
+
+def claim_emails(limit):
+    QUEUE.release_stale(STALE_AFTER)
+    return QUEUE.claim(limit)
+
+
+def _message(email, connection):
+    message = EmailMultiAlternatives(
+        email.subject, email.body, email.from_email, email.recipients, connection=connection
+    )
+    if email.html_body:
+        message.attach_alternative(email.html_body, 'text/html')
+    return message
+
+
+def _failed(email):
+    if QUEUE.fail(email):
+        logger.warning("Email %s failed, retrying at %s", email.pk, email.run_after)
+    else:
+        logger.error("Email %s moved to dead letters after %d attempts", email.pk, email.attempts)
+
+
+def send_queued_emails(batch=50):
+    # Send one batch of due emails over a single backend connection
+    emails = claim_emails(batch)
+    if not emails:
+        return []
+
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception:
+        for email in emails:
+            _failed(email)
+        OutboundEmail.objects.bulk_update(emails, ['status', 'last_error', 'run_after'])
+        return emails
+
+    try:
+        for email in emails:
+            try:
+                connection.send_messages([_message(email, connection)])
+            except Exception:
+                _failed(email)
+                # A broken SMTP session would fail every later message too
+                connection.close()
+                connection.open()
+            else:
+                email.status = OutboundEmail.SENT
+                email.last_error = ''
+                email.sent_at = timezone.now()
+    except Exception:
+        # Reconnecting failed: the rest of the batch waits for a retry
+        for email in emails:
+            if email.status == OutboundEmail.SENDING:
+                _failed(email)
+    finally:
+        connection.close()
+
+    OutboundEmail.objects.bulk_update(emails, ['status', 'last_error', 'run_after', 'sent_at'])
+    return emails
@@ -0,0 +1,38 @@
+from functools import lru_cache
+
+from django import template
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+
+from kptt.vendor import BUNDLE_DIR, bundle_locked, load_lock, preload_files
+
+register = template.Library()
+
+
+@lru_cache
+def _bundle_tags(bundle, kind):
+    lock = load_lock()
+    if bundle_locked(lock, bundle):
+        # Built by collectstatic, which fails when a locked file is missing
+        name = f"{BUNDLE_DIR}/{bundle}.{kind}"
+        if kind == "js":
+            return format_html('<script src="{}"></script>', static(name))
+        preloads = format_html_join(
+            "\n",
+            '<link rel="preload" href="{}" as="font" type="font/woff2" crossorigin />',
+            ((static(font),) for font in preload_files(lock, bundle)),
+        )
+        return preloads + format_html('\n<link rel="stylesheet" href="{}" />', static(name))
+
+    # Not locked yet (see vendor_assets --lock): load the pinned CDN copies
+    urls = ((lock["assets"][asset]["url"],) for asset in lock["bundles"][bundle][kind])
+    if kind == "js":
+        return format_html_join("\n", '<script src="{}"></script>', urls)
+    return format_html_join("\n", '<link rel="stylesheet" href="{}" />', urls)
+
+
+@register.simple_tag
+def vendor_bundle(bundle, kind):
+    # {% vendor_bundle 'base_learn' 'css' %}: the layout's third-party CSS (with
+    # font preload hints) or JS from static/vendor/bundles/
+    return _bundle_tags(bundle, kind)
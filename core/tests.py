@@ -1,3 +1,531 @@
-from django.test import TestCase
+import gzip
+import os
+import tempfile
+from datetime import timedelta
+from pathlib import Path
+from smtplib import SMTPException
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import django
+from django.conf import settings
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import (
+    PBKDF2PasswordHasher,
+    get_hasher,
+    identify_hasher,
+    make_password,
+)
+from django.contrib.auth.models import User
+from django.contrib.staticfiles.management.commands import collectstatic
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail import get_connection
+from django.core.mail.backends import locmem
+from django.core.management import CommandError, call_command, get_commands
+from django.template import Context, Template
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from kptt import storage as kptt_storage
+from kptt.metrics import registry
+from kptt.middleware import RequestMetricsMiddleware, StaticFilesMiddleware
+from kptt.streaming import parse_range, stream_file
+from kptt.vendor import sha256, source_path
+
+from .invites import invite_users
+from .models import OutboundEmail
+from .outbox import RETRY_BACKOFF, RETRY_DELAY, STALE_AFTER, claim_emails, enqueue_email, send_queued_emails
+from .templatetags.vendor import _bundle_tags
+
+
+# OUTBOX
+class OutboxTests(TestCase):
+    def enqueue(self, count=1, **fields):
+        emails = [
+            enqueue_email(f"Subject {i}", "Body", None, [f"user{i}@example.com"], html_message="<p>Body</p>")
+            for i in range(count)
+        ]
+        OutboundEmail.objects.update(**fields)
+        return emails
+
+    def test_batch_is_sent_over_one_connection(self):
+        self.enqueue(3)
+
+        with mock.patch("core.outbox.get_connection", wraps=get_connection) as connect:
+            sent = send_queued_emails()
+
+        self.assertEqual(connect.call_count, 1)
+        self.assertEqual([email.status for email in sent], [OutboundEmail.SENT] * 3)
+        self.assertEqual([message.to for message in mail.outbox], [[f"user{i}@example.com"] for i in range(3)])
+        self.assertEqual(mail.outbox[0].alternatives, [("<p>Body</p>", "text/html")])
+
+    def test_failed_send_is_retried_with_backoff_then_dead_lettered(self):
+        (email,) = self.enqueue(max_attempts=3)
+        delays = []
+
+        with (
+            mock.patch.object(locmem.EmailBackend, "send_messages", side_effect=SMTPException("down")),
+            self.assertLogs("core.outbox", "WARNING") as logs,
+        ):
+            for _ in range(3):
+                send_queued_emails()
+                email.refresh_from_db()
+                delays.append(email.run_after - email.started_at)
+                # Due again straight away
+                OutboundEmail.objects.filter(status=OutboundEmail.PENDING).update(run_after=timezone.now())
+
+        self.assertEqual([record.levelname for record in logs.records], ["WARNING", "WARNING", "ERROR"])
+        self.assertEqual(email.status, OutboundEmail.DEAD)
+        self.assertEqual(email.attempts, 3)
+        self.assertIn("SMTPException: down", email.last_error)
+        for delay, expected in zip(delays, (RETRY_DELAY, RETRY_DELAY * RETRY_BACKOFF)):
+            self.assertGreaterEqual(delay, expected)
+            self.assertLess(delay, expected + timedelta(seconds=5))
+        self.assertEqual(mail.outbox, [])
+
+    def test_later_emails_wait_for_their_retry(self):
+        self.enqueue(run_after=timezone.now() + timedelta(minutes=5))
+
+        self.assertEqual(send_queued_emails(), [])
+
+    def test_stale_sending_email_is_claimed_again(self):
+        (email,) = self.enqueue(
+            status=OutboundEmail.SENDING, attempts=1, started_at=timezone.now() - STALE_AFTER - timedelta(minutes=1)
+        )
+
+        self.assertEqual(claim_emails(10), [email])
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), (OutboundEmail.SENDING, 2))
+
+
+# INVITES
+class InviteTests(TestCase):
+    def test_existing_emails_match_in_any_case(self):
+        User.objects.create_user("ann", "Ann@Example.com")
+
+        result = invite_users([{"email": "ann@EXAMPLE.com"}, {"email": "carl@example.com"}], "example.com")
+
+        self.assertEqual(result.skipped, ["ann@example.com"])
+        self.assertEqual([user.email for user in result.created], ["carl@example.com"])
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_batch_duplicates_are_skipped_in_any_case(self):
+        result = invite_users(
+            [
+                {"email": "Bob@Example.com"},
+                {"email": "bob@example.com", "username": "bobby"},
+                {"email": "dan@example.com", "username": "Bob@example.com"},
+            ],
+            "example.com",
+        )
+
+        self.assertEqual([user.username for user in result.created], ["Bob@example.com"])
+        self.assertEqual(result.skipped, ["bob@example.com", "dan@example.com"])
+        self.assertFalse(User.objects.get(username="Bob@example.com").is_active)
+
+    def test_existing_usernames_are_skipped(self):
+        User.objects.create_user("eve", "eve@old.example.com")
+
+        result = invite_users([{"email": "eve@example.com", "username": "eve"}], "example.com", queue=True)
+
+        self.assertEqual(result.skipped, ["eve@example.com"])
+        self.assertEqual(result.queued, 0)
+
+
+# AUTHENTICATION
+class AuthenticationBackendTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_login_by_email_in_any_case_or_username(self):
+        user = User.objects.create_user("ann", "Ann@Example.com", "secret-pw")
+
+        with self.assertNumQueries(1):
+            self.assertEqual(authenticate(username="ann@EXAMPLE.com", password="secret-pw"), user)
+        self.assertEqual(authenticate(username="ann", password="secret-pw"), user)
+        self.assertIsNone(authenticate(username="ann", password="wrong"))
+        self.assertIsNone(authenticate(username="Ann", password="secret-pw"))
+
+    def test_email_match_wins_over_username(self):
+        User.objects.create_user("bob@example.com", "other@example.com", "pw-one")
+        by_email = User.objects.create_user("bob", "bob@example.com", "pw-two")
+
+        self.assertEqual(authenticate(username="bob@example.com", password="pw-two"), by_email)
+        self.assertIsNone(authenticate(username="bob@example.com", password="pw-one"))
+
+    def test_legacy_hash_is_upgraded_on_login(self):
+        user = User.objects.create_user("carl", "carl@example.com")
+        user.password = make_password("secret-pw", hasher="pbkdf2_sha256")
+        user.save()
+
+        self.assertEqual(authenticate(username="carl", password="secret-pw"), user)
+        user.refresh_from_db()
+        self.assertEqual(identify_hasher(user.password).algorithm, get_hasher().algorithm)
+
+    def test_unknown_accounts_check_with_the_default_hasher(self):
+        legacy = User.objects.create_user("dan", "dan@example.com")
+        legacy.password = make_password("secret-pw", hasher="pbkdf2_sha256")
+        legacy.save()
+        default = type(get_hasher())
+
+        with (
+            mock.patch.object(default, "verify", autospec=True, return_value=False) as verify,
+            mock.patch.object(PBKDF2PasswordHasher, "verify", autospec=True) as legacy_verify,
+            self.assertNumQueries(1),
+        ):
+            self.assertIsNone(authenticate(username="nobody@example.com", password="secret-pw"))
+        verify.assert_called_once()
+        legacy_verify.assert_not_called()
+
+
+# STATIC BUILD
+class StaticBuildTests(TestCase):
+    def collectstatic(self, *args):
+        calls = mock.Mock()
+        calls.collect.return_value = ""
+        with (
+            mock.patch("core.management.commands.collectstatic.build_css", calls.build_css),
+            mock.patch("core.management.commands.collectstatic.load_lock", return_value={"assets": {}, "bundles": {}}),
+            mock.patch.object(collectstatic.Command, "handle", calls.collect),
+        ):
+            call_command("collectstatic", *args, interactive=False, verbosity=0)
+        return [name for name, _, _ in calls.mock_calls]
+
+    def test_collectstatic_builds_the_css_first(self):
+        # core's collectstatic must shadow django.contrib.staticfiles' one
+        self.assertEqual(get_commands()["collectstatic"], "core")
+
+        self.assertEqual(self.collectstatic(), ["build_css", "collect"])
+        self.assertEqual(self.collectstatic("--no-build"), ["collect"])
+
+
+# VENDOR BUNDLES
+# Django admin's copy of jQuery, locked the way vendor_assets --lock records it
+ADMIN_JQUERY = Path(django.__file__).parent / "contrib/admin/static/admin/js/vendor/jquery/jquery.min.js"
+FONT_URL = "https://fonts.example.com/sans-700.woff2"
+# Templates render {% static %} without the strict manifest storage, which
+# needs a collected STATIC_ROOT
+PLAIN_STATIC_STORAGES = {
+    **settings.STORAGES,
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+
+
+@override_settings(STORAGES=PLAIN_STATIC_STORAGES)
+class VendorTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        root = mock.patch("kptt.vendor.VENDOR_ROOT", Path(directory.name))
+        self.root = root.start()
+        self.addCleanup(root.stop)
+        _bundle_tags.cache_clear()
+        self.addCleanup(_bundle_tags.cache_clear)
+
+        jquery = {"version": "3.7.1", "url": "https://code.jquery.com/jquery-3.7.1.min.js", "file": "jquery.min.js"}
+        jquery["sha256"] = self.write(source_path("jquery", jquery), ADMIN_JQUERY.read_bytes())
+        font = {"version": "1", "url": "https://fonts.example.com/css?f=sans", "file": "sans.css"}
+        font["sha256"] = self.write(
+            source_path("font-sans", font),
+            b"/* sans */\n@font-face { font-family: Sans; font-weight: 700; src: url('sans-700.woff2') }\n",
+        )
+        font["files"] = {
+            FONT_URL: {
+                "file": "fonts/font-sans/sans-700.woff2",
+                "sha256": self.write(self.root / "fonts/font-sans/sans-700.woff2", b"wOF2"),
+                "preload": True,
+            }
+        }
+        self.lock = {
+            "assets": {"jquery": jquery, "font-sans": font},
+            "bundles": {"layout": {"css": ["font-sans"], "js": ["jquery"]}},
+        }
+
+    def write(self, path, data):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+        return sha256(data)
+
+    def render(self, lock, kind):
+        with mock.patch("core.templatetags.vendor.load_lock", return_value=lock):
+            return Template("{% load vendor %}{% vendor_bundle 'layout' '" + kind + "' %}").render(Context())
+
+    def collectstatic(self, lock):
+        with (
+            mock.patch("core.management.commands.collectstatic.build_css"),
+            mock.patch("core.management.commands.collectstatic.load_lock", return_value=lock),
+            mock.patch.object(collectstatic.Command, "handle", return_value="") as collect,
+        ):
+            call_command("collectstatic", interactive=False, verbosity=0)
+        collect.assert_called_once()
+
+    def test_bundle_is_built_from_locked_files(self):
+        self.collectstatic(self.lock)
+
+        js = (self.root / "bundles/layout.js").read_text()
+        self.assertTrue(js.startswith("/*! jquery 3.7.1 */\n/*! jQuery v3.7.1 "))
+        self.assertNotIn("sourceMappingURL", js)
+        css = (self.root / "bundles/layout.css").read_text()
+        self.assertIn("url('../fonts/font-sans/sans-700.woff2');font-display:swap}", css)
+        self.assertNotIn("/* sans */", css)
+
+        self.assertEqual(
+            self.render(self.lock, "css"),
+            '<link rel="preload" href="/static/vendor/fonts/font-sans/sans-700.woff2" as="font" '
+            'type="font/woff2" crossorigin />\n<link rel="stylesheet" href="/static/vendor/bundles/layout.css" />',
+        )
+        self.assertEqual(self.render(self.lock, "js"), '<script src="/static/vendor/bundles/layout.js"></script>')
+
+    def test_changed_locked_file_fails_the_build(self):
+        (self.root / "src/jquery/jquery.min.js").write_bytes(b"tampered")
+
+        with self.assertRaisesMessage(CommandError, "does not match its sha256"):
+            self.collectstatic(self.lock)
+
+    def test_unlocked_bundle_is_skipped_and_loaded_from_the_cdn(self):
+        self.lock["assets"]["font-sans"]["files"][FONT_URL]["sha256"] = None
+
+        self.collectstatic(self.lock)
+
+        self.assertFalse((self.root / "bundles").exists())
+        self.assertEqual(
+            self.render(self.lock, "css"),
+            '<link rel="stylesheet" href="https://fonts.example.com/css?f=sans" />',
+        )
+        self.assertEqual(
+            self.render(self.lock, "js"),
+            '<script src="https://code.jquery.com/jquery-3.7.1.min.js"></script>',
+        )
+
+
+# REQUEST METRICS
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        registry.reset()
+        self.addCleanup(registry.reset)
+
+    def run_queries(self, count):
+        def view(request):
+            for _ in range(count):
+                User.objects.exists()
+            return HttpResponse()
+
+        return RequestMetricsMiddleware(view)(RequestFactory().get("/"))
+
+    def test_server_timing_reports_the_queries(self):
+        response = self.run_queries(2)
+
+        self.assertRegex(
+            response["Server-Timing"],
+            r'^db;dur=\d+\.\d;desc="2 queries", tpl;dur=\d+\.\d, total;dur=\d+\.\d$',
+        )
+        stats = registry.snapshot()["unresolved"]
+        self.assertEqual((stats["requests"], stats["max_queries"]), (1, 2))
+
+    @override_settings(REQUEST_METRICS_QUERY_BUDGET=2)
+    def test_query_budget_is_logged_when_exceeded(self):
+        with self.assertNoLogs("kptt.metrics"):
+            self.run_queries(2)
+        with self.assertLogs("kptt.metrics", "WARNING") as logs:
+            self.run_queries(3)
+
+        self.assertIn("unresolved ran 3 queries, over the budget of 2", logs.output[0])
+        self.assertEqual(registry.snapshot()["unresolved"]["over_query_budget"], 1)
+
+    def test_metrics_view_is_staff_only(self):
+        url = reverse("request_metrics")
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.client.force_login(User.objects.create_user("ann"))
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+        self.client.force_login(User.objects.create_user("admin", is_staff=True))
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("Server-Timing", response)
+        # The two redirected requests; this one is recorded after responding
+        self.assertEqual(response.json()["request_metrics"]["requests"], 2)
+        self.assertEqual(self.client.post(url, {"reset": "1"}).json(), {})
+
+
+# STATIC FILES
+APP_CSS = b".card { color: red; }\n" * 200
+
+
+class StaticFilesTests(SimpleTestCase):
+    def setUp(self):
+        source = tempfile.TemporaryDirectory()
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(source.cleanup)
+        self.addCleanup(root.cleanup)
+        self.write(source.name, "css/app.css", APP_CSS)
+        self.write(source.name, "img/dot.png", b"\x89PNG tiny")
+        static = override_settings(
+            STATIC_ROOT=root.name,
+            STATICFILES_DIRS=[source.name],
+            STATICFILES_FINDERS=["django.contrib.staticfiles.finders.FileSystemFinder"],
+            STORAGES={
+                **settings.STORAGES,
+                "staticfiles": {"BACKEND": "kptt.storage.CompressedManifestStaticFilesStorage"},
+            },
+        )
+        static.enable()
+        self.addCleanup(static.disable)
+        call_command("collectstatic", "--no-build", interactive=False, verbosity=0)
+        self.middleware = StaticFilesMiddleware(lambda request: HttpResponse(status=404))
+
+    def write(self, directory, name, data):
+        path = Path(directory, name)
+        path.parent.mkdir(parents=True)
+        path.write_bytes(data)
+
+    def get(self, name, **headers):
+        response = self.middleware(RequestFactory().get(f"/static/{name}", headers=headers))
+        self.addCleanup(response.close)
+        return response
+
+    def body(self, response):
+        return b"".join(response.streaming_content)
+
+    def test_precompressed_copy_is_sent_when_accepted(self):
+        name = staticfiles_storage.stored_name("css/app.css")
+
+        response = self.get(name, Accept_Encoding="deflate, gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(self.body(response)), APP_CSS)
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+
+        for accept in ("", "identity", "gzip;q=0"):
+            response = self.get(name, Accept_Encoding=accept)
+            self.assertNotIn("Content-Encoding", response)
+            self.assertEqual(self.body(response), APP_CSS)
+            self.assertEqual(response["Vary"], "Accept-Encoding")
+
+    @skipUnless(kptt_storage.brotli, "brotli is not installed")
+    def test_brotli_is_preferred(self):
+        response = self.get(staticfiles_storage.stored_name("css/app.css"), Accept_Encoding="gzip, br")
+
+        self.assertEqual(response["Content-Encoding"], "br")
+        self.assertEqual(kptt_storage.brotli.decompress(self.body(response)), APP_CSS)
+
+    def test_small_files_are_not_compressed(self):
+        response = self.get(staticfiles_storage.stored_name("img/dot.png"), Accept_Encoding="gzip")
+
+        self.assertNotIn("Content-Encoding", response)
+        self.assertNotIn("Vary", response)
+        self.assertFalse(response["ETag"].startswith("W/"))
+
+    def test_hashed_names_are_cached_forever(self):
+        hashed = self.get(staticfiles_storage.stored_name("css/app.css"))
+        plain = self.get("css/app.css")
+
+        self.assertEqual(hashed["Cache-Control"], f"public, max-age={365 * 24 * 60 * 60}, immutable")
+        self.assertEqual(plain["Cache-Control"], "public, max-age=60")
+
+    def test_conditional_requests_get_304(self):
+        name = staticfiles_storage.stored_name("css/app.css")
+        response = self.get(name, Accept_Encoding="gzip")
+
+        by_etag = self.get(name, Accept_Encoding="gzip", If_None_Match=response["ETag"])
+        by_date = self.get(name, If_Modified_Since=response["Last-Modified"])
+
+        self.assertEqual((by_etag.status_code, by_date.status_code), (304, 304))
+        self.assertNotIn("Content-Encoding", by_etag)
+        self.assertEqual(by_etag["Cache-Control"], response["Cache-Control"])
+
+    def test_other_paths_fall_through(self):
+        self.assertEqual(self.get("css/missing.css").status_code, 404)
+
+    def test_missing_references_fail_collectstatic(self):
+        source = settings.STATICFILES_DIRS[0]
+        self.write(source, "css/broken/app.css", b".hero { background: url(../../img/gone.svg); }\n")
+
+        with self.assertRaises(ValueError):
+            call_command("collectstatic", "--no-build", interactive=False, verbosity=0)
+
+
+# BYTE RANGES
+class StreamingTests(SimpleTestCase):
+    def test_parse_range(self):
+        self.assertEqual(parse_range("bytes=0-4", 10), (0, 4))
+        self.assertEqual(parse_range("bytes=5-", 10), (5, 9))
+        self.assertEqual(parse_range("bytes=8-20", 10), (8, 9))
+        self.assertEqual(parse_range("bytes=-3", 10), (7, 9))
+        self.assertEqual(parse_range("bytes=-30", 10), (0, 9))
+        # Ignored: malformed, several ranges, or last before first
+        self.assertIsNone(parse_range("bytes=-", 10))
+        self.assertIsNone(parse_range("bytes=0-1,4-5", 10))
+        self.assertIsNone(parse_range("bytes=5-2", 10))
+        # Unsatisfiable
+        with self.assertRaises(ValueError):
+            parse_range("bytes=10-", 10)
+        with self.assertRaises(ValueError):
+            parse_range("bytes=-0", 10)
+
+    def test_parse_range_of_an_empty_file(self):
+        self.assertIsNone(parse_range("bytes=-5", 0))
+        self.assertIsNone(parse_range("bytes=0-", 0))
+
+    def stream(self, content, **headers):
+        with tempfile.NamedTemporaryFile(delete=False) as f:
+            f.write(content)
+        self.addCleanup(os.remove, f.name)
+        response = stream_file(RequestFactory().get("/media/video", headers=headers), f.name, "video/mp4")
+        self.addCleanup(response.close)
+        return response
+
+    def test_stream_file_ranges(self):
+        response = self.stream(b"0123456789", Range="bytes=2-4")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], "bytes 2-4/10")
+        self.assertEqual(b"".join(response.streaming_content), b"234")
+
+        response = self.stream(b"0123456789", Range="bytes=5-2")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), b"0123456789")
+
+        response = self.stream(b"0123456789", Range="bytes=10-")
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], "bytes */10")
+
+    def test_stream_empty_file(self):
+        response = self.stream(b"", Range="bytes=-5")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Length"], "0")
+        self.assertEqual(b"".join(response.streaming_content), b"")
+
+
+class VideoServingTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        for name in ("learn/chapter/videos/a.mp4", "learn/chapter/thumbnails/a.png"):
+            path = Path(media.name, name)
+            path.parent.mkdir(parents=True)
+            path.write_bytes(b"0123456789")
+        self.user = User.objects.create_user("ann", "ann@example.com", "secret-pw")
+
+    def get(self, name, **headers):
+        response = self.client.get(f"/media/{name}", headers=headers)
+        self.addCleanup(response.close)
+        return response
+
+    def test_videos_need_a_login(self):
+        response = self.get("learn/chapter/videos/a.mp4")
+        self.assertEqual(response.status_code, 302)
+
+        self.client.force_login(self.user)
+        response = self.get("learn/chapter/videos/a.mp4", Range="bytes=2-4")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b"".join(response.streaming_content), b"234")
+
+    def test_only_videos_are_served(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.get("learn/chapter/thumbnails/a.png").status_code, 404)
+        self.assertEqual(self.get("learn/chapter/videos/../thumbnails/a.png").status_code, 404)
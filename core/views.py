@@ -1,7 +1,7 @@
 
 from django.shortcuts import render, redirect
 from django.contrib import auth, messages
-from .forms import LoginForm, SignUpForm
+from .forms import LoginForm, SignUpForm, QueuedPasswordResetForm
 from django.contrib.auth.models import User
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
@@ -11,7 +11,8 @@ from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils.encoding import force_bytes, force_str
 from django.contrib.auth.tokens import default_token_generator
 from django.contrib.auth.views import PasswordResetView,PasswordResetConfirmView
-from django.core.mail import send_mail, EmailMessage
+from .emails import ACTIVATION_EMAIL_SUBJECT, NOREPLY_EMAIL, render_activation_email
+from .outbox import enqueue_email
 from .tokens import account_activation_token
 import os
 
@@ -41,38 +42,17 @@ def activate(request, uidb64, token):
 
 # ACTIVATE ACCOUNT EMAIL 
 def activateEmail(request, user, to_email):
-    context = {
-        'user': user,
-        'domain': get_current_site(request).domain,
-        'uid': urlsafe_base64_encode(force_bytes(user.pk)),
-        'token': account_activation_token.make_token(user),
-        'protocol': 'https' if request.is_secure() else 'http'
-    }
+    protocol = 'https' if request.is_secure() else 'http'
+    email_content = render_activation_email(user, get_current_site(request).domain, protocol)
 
-    email_content = render_to_string('core/acct_active_email.html', context)
+    enqueue_email(ACTIVATION_EMAIL_SUBJECT, '', NOREPLY_EMAIL, [to_email], html_message=email_content)
 
-    email_subject = 'Activate your account.'
-    recipient_list = [to_email]
-    from_email = 'allforms@limited.com'
-
-    success = send_mail(
-        email_subject,
-        '',
-        from_email,
-        recipient_list,
-        html_message=email_content,
-        fail_silently=False
+    messages.success(
+        request,
+        f"Dear {user}, Please go to your email '{to_email}' inbox and click on "
+        f"the received activation link to confirm and complete the registration. Note: Check your spam folder"
     )
 
-    if success > 0:
-        messages.success(
-            request,
-            f"Dear {user}, Please go to your email '{to_email}' inbox and click on "
-            f"the received activation link to confirm and complete the registration. Note: Check your spam folder"
-        )
-    else:
-        messages.error(request, f'There was a problem sending email to {to_email}, please make sure your email was spelt correctly.')
-
 
 #PASSWORD RESET
 def send_custom_password_reset_email(request, user):
@@ -91,14 +71,7 @@ def send_custom_password_reset_email(request, user):
     email_content = render_to_string('core/password_reset_email.html', context)
     
 
-    msg = EmailMessage(
-        subject,
-        email_content,
-        from_email,
-        [to_email],
-        # alternatives=[(email_content, 'text/html')],
-    )
-    msg.send()
+    enqueue_email(subject, email_content, from_email, [to_email])
 
 
 # HOME
@@ -171,6 +144,7 @@ def signup(request):
 class CustomPasswordResetView(PasswordResetView):
     template_name = 'core/password_reset_form.html'
     email_template_name = 'core/password_reset_email.html'
+    form_class = QueuedPasswordResetForm
 
     def form_valid(self, form):
         response = super().form_valid(form)
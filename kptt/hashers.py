@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher, ScryptPasswordHasher
+
+
+# Costs come from settings, so they can be tuned per host (see the
+# bench_hashers command). Hashes made at another cost still verify and are
+# rehashed at the configured cost on the user's next login.
+class TunedScryptPasswordHasher(ScryptPasswordHasher):
+    @property
+    def work_factor(self):
+        return settings.PASSWORD_SCRYPT_WORK_FACTOR
+
+    # Only a ceiling: scrypt needs 128 * n * r bytes and OpenSSL's 32 MiB
+    # default would refuse n above 2**14, including older, costlier hashes.
+    maxmem = 256 * 1024 * 1024
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    @property
+    def time_cost(self):
+        return settings.PASSWORD_ARGON2_TIME_COST
+
+    @property
+    def memory_cost(self):
+        return settings.PASSWORD_ARGON2_MEMORY_COST
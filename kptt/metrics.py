@@ -0,0 +1,95 @@
+import bisect
+import threading
+from contextvars import ContextVar
+from time import perf_counter
+
+
+# Upper bounds (ms) of the wall time histogram buckets; the last is open
+LATENCY_BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class RequestTimings:
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+
+    def record_query(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.sql_time += perf_counter() - start
+
+
+current_timings = ContextVar("current_timings", default=None)
+
+
+def record_template_time(seconds):
+    timings = current_timings.get()
+    if timings is not None:
+        timings.template_time += seconds
+
+
+class ViewStats:
+    def __init__(self):
+        self.requests = 0
+        self.over_budget = 0
+        self.queries = 0
+        self.max_queries = 0
+        self.wall_ms = 0.0
+        self.max_wall_ms = 0.0
+        self.sql_ms = 0.0
+        self.template_ms = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def add(self, queries, wall_ms, sql_ms, template_ms, over_budget):
+        self.requests += 1
+        self.over_budget += over_budget
+        self.queries += queries
+        self.max_queries = max(self.max_queries, queries)
+        self.wall_ms += wall_ms
+        self.max_wall_ms = max(self.max_wall_ms, wall_ms)
+        self.sql_ms += sql_ms
+        self.template_ms += template_ms
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS, wall_ms)] += 1
+
+    def as_dict(self):
+        requests = self.requests or 1
+        return {
+            "requests": self.requests,
+            "over_query_budget": self.over_budget,
+            "avg_queries": round(self.queries / requests, 2),
+            "max_queries": self.max_queries,
+            "avg_wall_ms": round(self.wall_ms / requests, 2),
+            "max_wall_ms": round(self.max_wall_ms, 2),
+            "avg_sql_ms": round(self.sql_ms / requests, 2),
+            "avg_template_ms": round(self.template_ms / requests, 2),
+            "wall_ms_histogram": {
+                **{f"le_{bound}": count for bound, count in zip(LATENCY_BUCKETS, self.buckets)},
+                "inf": self.buckets[-1],
+            },
+        }
+
+
+class MetricsRegistry:
+    # Per-process aggregates; each worker keeps its own
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def record(self, view_name, *args):
+        with self._lock:
+            self._views.setdefault(view_name, ViewStats()).add(*args)
+
+    def snapshot(self):
+        with self._lock:
+            return {name: stats.as_dict() for name, stats in sorted(self._views.items())}
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+
+
+registry = MetricsRegistry()
@@ -0,0 +1,177 @@
+import logging
+import mimetypes
+import os
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from time import perf_counter
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils.cache import patch_vary_headers
+
+from .metrics import RequestTimings, current_timings, registry
+from .storage import COMPRESSED_SUFFIXES
+from .streaming import file_etag, stream_file
+
+
+logger = logging.getLogger("kptt.metrics")
+
+
+class RequestMetricsMiddleware:
+    # Per-view query count, SQL, template and wall time, exposed as a
+    # Server-Timing header and aggregated in kptt.metrics.registry.
+    def __init__(self, get_response):
+        if not getattr(settings, "REQUEST_METRICS_ENABLED", True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.query_budget = getattr(settings, "REQUEST_METRICS_QUERY_BUDGET", None)
+
+    def __call__(self, request):
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        start = perf_counter()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(
+                        connections[alias].execute_wrapper(timings.record_query)
+                    )
+                response = self.get_response(request)
+        finally:
+            current_timings.reset(token)
+        wall_ms = (perf_counter() - start) * 1000
+        sql_ms = timings.sql_time * 1000
+        template_ms = timings.template_time * 1000
+
+        match = request.resolver_match
+        view_name = match.view_name if match else "unresolved"
+
+        over_budget = (
+            self.query_budget is not None and timings.queries > self.query_budget
+        )
+        if over_budget:
+            logger.warning(
+                "%s ran %d queries, over the budget of %d (%s)",
+                view_name,
+                timings.queries,
+                self.query_budget,
+                request.path,
+            )
+
+        registry.record(view_name, timings.queries, wall_ms, sql_ms, template_ms, over_budget)
+
+        server_timing = (
+            f'db;dur={sql_ms:.1f};desc="{timings.queries} queries", '
+            f"tpl;dur={template_ms:.1f}, "
+            f"total;dur={wall_ms:.1f}"
+        )
+        if response.has_header("Server-Timing"):
+            server_timing = f"{response['Server-Timing']}, {server_timing}"
+        response["Server-Timing"] = server_timing
+        return response
+
+
+# STATIC FILES
+@dataclass
+class StaticFile:
+    path: str
+    content_type: str
+    last_modified: float
+    etag: str
+    immutable: bool
+    # {encoding: path} of the precompressed siblings, best first
+    encodings: dict = field(default_factory=dict)
+
+
+def accepted_encodings(request):
+    accepted = set()
+    for part in request.headers.get("Accept-Encoding", "").split(","):
+        encoding, _, params = part.strip().partition(";")
+        quality = params.strip().removeprefix("q=")
+        if params and quality.replace(".", "", 1).isdigit() and float(quality) == 0:
+            continue
+        accepted.add(encoding.strip().lower())
+    return accepted
+
+
+class StaticFilesMiddleware:
+    # Serve collectstatic output from STATIC_ROOT without a separate web
+    # server. Hashed names from the manifest are cached forever; a .br or .gz
+    # sibling is sent when the client accepts it.
+    def __init__(self, get_response):
+        root = settings.STATIC_ROOT
+        if not getattr(settings, "STATIC_SERVE_ENABLED", True) or not root or not os.path.isdir(root):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.prefix = "/" + settings.STATIC_URL.lstrip("/")
+        self.max_age = getattr(settings, "STATIC_MAX_AGE", 60)
+        self.immutable_max_age = getattr(settings, "STATIC_IMMUTABLE_MAX_AGE", 365 * 24 * 60 * 60)
+        self.files = self.index_files(root)
+
+    def index_files(self, root):
+        hashed_names = set(getattr(staticfiles_storage, "hashed_files", {}).values())
+        suffixes = tuple(COMPRESSED_SUFFIXES.values())
+        files = {}
+        for directory, _, filenames in os.walk(root):
+            for filename in filenames:
+                if filename.endswith(suffixes):
+                    continue
+                path = os.path.join(directory, filename)
+                name = os.path.relpath(path, root).replace(os.sep, "/")
+                stat = os.stat(path)
+                content_type, encoding = mimetypes.guess_type(filename)
+                if encoding:
+                    content_type = "application/octet-stream"
+                encodings = {
+                    encoding: path + suffix
+                    for encoding, suffix in COMPRESSED_SUFFIXES.items()
+                    if os.path.isfile(path + suffix)
+                }
+                # Compressed variants share one ETag, so it can only be weak
+                etag = file_etag(stat)
+                files[self.prefix + name] = StaticFile(
+                    path=path,
+                    content_type=content_type or "application/octet-stream",
+                    last_modified=stat.st_mtime,
+                    etag=f"W/{etag}" if encodings else etag,
+                    immutable=name in hashed_names,
+                    encodings=encodings,
+                )
+        return files
+
+    def __call__(self, request):
+        if request.method in ("GET", "HEAD"):
+            static_file = self.files.get(request.path_info)
+            if static_file is not None:
+                return self.serve(request, static_file)
+        return self.get_response(request)
+
+    def serve(self, request, static_file):
+        path = static_file.path
+        content_encoding = None
+        # Byte ranges (video seeking) are always served from the original
+        if "Range" not in request.headers:
+            accepted = accepted_encodings(request)
+            for encoding, compressed_path in static_file.encodings.items():
+                if encoding in accepted:
+                    path, content_encoding = compressed_path, encoding
+                    break
+        response = stream_file(
+            request,
+            path,
+            static_file.content_type,
+            etag=static_file.etag,
+            last_modified=static_file.last_modified,
+        )
+        if content_encoding and response.status_code == 200:
+            response["Content-Encoding"] = content_encoding
+        if static_file.encodings:
+            patch_vary_headers(response, ("Accept-Encoding",))
+        if static_file.immutable:
+            response["Cache-Control"] = f"public, max-age={self.immutable_max_age}, immutable"
+        else:
+            response["Cache-Control"] = f"public, max-age={self.max_age}"
+        response["X-Content-Type-Options"] = "nosniff"
+        return response
@@ -0,0 +1,64 @@
+import traceback
+
+from django.db.models import F
+from django.utils import timezone
+
+
+class WorkQueue:
+    # Claiming, retrying and requeueing the rows of a DB-backed work queue
+    # (learn.jobs, core.outbox). The model needs status, attempts,
+    # max_attempts, last_error, run_after and started_at fields; each queue
+    # names its own statuses.
+    def __init__(self, model, pending, running, failed, retry_delay, retry_backoff):
+        self.model = model
+        self.pending = pending
+        self.running = running
+        self.failed = failed
+        self.retry_delay = retry_delay
+        self.retry_backoff = retry_backoff
+
+    def release_stale(self, stale_after, queryset=None):
+        # Rows still running after stale_after belong to a worker that died
+        queryset = self.model.objects.all() if queryset is None else queryset
+        return queryset.filter(
+            status=self.running, started_at__lt=timezone.now() - stale_after
+        ).update(status=self.pending)
+
+    def claim(self, limit):
+        now = timezone.now()
+        pending = (
+            self.model.objects.filter(status=self.pending, run_after__lte=now)
+            .order_by("run_after", "id")
+            .values_list("id", flat=True)[:limit]
+        )
+        # The conditional update makes each claim atomic across workers
+        claimed = [
+            pk
+            for pk in pending
+            if self.model.objects.filter(pk=pk, status=self.pending).update(
+                status=self.running, started_at=now, attempts=F("attempts") + 1
+            )
+        ]
+        return list(self.model.objects.filter(pk__in=claimed).order_by("run_after", "id"))
+
+    def requeue(self, queryset, **fields):
+        # Run the rows again from scratch; running ones are left alone
+        return queryset.exclude(status=self.running).update(
+            status=self.pending,
+            attempts=0,
+            last_error="",
+            run_after=timezone.now(),
+            started_at=None,
+            **fields,
+        )
+
+    def fail(self, row):
+        # Record the exception being handled on row and schedule a retry, or
+        # give the row up once its attempts are used. True when it is retried.
+        row.last_error = traceback.format_exc()
+        if row.attempts >= row.max_attempts:
+            row.status = self.failed
+            return False
+        row.status = self.pending
+        row.run_after = timezone.now() + self.retry_delay * self.retry_backoff ** (row.attempts - 1)
+        return True
@@ -30,13 +30,16 @@ INSTALLED_APPS = [
     "django.contrib.contenttypes",
     "django.contrib.sessions",
     "django.contrib.messages",
-    "django.contrib.staticfiles",
+    # Before staticfiles: its collectstatic builds the Tailwind CSS first
     "core",
+    "django.contrib.staticfiles",
     "learn",
 ]
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "kptt.middleware.StaticFilesMiddleware",
+    "kptt.middleware.RequestMetricsMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -49,7 +52,7 @@ ROOT_URLCONF = "kptt.urls"
 
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        "BACKEND": "kptt.template_backends.TimedDjangoTemplates",
         "DIRS": [BASE_DIR / "templates"],
         "APP_DIRS": True,
         "OPTIONS": {
@@ -65,6 +68,11 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "kptt.wsgi.application"
 
+# Request metrics (kptt.middleware.RequestMetricsMiddleware), served at /metrics/
+REQUEST_METRICS_ENABLED = True
+# Views running more queries than this are logged to "kptt.metrics"
+REQUEST_METRICS_QUERY_BUDGET = 20
+
 
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
@@ -77,6 +85,36 @@ DATABASES = {
 }
 
 
+# Cache
+# KPTT_CACHE picks the backend shared by quiz snapshots, grade catalogs and
+# student lists: "locmem" (default, per process), "file" (shared by all
+# workers on one host, in KPTT_CACHE_LOCATION) or "redis" (any
+# Redis-compatible server at KPTT_CACHE_LOCATION; needs the redis package).
+# Run `manage.py warm_cache` after a deploy to fill it.
+CACHE_BACKENDS = {
+    "locmem": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "file": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.environ.get("KPTT_CACHE_LOCATION", str(BASE_DIR / "cache")),
+        "OPTIONS": {"MAX_ENTRIES": 10000},
+    },
+    "redis": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.environ.get("KPTT_CACHE_LOCATION", "redis://127.0.0.1:6379/1"),
+    },
+}
+
+CACHES = {
+    "default": {
+        **CACHE_BACKENDS[os.environ.get("KPTT_CACHE", "locmem")],
+        "KEY_PREFIX": "kptt",
+        "TIMEOUT": 60 * 60,
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -96,6 +134,22 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Password hashing
+# Argon2 hashes new passwords. Scrypt and PBKDF2 hashes keep working and are
+# upgraded on the user's next login. Measure the costs below on the target
+# host with `manage.py bench_hashers`.
+PASSWORD_SCRYPT_WORK_FACTOR = 2**14
+PASSWORD_ARGON2_TIME_COST = 2
+PASSWORD_ARGON2_MEMORY_COST = 64 * 1024
+
+PASSWORD_HASHERS = [
+    "kptt.hashers.TunedArgon2PasswordHasher",
+    "kptt.hashers.TunedScryptPasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+]
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/4.2/topics/i18n/
 
@@ -121,6 +175,26 @@ STATICFILES_DIRS = [
     os.path.join(BASE_DIR, "static"),
 ]
 
+# collectstatic writes content-hashed names and .gz/.br copies here, served by
+# kptt.middleware.StaticFilesMiddleware (brotli is used when installed)
+STATIC_ROOT = os.path.join(BASE_DIR, "staticfiles")
+
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "kptt.storage.CompressedManifestStaticFilesStorage"},
+}
+
+# Seconds browsers may cache unhashed and hashed static files
+STATIC_MAX_AGE = 60
+STATIC_IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+
+# Chapter videos are packaged as HLS with these binaries (learn.hls); a run
+# that takes longer than HLS_TIMEOUT seconds fails and is retried
+HLS_FFMPEG = "ffmpeg"
+HLS_FFPROBE = "ffprobe"
+HLS_TIMEOUT = 2 * 60 * 60
+
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
@@ -0,0 +1,55 @@
+import gzip
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+# Text formats worth precompressing; images like png/avif are compressed already
+COMPRESSIBLE_EXTENSIONS = {".css", ".js", ".mjs", ".map", ".svg", ".json", ".txt", ".html", ".xml", ".ico"}
+COMPRESSED_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+
+def compress(data):
+    # {encoding: bytes} for each encoding that makes the file smaller
+    variants = {"gzip": gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants["br"] = brotli.compress(data, quality=11)
+    return {
+        encoding: compressed
+        for encoding, compressed in variants.items()
+        if len(compressed) < len(data) * 0.95
+    }
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    # Content-hashed names (app.3f2a9c.css) plus .gz/.br siblings written at
+    # collectstatic time, served by kptt.middleware.StaticFilesMiddleware.
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        names = set(paths) | set(self.hashed_files.values())
+        for name in sorted(names):
+            if os.path.splitext(name)[1].lower() in COMPRESSIBLE_EXTENSIONS:
+                self.compress_file(name)
+
+    def compress_file(self, name):
+        path = self.path(name)
+        if not os.path.isfile(path):
+            return
+        with open(path, "rb") as f:
+            data = f.read()
+        variants = compress(data)
+        for encoding, suffix in COMPRESSED_SUFFIXES.items():
+            compressed_path = path + suffix
+            if encoding in variants:
+                with open(compressed_path, "wb") as f:
+                    f.write(variants[encoding])
+            elif os.path.exists(compressed_path):
+                os.remove(compressed_path)
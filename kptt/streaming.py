@@ -0,0 +1,123 @@
+import os
+import re
+
+from django.http import FileResponse, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+
+
+# Large enough to keep syscalls down when sendfile is not available, small
+# enough that each open stream holds little memory
+STREAM_BLOCK_SIZE = 64 * 1024
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class RangeFile:
+    # A file positioned at the start of a byte range that reads no further
+    # than its end. It keeps fileno() so a WSGI server can still sendfile()
+    # from the current offset for Content-Length bytes.
+    def __init__(self, file, start, length):
+        self.file = file
+        self.file.seek(start)
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def file_etag(stat):
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def parse_range(header, size):
+    # (start, end) of a single "bytes=" range, inclusive. None means the
+    # header should be ignored and the whole file sent; ValueError means
+    # the range cannot be satisfied (416).
+    match = RANGE_RE.match(header.replace(" ", ""))
+    if match is None:
+        # Malformed, or several ranges: answering 200 is always allowed
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if first and last and int(last) < int(first):
+        # "bytes=5-2" is not a valid range, so the header is ignored
+        return None
+    if size == 0:
+        # An empty file has no bytes to select; send it whole
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise ValueError(header)
+        return max(size - length, 0), size - 1
+    start = int(first)
+    if start >= size:
+        raise ValueError(header)
+    end = min(int(last), size - 1) if last else size - 1
+    return start, end
+
+
+def if_range_matches(request, etag, last_modified):
+    # A Range is only honored when If-Range (if sent) still names this version
+    value = request.headers.get("If-Range")
+    if value is None:
+        return True
+    if value.startswith(('"', "W/")):
+        # If-Range needs a strong comparison
+        return not etag.startswith("W/") and value == etag
+    return parse_http_date_safe(value) == int(last_modified)
+
+
+def stream_file(request, path, content_type, etag=None, last_modified=None):
+    # Serve a file on disk with byte-range (206), conditional GET (304) and
+    # sendfile-friendly FileResponse delivery. etag/last_modified default to
+    # the file's own; precompressed copies pass the original's.
+    stat = os.stat(path)
+    etag = etag or file_etag(stat)
+    last_modified = int(last_modified or stat.st_mtime)
+    size = stat.st_size
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        response["Accept-Ranges"] = "bytes"
+        return response
+
+    byte_range = None
+    range_header = request.headers.get("Range")
+    if range_header and request.method == "GET" and if_range_matches(request, etag, last_modified):
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            response["Accept-Ranges"] = "bytes"
+            return response
+
+    file = open(path, "rb")
+    if byte_range is None:
+        response = FileResponse(file, content_type=content_type)
+        response["Content-Length"] = size
+    else:
+        start, end = byte_range
+        response = FileResponse(RangeFile(file, start, end - start + 1), content_type=content_type, status=206)
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+        response["Content-Length"] = end - start + 1
+    response.block_size = STREAM_BLOCK_SIZE
+    response.headers.pop("Content-Disposition", None)
+    response["Accept-Ranges"] = "bytes"
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    return response
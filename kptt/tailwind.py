@@ -0,0 +1,34 @@
+import subprocess
+
+from django.conf import settings
+
+
+# The stylesheet every layout links. Built from TAILWIND_INPUT by the
+# standalone Tailwind CLI that the tailwindcss-bin wheel pins (see
+# requirements.txt), so no Node.js toolchain is needed.
+TAILWIND_INPUT = settings.BASE_DIR / "assets" / "css" / "tailwind.css"
+TAILWIND_OUTPUT = settings.BASE_DIR / "static" / "css" / "build" / "app.css"
+
+
+class TailwindError(Exception):
+    pass
+
+
+def tailwind_command(watch=False):
+    try:
+        from tailwindcss_bin import find_tailwindcss_bin
+    except ImportError:
+        raise TailwindError("tailwindcss-bin is not installed, run pip install -r requirements.txt")
+    command = [
+        find_tailwindcss_bin(),
+        "--input", str(TAILWIND_INPUT),
+        "--output", str(TAILWIND_OUTPUT),
+    ]
+    return command + (["--watch"] if watch else ["--minify"])
+
+
+def build_css():
+    result = subprocess.run(tailwind_command(), capture_output=True, text=True, cwd=settings.BASE_DIR)
+    if result.returncode or not TAILWIND_OUTPUT.exists():
+        raise TailwindError(f"Tailwind build failed: {result.stderr.strip()}")
+    return TAILWIND_OUTPUT
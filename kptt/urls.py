@@ -5,9 +5,13 @@ from django.conf.urls.static import static
 from django.views.generic.base import RedirectView
 from django.conf import settings
 
+from .views import VIDEO_MEDIA_DIRECTORY, request_metrics, serve_video
+
 
 urlpatterns = [
     path("admin/", admin.site.urls),
+    path("metrics/", request_metrics, name="request_metrics"),
+    path(settings.MEDIA_URL.lstrip("/") + VIDEO_MEDIA_DIRECTORY + "<path:name>", serve_video, name="video"),
     path("", include("core.urls")),
     path("", RedirectView.as_view(url=""), name="index"),
     path("learn/", include("learn.urls")),
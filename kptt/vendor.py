@@ -0,0 +1,209 @@
+import hashlib
+import json
+import posixpath
+import re
+from urllib.parse import urljoin, urlsplit
+from urllib.request import Request, urlopen
+
+from django.conf import settings
+
+
+# Third-party JS/CSS and fonts pinned in vendor.lock.json. `vendor_assets
+# --lock` downloads them into static/vendor/ and records their hashes;
+# `vendor_assets` then builds one bundle per layout from those files offline.
+LOCKFILE = settings.BASE_DIR / "vendor.lock.json"
+VENDOR_ROOT = settings.BASE_DIR / "static" / "vendor"
+BUNDLE_DIR = "vendor/bundles"
+
+# Font CSS is served per browser, so ask for the woff2 a current browser gets
+USER_AGENT = (
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/126.0 Safari/537.36"
+)
+CSS_URL_RE = re.compile(r"""url\(\s*(['"]?)([^'")]+?)\1\s*\)""")
+CSS_COMMENT_RE = re.compile(r"/\*(?!!).*?\*/", re.S)
+FONT_FACE_RE = re.compile(r"@font-face\s*{[^}]*}")
+SOURCE_MAP_RE = re.compile(r"^[ \t]*//# sourceMappingURL=.*$", re.M)
+
+
+class VendorError(Exception):
+    pass
+
+
+def load_lock():
+    with open(LOCKFILE) as f:
+        return json.load(f)
+
+
+def save_lock(lock):
+    with open(LOCKFILE, "w") as f:
+        json.dump(lock, f, indent=2)
+        f.write("\n")
+
+
+def sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def fetch(url):
+    with urlopen(Request(url, headers={"User-Agent": USER_AGENT}), timeout=30) as response:
+        return response.read()
+
+
+def source_path(name, asset):
+    return VENDOR_ROOT / "src" / name / asset["file"]
+
+
+def read_locked(path, digest):
+    if digest is None:
+        raise VendorError(f"{path.name} is not locked yet, run vendor_assets --lock")
+    try:
+        data = path.read_bytes()
+    except FileNotFoundError:
+        raise VendorError(f"{path} is missing, run vendor_assets --lock") from None
+    if sha256(data) != digest:
+        raise VendorError(f"{path} does not match its sha256 in {LOCKFILE.name}")
+    return data
+
+
+def _split_ref(ref):
+    # ("fonts/x.eot", "?#iefix") so the suffix survives rewriting
+    match = re.match(r"([^?#]*)(.*)", ref)
+    return match.group(1), match.group(2)
+
+
+def css_refs(css, base_url):
+    # Absolute urls of the files a stylesheet points at, in order
+    refs = []
+    for _, ref in CSS_URL_RE.findall(css):
+        path, _ = _split_ref(ref.strip())
+        if not path or ref.startswith("data:"):
+            continue
+        url = urljoin(base_url, path)
+        if url not in refs:
+            refs.append(url)
+    return refs
+
+
+def _font_faces(css, base_url):
+    # (weight, style, woff2 url) of every @font-face block
+    for block in FONT_FACE_RE.findall(css):
+        weight = re.search(r"font-weight\s*:\s*([^;}]+)", block)
+        style = re.search(r"font-style\s*:\s*([^;}]+)", block)
+        for url in css_refs(block, base_url):
+            if urlsplit(url).path.endswith(".woff2"):
+                yield (
+                    weight.group(1).strip() if weight else "400",
+                    style.group(1).strip() if style else "normal",
+                    url,
+                )
+
+
+def lock_asset(name, asset):
+    # Download one asset (and the fonts its CSS uses) and record the hashes
+    data = fetch(asset["url"])
+    path = source_path(name, asset)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    asset["sha256"] = sha256(data)
+    if "files" not in asset:
+        return asset
+
+    css = data.decode()
+    preload = {
+        url
+        for weight, style, url in _font_faces(css, asset["url"])
+        if weight in asset.get("preload", ()) and style == "normal"
+    }
+    files = {}
+    used = set()
+    for url in css_refs(css, asset["url"]):
+        content = fetch(url)
+        basename = posixpath.basename(urlsplit(url).path) or "file"
+        stem, ext = posixpath.splitext(basename)
+        counter = 1
+        while basename in used:
+            counter += 1
+            basename = f"{stem}-{counter}{ext}"
+        used.add(basename)
+        file = f"fonts/{name}/{basename}"
+        (VENDOR_ROOT / file).parent.mkdir(parents=True, exist_ok=True)
+        (VENDOR_ROOT / file).write_bytes(content)
+        files[url] = {"file": file, "sha256": sha256(content)}
+        if url in preload:
+            files[url]["preload"] = True
+    asset["files"] = files
+    return asset
+
+
+def rewrite_css(css, asset):
+    # Point url()s at the vendored copies, relative to the bundle directory,
+    # and make sure text renders in a fallback font while fonts load
+    def local(match):
+        quote, ref = match.groups()
+        path, suffix = _split_ref(ref.strip())
+        locked = asset["files"].get(urljoin(asset["url"], path)) if path else None
+        if locked is None:
+            return match.group(0)
+        return f"url({quote}../{locked['file']}{suffix}{quote})"
+
+    def swap(match):
+        block = match.group(0)
+        if "font-display" in block:
+            return block
+        return block[:-1].rstrip().rstrip(";") + ";font-display:swap}"
+
+    css = CSS_URL_RE.sub(local, css)
+    css = FONT_FACE_RE.sub(swap, css)
+    css = CSS_COMMENT_RE.sub("", css)
+    return "\n".join(line.strip() for line in css.splitlines() if line.strip())
+
+
+def build_bundle(lock, bundle):
+    # {extension: content} for one bundle, from the locked sources
+    assets = lock["assets"]
+    parts = {"css": [], "js": []}
+    for name in lock["bundles"][bundle]["css"]:
+        asset = assets[name]
+        data = read_locked(source_path(name, asset), asset["sha256"])
+        for locked in asset["files"].values():
+            read_locked(VENDOR_ROOT / locked["file"], locked["sha256"])
+        parts["css"].append(f"/*! {name} {asset['version']} */\n{rewrite_css(data.decode(), asset)}")
+    for name in lock["bundles"][bundle]["js"]:
+        asset = assets[name]
+        data = read_locked(source_path(name, asset), asset["sha256"])
+        js = SOURCE_MAP_RE.sub("", data.decode()).strip()
+        parts["js"].append(f"/*! {name} {asset['version']} */\n{js}\n;")
+    return {extension: "\n".join(chunks) + "\n" for extension, chunks in parts.items() if chunks}
+
+
+def write_bundles(lock, bundles=None):
+    written = []
+    for bundle in bundles or lock["bundles"]:
+        for extension, content in build_bundle(lock, bundle).items():
+            path = VENDOR_ROOT / "bundles" / f"{bundle}.{extension}"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(content)
+            written.append(path)
+    return written
+
+
+def bundle_locked(lock, bundle):
+    # Whether every asset of a bundle (and the files its CSS uses) has a
+    # recorded sha256, so the bundle can be built offline
+    return all(
+        lock["assets"][name]["sha256"]
+        and all(locked["sha256"] for locked in lock["assets"][name].get("files", {}).values())
+        for kind in ("css", "js")
+        for name in lock["bundles"][bundle][kind]
+    )
+
+
+def preload_files(lock, bundle):
+    # Static paths of the fonts worth fetching before the CSS asks for them
+    return [
+        f"vendor/{locked['file']}"
+        for name in lock["bundles"][bundle]["css"]
+        for locked in lock["assets"][name].get("files", {}).values()
+        if locked.get("preload")
+    ]
@@ -0,0 +1,44 @@
+import mimetypes
+import os
+import posixpath
+
+from django.contrib.admin.views.decorators import staff_member_required
+from django.contrib.auth.decorators import login_required
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.http import Http404, JsonResponse
+from django.views.decorators.http import require_safe
+
+from .metrics import registry
+from .streaming import stream_file
+
+
+# Chapter videos and their HLS packages (learn.hls) live under this media
+# directory. Other uploads are left to the web server, or to static() while
+# DEBUG is on.
+VIDEO_MEDIA_DIRECTORY = "learn/chapter/videos/"
+
+@staff_member_required
+def request_metrics(request):
+    if request.method == "POST" and request.POST.get("reset"):
+        registry.reset()
+    return JsonResponse(registry.snapshot())
+
+
+@login_required
+@require_safe
+def serve_video(request, name):
+    # Lesson videos for signed-in users, with Range support for seeking
+    name = posixpath.normpath(VIDEO_MEDIA_DIRECTORY + name)
+    if not name.startswith(VIDEO_MEDIA_DIRECTORY):
+        raise Http404("No such file.")
+    try:
+        path = default_storage.path(name)
+    except (NotImplementedError, SuspiciousFileOperation):
+        raise Http404("No such file.")
+    if not os.path.isfile(path):
+        raise Http404("No such file.")
+    content_type, encoding = mimetypes.guess_type(path)
+    if encoding:
+        content_type = "application/octet-stream"
+    return stream_file(request, path, content_type or "application/octet-stream")
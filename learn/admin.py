@@ -1,4 +1,6 @@
 from django.contrib import admin
+from .grading import regrade_quiz
+from .jobs import requeue_media_jobs
 from .models import (
     Teacher,
     Grade,
@@ -7,11 +9,15 @@ from .models import (
     Chapter,
     Student,
     StudentChapterCompletion,
+    StudentTopicProgress,
+    StudentSubjectProgress,
     Quotes,
     ChapterQuiz,
     ChapterStudentResponse,
     ChapterQuestion,
     ChapterChoice,
+    QuizAttempt,
+    MediaJob,
 )
 
 
@@ -55,6 +61,23 @@ class StudentProgressAdmin(admin.ModelAdmin):
         return obj.chapter.name
 
 
+class StudentTopicProgressAdmin(admin.ModelAdmin):
+    list_display = ("student", "topic", "completed_chapters", "total_chapters")
+    list_filter = ("student",)
+
+
+class StudentSubjectProgressAdmin(admin.ModelAdmin):
+    list_display = (
+        "student",
+        "subject",
+        "completed_topics",
+        "total_topics",
+        "completed_chapters",
+        "total_chapters",
+    )
+    list_filter = ("student",)
+
+
 class QuotesAdmin(admin.ModelAdmin):
     list_display = ("quote", "author")
 
@@ -68,6 +91,33 @@ class ChapterQuestionAdmin(admin.ModelAdmin):
     inlines = [ChapterChoiceInline]
 
 
+class ChapterQuizAdmin(admin.ModelAdmin):
+    list_display = ("title", "chapter", "publish")
+    actions = ["regrade_attempts"]
+
+    @admin.action(description="Regrade latest attempts")
+    def regrade_attempts(self, request, queryset):
+        regraded = sum(regrade_quiz(quiz) for quiz in queryset)
+        self.message_user(request, f"Regraded {regraded} attempts.")
+
+
+class QuizAttemptAdmin(admin.ModelAdmin):
+    list_display = ("student", "quiz", "score", "total", "percentage", "date_submitted")
+    list_filter = ("quiz",)
+
+
+class MediaJobAdmin(admin.ModelAdmin):
+    list_display = ("kind", "file_name", "status", "attempts", "run_after", "finished_at")
+    list_filter = ("status", "kind")
+    search_fields = ("file_name",)
+    readonly_fields = ("attempts", "last_error", "started_at", "finished_at", "date_created")
+    actions = ["requeue"]
+
+    @admin.action(description="Re-enqueue selected jobs")
+    def requeue(self, request, queryset):
+        requeued = requeue_media_jobs(queryset)
+        self.message_user(request, f"Re-enqueued {requeued} jobs.")
+
 
 # Register your models here.
 admin.site.register(Teacher, TeacherAdmin)
@@ -77,7 +127,11 @@ admin.site.register(Topic, TopicAdmin)
 admin.site.register(Chapter, ChapterAdmin)
 admin.site.register(Student, StudentAdmin)
 admin.site.register(StudentChapterCompletion, StudentProgressAdmin)
+admin.site.register(StudentTopicProgress, StudentTopicProgressAdmin)
+admin.site.register(StudentSubjectProgress, StudentSubjectProgressAdmin)
 admin.site.register(Quotes, QuotesAdmin)
-admin.site.register(ChapterQuiz)
+admin.site.register(ChapterQuiz, ChapterQuizAdmin)
 admin.site.register(ChapterQuestion, ChapterQuestionAdmin)
-admin.site.register(ChapterStudentResponse)
\ No newline at end of file
+admin.site.register(ChapterStudentResponse)
+admin.site.register(QuizAttempt, QuizAttemptAdmin)
+admin.site.register(MediaJob, MediaJobAdmin)
@@ -0,0 +1,72 @@
+import statistics
+import time
+from dataclasses import dataclass, field
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+# Benchmarks roll back the rows they generate. Their cache entries (quiz
+# snapshots, catalogs, student lists) go to this private in-memory cache so
+# none of them outlive the rollback in the shared cache.
+BENCHMARK_CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "benchmarks",
+        "KEY_PREFIX": "kptt",
+        "TIMEOUT": 60 * 60,
+    },
+}
+
+
+@dataclass
+class Scenario:
+    name: str
+    url: str
+    method: str = "get"
+    data: dict = field(default_factory=dict)
+    status: int = 200
+
+
+def percentile(values, fraction):
+    # Nearest-rank percentile of an already sorted list
+    if not values:
+        return 0.0
+    rank = max(int(round(fraction * len(values) + 0.5)) - 1, 0)
+    return values[min(rank, len(values) - 1)]
+
+
+def summarize(timings, queries):
+    timings = sorted(timings)
+    elapsed = sum(timings) / 1000
+    return {
+        "requests": len(timings),
+        "p50_ms": round(statistics.median(timings), 2) if timings else 0.0,
+        "p95_ms": round(percentile(timings, 0.95), 2),
+        "mean_ms": round(statistics.fmean(timings), 2) if timings else 0.0,
+        "max_ms": round(timings[-1], 2) if timings else 0.0,
+        "max_queries": max(queries, default=0),
+        "min_queries": min(queries, default=0),
+        "throughput_rps": round(len(timings) / elapsed, 2) if elapsed else 0.0,
+    }
+
+
+def run_scenario(client, scenario, repeat, warmup=1):
+    # Warm-up requests fill lazy rollups and caches and are not measured
+    request = getattr(client, scenario.method)
+    for _ in range(warmup):
+        request(scenario.url, scenario.data)
+
+    timings = []
+    queries = []
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            response = request(scenario.url, scenario.data)
+            timings.append((time.perf_counter() - start) * 1000)
+        if response.status_code != scenario.status:
+            raise AssertionError(
+                f"{scenario.name}: expected {scenario.status}, got {response.status_code}"
+            )
+        queries.append(len(captured.captured_queries))
+    return summarize(timings, queries)
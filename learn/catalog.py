@@ -0,0 +1,102 @@
+from dataclasses import dataclass
+
+from django.db.models import Count, Prefetch
+
+from .models import Subject, Topic
+from .versioning import bump_cache_version, versioned_cache
+
+
+GRADE_CATALOG_TIMEOUT = 60 * 60 * 24
+
+
+# GRADE CATALOG
+@dataclass(frozen=True)
+class TopicEntry:
+    id: int
+    name: str
+    topic_slug: str
+    description: str
+    thumbnail: str
+    thumbnail_widths: tuple
+    number_of_chapters: int
+
+
+@dataclass(frozen=True)
+class SubjectEntry:
+    id: int
+    name: str
+    subject_slug: str
+    description: str
+    # Storage name of the thumbnail; {% responsive_image %} accepts it as is
+    thumbnail: str
+    thumbnail_widths: tuple
+    topics: tuple
+
+    @property
+    def number_of_topics(self):
+        return len(self.topics)
+
+    @property
+    def number_of_chapters(self):
+        return sum(topic.number_of_chapters for topic in self.topics)
+
+
+def _catalog_prefix(grade_id):
+    return f"learn:grade:{grade_id}:catalog"
+
+
+def invalidate_grade_catalog(grade_id):
+    bump_cache_version(_catalog_prefix(grade_id))
+
+
+def invalidate_subject_catalogs(subject_ids):
+    grade_ids = Subject.objects.filter(pk__in=subject_ids).values_list("grade_id", flat=True)
+    for grade_id in set(grade_ids):
+        invalidate_grade_catalog(grade_id)
+
+
+def invalidate_topic_catalogs(topic_ids):
+    grade_ids = Topic.objects.filter(pk__in=topic_ids).values_list("subject__grade_id", flat=True)
+    for grade_id in set(grade_ids):
+        invalidate_grade_catalog(grade_id)
+
+
+def build_grade_catalog(grade_id):
+    # Subjects of a grade with their topics and chapter counts, in two queries
+    topics = Topic.objects.annotate(number_of_chapters=Count("chapters")).order_by("id")
+    subjects = (
+        Subject.objects.filter(grade_id=grade_id)
+        .prefetch_related(Prefetch("topics", queryset=topics))
+        .order_by("id")
+    )
+    return tuple(
+        SubjectEntry(
+            id=subject.id,
+            name=subject.name,
+            subject_slug=subject.subject_slug,
+            description=subject.description or "",
+            thumbnail=subject.thumbnail.name,
+            thumbnail_widths=tuple(subject.thumbnail_widths or ()),
+            topics=tuple(
+                TopicEntry(
+                    id=topic.id,
+                    name=topic.name,
+                    topic_slug=topic.topic_slug,
+                    description=topic.description or "",
+                    thumbnail=topic.thumbnail.name,
+                    thumbnail_widths=tuple(topic.thumbnail_widths or ()),
+                    number_of_chapters=topic.number_of_chapters,
+                )
+                for topic in subject.topics.all()
+            ),
+        )
+        for subject in subjects
+    )
+
+
+def grade_catalog(grade_id):
+    return versioned_cache(
+        _catalog_prefix(grade_id),
+        lambda version: build_grade_catalog(grade_id),
+        GRADE_CATALOG_TIMEOUT,
+    )
@@ -0,0 +1,159 @@
+import random
+import uuid
+from dataclasses import dataclass, field
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.template.defaultfilters import slugify
+from django.utils import timezone
+
+from .models import (
+    Grade,
+    Student,
+    Subject,
+    Topic,
+    Chapter,
+    StudentChapterCompletion,
+    ChapterQuiz,
+    ChapterQuestion,
+    ChapterChoice,
+)
+
+
+@dataclass
+class LearnData:
+    tag: str
+    password: str
+    users: list = field(default_factory=list)
+    students: list = field(default_factory=list)
+    subjects: list = field(default_factory=list)
+    topics: list = field(default_factory=list)
+    chapters: list = field(default_factory=list)
+    quizzes: list = field(default_factory=list)
+    completions: int = 0
+
+
+def _named(model, name, slug_field, **fields):
+    return model(name=name, **{slug_field: slugify(name)}, **fields)
+
+
+def generate_learn_data(
+    grades=1,
+    subjects=2,
+    topics=5,
+    chapters=4,
+    quizzes=1,
+    questions=10,
+    choices=4,
+    students=10,
+    students_per_user=2,
+    completion_rate=0.5,
+    seed=0,
+    password="benchmark",
+):
+    # Counts are per parent (e.g. topics per subject). bulk_create() skips
+    # save() and signals, so slugs are set here and rollups build lazily.
+    rng = random.Random(seed)
+    tag = uuid.uuid4().hex[:8]
+    data = LearnData(tag=tag, password=password)
+
+    grade_objs = Grade.objects.bulk_create(
+        Grade(name=f"Grade {tag} {g}", grade_slug=slugify(f"Grade {tag} {g}"))
+        for g in range(grades)
+    )
+    data.subjects = Subject.objects.bulk_create(
+        _named(Subject, f"Subject {tag} {s}", "subject_slug", grade=grade, thumbnail="benchmark.jpg")
+        for grade in grade_objs
+        for s in range(subjects)
+    )
+    data.topics = Topic.objects.bulk_create(
+        _named(Topic, f"Topic {t}", "topic_slug", subject=subject, thumbnail="benchmark.jpg")
+        for subject in data.subjects
+        for t in range(topics)
+    )
+
+    # Chapter.number is unique across the whole table
+    number = Chapter.objects.order_by("-number").values_list("number", flat=True).first() or 0
+    chapter_objs = []
+    for topic in data.topics:
+        for c in range(chapters):
+            number += 1
+            chapter_objs.append(
+                _named(
+                    Chapter,
+                    f"Chapter {c}",
+                    "chapter_slug",
+                    topic=topic,
+                    number=number,
+                    thumbnail="benchmark.jpg",
+                    content="",
+                )
+            )
+    data.chapters = Chapter.objects.bulk_create(chapter_objs)
+
+    data.quizzes = ChapterQuiz.objects.bulk_create(
+        ChapterQuiz(
+            chapter=chapter,
+            title=f"Quiz {q}",
+            quiz_slug=slugify(f"Quiz {q}"),
+            publish=True,
+            duration=300,
+        )
+        for chapter in data.chapters
+        for q in range(quizzes)
+    )
+    question_objs = ChapterQuestion.objects.bulk_create(
+        ChapterQuestion(quiz=quiz, question_text=f"Question {q}")
+        for quiz in data.quizzes
+        for q in range(questions)
+    )
+    ChapterChoice.objects.bulk_create(
+        ChapterChoice(
+            question=question,
+            choice_text=f"Choice {c}",
+            is_correct=c == 0,
+            mark=1,
+        )
+        for question in question_objs
+        for c in range(choices)
+    )
+
+    # Users get a few students each, like parents with several children
+    hashed = make_password(password)
+    user_count = -(-students * grades // students_per_user)
+    data.users = User.objects.bulk_create(
+        User(
+            username=f"benchmark-{tag}-{u}",
+            email=f"benchmark-{tag}-{u}@example.com",
+            password=hashed,
+        )
+        for u in range(user_count)
+    )
+
+    data.students = Student.objects.bulk_create(
+        Student(
+            user=data.users[i // students_per_user],
+            first_name=f"Student {i}",
+            student_slug=slugify(f"Student {i}"),
+            grade=grade_objs[i % grades],
+        )
+        for i in range(students * grades)
+    )
+
+    chapters_by_grade = {}
+    for chapter in data.chapters:
+        chapters_by_grade.setdefault(chapter.topic.subject.grade_id, []).append(chapter)
+
+    now = timezone.now()
+    completions = (
+        StudentChapterCompletion(
+            student=student, chapter=chapter, completed=True, date_completed=now
+        )
+        for student in data.students
+        for chapter in chapters_by_grade.get(student.grade_id, [])
+        if rng.random() < completion_rate
+    )
+    created = StudentChapterCompletion.objects.bulk_create(completions, batch_size=5000)
+    data.completions = len(created)
+
+    return data
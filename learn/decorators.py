@@ -0,0 +1,71 @@
+from functools import wraps
+
+from django.http import Http404
+
+from .models import Student, Subject, Topic, Chapter, ChapterQuiz
+
+
+# (context name, model, slug field, parent context name), outermost first
+LEARN_PATH = (
+    ("subject", Subject, "subject_slug", None),
+    ("topic", Topic, "topic_slug", "subject"),
+    ("chapter", Chapter, "chapter_slug", "topic"),
+    ("quiz", ChapterQuiz, "quiz_slug", "chapter"),
+)
+
+
+def resolve_learn_path(user, student_slug, **slugs):
+    student = (
+        Student.objects.select_related("grade")
+        .filter(user=user, student_slug=student_slug)
+        .order_by("id")
+        .first()
+    )
+    if student is None:
+        raise Http404("No student matches the given query.")
+
+    levels = [level for level in LEARN_PATH if level[2] in slugs]
+    if not levels:
+        return {"student": student}
+
+    # Query the deepest level, joining every parent and filtering each
+    # level by its slug under its parent, inside the student's grade.
+    name, model, slug_field, _ = levels[-1]
+    lookups = {slug_field: slugs[slug_field]}
+    relation = ""
+    for parent_name, _, parent_slug_field, _ in reversed(levels[:-1]):
+        relation += f"{parent_name}__"
+        lookups[relation + parent_slug_field] = slugs[parent_slug_field]
+    lookups[f"{relation}grade"] = student.grade_id
+
+    queryset = model.objects.filter(**lookups).order_by("pk")
+    if relation:
+        queryset = queryset.select_related(relation[:-2])
+    obj = queryset.first()
+    if obj is None:
+        raise Http404(f"No {model._meta.verbose_name} matches the given query.")
+
+    resolved = {"student": student, name: obj}
+    for parent_name, _, _, _ in reversed(levels[:-1]):
+        obj = getattr(obj, parent_name)
+        resolved[parent_name] = obj
+    return resolved
+
+
+def learn_path(view):
+    """
+    Replace the student/subject/topic/chapter/quiz slugs of a learn URL with
+    the objects they name, resolved for request.user.
+    """
+
+    @wraps(view)
+    def wrapper(request, student_slug, **kwargs):
+        slugs = {
+            slug_field: kwargs.pop(slug_field)
+            for _, _, slug_field, _ in LEARN_PATH
+            if slug_field in kwargs
+        }
+        kwargs.update(resolve_learn_path(request.user, student_slug, **slugs))
+        return view(request, **kwargs)
+
+    return wrapper
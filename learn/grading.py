@@ -0,0 +1,89 @@
+from collections import defaultdict
+from dataclasses import asdict, dataclass, fields
+
+from .models import ChapterStudentResponse, QuizAttempt
+from .quiz import build_quiz_snapshot
+
+
+@dataclass(frozen=True)
+class QuizResult:
+    score: int
+    total: int
+    percentage: int
+    correct_answers: int
+    incorrect_answers: int
+    unanswered: int
+
+    def as_attempt_fields(self):
+        return asdict(self)
+
+
+def grade_submission(snapshot, answers):
+    # answers maps question id -> chosen choice id; marks come from the choice
+    score = 0
+    correct_answers = 0
+    incorrect_answers = 0
+
+    for question in snapshot.questions:
+        choice_id = answers.get(question.id)
+        if choice_id is None:
+            continue
+        if choice_id in snapshot.correct_choices[question.id]:
+            correct_answers += 1
+            score += snapshot.choices[choice_id].mark
+        else:
+            incorrect_answers += 1
+
+    total = snapshot.total_marks
+    return QuizResult(
+        score=score,
+        total=total,
+        percentage=round((score / total) * 100) if total > 0 else 0,
+        correct_answers=correct_answers,
+        incorrect_answers=incorrect_answers,
+        unanswered=len(snapshot.questions) - correct_answers - incorrect_answers,
+    )
+
+
+def grade_submissions(snapshot, submissions):
+    # submissions maps any key (usually a student id) -> answers
+    return {
+        key: grade_submission(snapshot, answers)
+        for key, answers in submissions.items()
+    }
+
+
+def quiz_submissions(quiz):
+    # Every student's stored answers for the quiz in one query
+    submissions = defaultdict(dict)
+    responses = ChapterStudentResponse.objects.filter(quiz=quiz).values_list(
+        "student_id", "question_id", "choice_id"
+    )
+    for student_id, question_id, choice_id in responses:
+        submissions[student_id][question_id] = choice_id
+    return submissions
+
+
+def regrade_quiz(quiz):
+    # Responses are only kept for a student's latest attempt, so that is the
+    # attempt that gets regraded. Returns the number of attempts updated.
+    snapshot = build_quiz_snapshot(quiz.pk)
+    results = grade_submissions(snapshot, quiz_submissions(quiz))
+
+    latest_attempts = {}
+    attempts = QuizAttempt.objects.filter(
+        quiz=quiz, student_id__in=results.keys()
+    ).order_by("date_submitted", "id")
+    for attempt in attempts:
+        latest_attempts[attempt.student_id] = attempt
+
+    for student_id, attempt in latest_attempts.items():
+        for name, value in results[student_id].as_attempt_fields().items():
+            setattr(attempt, name, value)
+
+    QuizAttempt.objects.bulk_update(
+        latest_attempts.values(),
+        [field.name for field in fields(QuizResult)],
+        batch_size=500,
+    )
+    return len(latest_attempts)
@@ -0,0 +1,174 @@
+import json
+import mimetypes
+import os
+import posixpath
+import shutil
+import subprocess
+import tempfile
+
+from django.conf import settings
+from django.core.files import File
+
+
+# (variant name, height, video kbps, audio kbps), lowest first. Variants
+# taller than the upload are skipped; the lowest is always made.
+HLS_RENDITIONS = (
+    ("360p", 360, 800, 96),
+    ("540p", 540, 1600, 128),
+    ("720p", 720, 2800, 128),
+)
+HLS_SEGMENT_SECONDS = 6
+HLS_MASTER = "master.m3u8"
+HLS_CONTENT_TYPE = "application/x-mpegURL"
+
+# Not in every mime.types; served through kptt.views.serve_video
+mimetypes.add_type("application/vnd.apple.mpegurl", ".m3u8")
+mimetypes.add_type("video/mp2t", ".ts")
+
+
+def hls_directory(name):
+    # learn/chapter/videos/a.mp4 -> learn/chapter/videos/hls/a
+    directory, filename = posixpath.split(name)
+    return posixpath.join(directory, "hls", posixpath.splitext(filename)[0])
+
+
+def hls_playlist_name(name):
+    return posixpath.join(hls_directory(name), HLS_MASTER)
+
+
+def has_hls(storage, name):
+    return bool(name) and storage.exists(hls_playlist_name(name))
+
+
+def player_source(video):
+    # (url, type) for the player: the HLS master playlist once packaged,
+    # the upload itself until then
+    if has_hls(video.storage, video.name):
+        return video.storage.url(hls_playlist_name(video.name)), HLS_CONTENT_TYPE
+    return video.url, mimetypes.guess_type(video.name)[0] or "video/mp4"
+
+
+def probe_video(path):
+    # (height, has_audio) of a video file. Raises ValueError when there is no
+    # video stream to package.
+    result = subprocess.run(
+        [
+            settings.HLS_FFPROBE,
+            "-v", "error",
+            "-show_entries", "stream=codec_type,height",
+            "-of", "json",
+            path,
+        ],
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+    streams = json.loads(result.stdout or "{}").get("streams", [])
+    heights = [s["height"] for s in streams if s.get("codec_type") == "video" and s.get("height")]
+    if result.returncode or not heights:
+        raise ValueError(f"No video stream found: {result.stderr.strip() or path}")
+    return heights[0], any(s.get("codec_type") == "audio" for s in streams)
+
+
+def hls_variants(source_height):
+    variants = [variant for variant in HLS_RENDITIONS if variant[1] <= source_height]
+    if not variants:
+        # Smaller than the lowest variant: keep the upload's own (even) height
+        name, _, video_kbps, audio_kbps = HLS_RENDITIONS[0]
+        variants = [(name, max(source_height // 2 * 2, 2), video_kbps, audio_kbps)]
+    return variants
+
+
+def ffmpeg_command(source, output, variants, has_audio):
+    # One pass: decode once, scale into every variant, write segments,
+    # variant playlists and the master playlist into output/
+    filters = [f"[0:v]split={len(variants)}" + "".join(f"[v{i}]" for i in range(len(variants)))]
+    command = [settings.HLS_FFMPEG, "-hide_banner", "-loglevel", "error", "-y", "-i", source]
+    stream_map = []
+    for i, (name, height, video_kbps, audio_kbps) in enumerate(variants):
+        filters.append(f"[v{i}]scale=-2:{height}[v{i}out]")
+        command += [
+            "-map", f"[v{i}out]",
+            f"-c:v:{i}", "libx264",
+            f"-b:v:{i}", f"{video_kbps}k",
+            f"-maxrate:v:{i}", f"{video_kbps * 107 // 100}k",
+            f"-bufsize:v:{i}", f"{video_kbps * 3 // 2}k",
+        ]
+        entry = f"v:{i}"
+        if has_audio:
+            command += ["-map", "0:a:0", f"-c:a:{i}", "aac", f"-b:a:{i}", f"{audio_kbps}k", f"-ac:a:{i}", "2"]
+            entry += f",a:{i}"
+        stream_map.append(f"{entry},name:{name}")
+    command += [
+        "-filter_complex", ";".join(filters),
+        "-preset", "veryfast",
+        "-profile:v", "main",
+        "-pix_fmt", "yuv420p",
+        # Keyframes on segment boundaries so players can switch variants there
+        "-force_key_frames", f"expr:gte(t,n_forced*{HLS_SEGMENT_SECONDS})",
+        "-sc_threshold", "0",
+        "-f", "hls",
+        "-hls_time", str(HLS_SEGMENT_SECONDS),
+        "-hls_playlist_type", "vod",
+        "-hls_flags", "independent_segments",
+        "-hls_segment_filename", os.path.join(output, "%v", "segment-%03d.ts"),
+        "-master_pl_name", HLS_MASTER,
+        "-var_stream_map", " ".join(stream_map),
+        os.path.join(output, "%v", "index.m3u8"),
+    ]
+    return command
+
+
+def segment_video(storage, name):
+    # Package an uploaded video as adaptive-bitrate HLS next to it, see
+    # hls_directory(). Raises OSError/ValueError when ffmpeg cannot read it.
+    with tempfile.TemporaryDirectory() as workdir:
+        try:
+            source = storage.path(name)
+        except NotImplementedError:
+            source = os.path.join(workdir, "source" + posixpath.splitext(name)[1])
+            with storage.open(name, "rb") as f, open(source, "wb") as copy:
+                shutil.copyfileobj(f, copy)
+
+        height, has_audio = probe_video(source)
+        output = os.path.join(workdir, "hls")
+        os.makedirs(output)
+        result = subprocess.run(
+            ffmpeg_command(source, output, hls_variants(height), has_audio),
+            capture_output=True,
+            text=True,
+            timeout=settings.HLS_TIMEOUT,
+        )
+        if result.returncode:
+            raise ValueError(f"ffmpeg could not package {name}: {result.stderr.strip()[-2000:]}")
+
+        files = [
+            os.path.relpath(os.path.join(directory, filename), output)
+            for directory, _, filenames in os.walk(output)
+            for filename in filenames
+        ]
+        delete_hls(storage, name)
+        # The master playlist goes last, so has_hls() never sees half an upload
+        created = []
+        for relative in sorted(files, key=lambda path: path == HLS_MASTER):
+            with open(os.path.join(output, relative), "rb") as f:
+                target = posixpath.join(hls_directory(name), relative.replace(os.sep, "/"))
+                created.append(storage.save(target, File(f)))
+        return created
+
+
+def _delete_tree(storage, directory):
+    directories, files = storage.listdir(directory)
+    for filename in files:
+        storage.delete(posixpath.join(directory, filename))
+    for subdirectory in directories:
+        _delete_tree(storage, posixpath.join(directory, subdirectory))
+    storage.delete(directory)
+
+
+def delete_hls(storage, name):
+    # Master playlist first, so players stop being pointed at the segments
+    if storage.exists(hls_playlist_name(name)):
+        storage.delete(hls_playlist_name(name))
+    if storage.exists(hls_directory(name)):
+        _delete_tree(storage, hls_directory(name))
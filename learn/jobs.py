@@ -0,0 +1,102 @@
+import logging
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+from kptt.queue import WorkQueue
+
+from .hls import delete_hls, segment_video
+from .catalog import invalidate_subject_catalogs, invalidate_topic_catalogs
+from .models import MediaJob, Subject, Topic, Chapter
+from .renditions import delete_renditions, generate_renditions
+
+
+logger = logging.getLogger(__name__)
+
+# Delay before retry n (1-based) is RETRY_DELAY * RETRY_BACKOFF ** (n - 1)
+RETRY_DELAY = timedelta(seconds=30)
+RETRY_BACKOFF = 4
+# Running jobs older than this belong to a worker that died
+STALE_AFTER = timedelta(minutes=15)
+# Packaging a long lesson can legitimately take a while (see HLS_TIMEOUT)
+VIDEO_STALE_AFTER = timedelta(hours=3)
+VIDEO_KINDS = (MediaJob.SEGMENT_VIDEO,)
+
+
+def record_rendition_widths(name, widths):
+    # Stored on every row using the image, so pages build the srcset without
+    # asking the storage. update() skips the save signals: the cached grade
+    # catalogs that list these thumbnails are bumped here instead.
+    for model in (Subject, Topic, Chapter):
+        model.objects.filter(thumbnail=name).update(thumbnail_widths=widths)
+    invalidate_subject_catalogs(Subject.objects.filter(thumbnail=name).values_list("id", flat=True))
+    invalidate_topic_catalogs(Topic.objects.filter(thumbnail=name).values_list("id", flat=True))
+
+
+def _generate_renditions(name):
+    record_rendition_widths(name, generate_renditions(default_storage, name))
+
+
+def _delete_renditions(name):
+    delete_renditions(default_storage, name)
+
+
+def _segment_video(name):
+    segment_video(default_storage, name)
+
+
+def _delete_video_segments(name):
+    delete_hls(default_storage, name)
+
+
+QUEUE = WorkQueue(MediaJob, MediaJob.PENDING, MediaJob.RUNNING, MediaJob.FAILED, RETRY_DELAY, RETRY_BACKOFF)
+
+MEDIA_JOB_HANDLERS = {
+    MediaJob.GENERATE_RENDITIONS: _generate_renditions,
+    MediaJob.DELETE_RENDITIONS: _delete_renditions,
+    MediaJob.SEGMENT_VIDEO: _segment_video,
+    MediaJob.DELETE_VIDEO_SEGMENTS: _delete_video_segments,
+}
+
+
+def enqueue_media_job(kind, file_name):
+    # One pending or running job per file and kind is enough: a running job
+    # already works on the file as it is now
+    job = MediaJob.objects.filter(
+        kind=kind, file_name=file_name, status__in=(MediaJob.PENDING, MediaJob.RUNNING)
+    ).first()
+    if job is None:
+        job = MediaJob.objects.create(kind=kind, file_name=file_name)
+    return job
+
+
+def requeue_media_jobs(queryset):
+    return QUEUE.requeue(queryset, finished_at=None)
+
+
+def claim_media_jobs(limit):
+    QUEUE.release_stale(STALE_AFTER, MediaJob.objects.exclude(kind__in=VIDEO_KINDS))
+    QUEUE.release_stale(VIDEO_STALE_AFTER, MediaJob.objects.filter(kind__in=VIDEO_KINDS))
+    return QUEUE.claim(limit)
+
+
+def run_media_job(job):
+    try:
+        MEDIA_JOB_HANDLERS[job.kind](job.file_name)
+    except Exception:
+        if QUEUE.fail(job):
+            logger.warning("Media job %s failed, retrying at %s", job.pk, job.run_after)
+        else:
+            job.finished_at = timezone.now()
+            logger.error("Media job %s failed for good: %s", job.pk, job.file_name)
+    else:
+        job.status = MediaJob.DONE
+        job.last_error = ""
+        job.finished_at = timezone.now()
+    job.save(update_fields=["status", "last_error", "run_after", "finished_at"])
+    return job
+
+
+def process_media_jobs(limit=20):
+    return [run_media_job(job) for job in claim_media_jobs(limit)]
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+
+from learn.jobs import record_rendition_widths
+from learn.models import Subject, Topic, Chapter
+from learn.renditions import generate_renditions
+
+
+class Command(BaseCommand):
+    help = "Generate thumbnail renditions for subjects, topics and chapters that lack them and record their widths."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Regenerate renditions that already exist.",
+        )
+
+    def handle(self, *args, **options):
+        for model in (Subject, Topic, Chapter):
+            generated = skipped = failed = 0
+            seen = set()
+            rows = model.objects.exclude(thumbnail="").only("id", "thumbnail", "thumbnail_widths")
+            for obj in rows.iterator():
+                thumbnail = obj.thumbnail
+                if thumbnail.name in seen:
+                    continue
+                seen.add(thumbnail.name)
+                if not options["force"] and obj.thumbnail_widths is not None:
+                    skipped += 1
+                    continue
+                try:
+                    widths = generate_renditions(thumbnail.storage, thumbnail.name)
+                except (OSError, ValueError) as exc:
+                    self.stderr.write(f"{thumbnail.name}: {exc}")
+                    failed += 1
+                else:
+                    record_rendition_widths(thumbnail.name, widths)
+                    generated += 1
+            self.stdout.write(
+                f"{model._meta.verbose_name_plural}: {generated} generated, "
+                f"{skipped} already present, {failed} unreadable"
+            )
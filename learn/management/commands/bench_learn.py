@@ -0,0 +1,164 @@
+import json
+import subprocess
+import time
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import (
+    override_settings,
+    setup_test_environment,
+    teardown_test_environment,
+)
+from django.urls import reverse
+
+from learn.benchmarks import BENCHMARK_CACHES, Scenario, run_scenario
+from learn.datagen import generate_learn_data
+from learn.quiz import build_quiz_snapshot
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a generated learn catalog and measure latency, queries per request "
+        "and throughput of the main learn views through the test client. Results "
+        "are written as JSON; all generated data is rolled back afterwards and "
+        "cache writes go to a private in-memory cache."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--grades", type=int, default=1)
+        parser.add_argument("--subjects", type=int, default=3)
+        parser.add_argument("--topics", type=int, default=10)
+        parser.add_argument("--chapters", type=int, default=5)
+        parser.add_argument("--quizzes", type=int, default=1)
+        parser.add_argument("--questions", type=int, default=20)
+        parser.add_argument("--choices", type=int, default=4)
+        parser.add_argument("--students", type=int, default=50)
+        parser.add_argument("--completion-rate", type=float, default=0.5)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--warmup", type=int, default=1)
+        parser.add_argument(
+            "--scenario",
+            action="append",
+            dest="scenarios",
+            help="Only run the named scenario (may be repeated).",
+        )
+        parser.add_argument("--output", help="Write the JSON report to this file.")
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        try:
+            with override_settings(CACHES=BENCHMARK_CACHES), transaction.atomic():
+                report = self.run(options)
+                transaction.set_rollback(True)
+        finally:
+            teardown_test_environment()
+
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                f.write(output + "\n")
+            self.stdout.write(f"Wrote {options['output']}")
+        else:
+            self.stdout.write(output)
+
+    def run(self, options):
+        started = time.perf_counter()
+        data = generate_learn_data(
+            grades=options["grades"],
+            subjects=options["subjects"],
+            topics=options["topics"],
+            chapters=options["chapters"],
+            quizzes=options["quizzes"],
+            questions=options["questions"],
+            choices=options["choices"],
+            students=options["students"],
+            completion_rate=options["completion_rate"],
+            seed=options["seed"],
+        )
+        seed_seconds = time.perf_counter() - started
+
+        student = data.students[0]
+        chapter = next(c for c in data.chapters if c.topic.subject.grade_id == student.grade_id)
+        topic = chapter.topic
+        subject = topic.subject
+        quiz = next(q for q in data.quizzes if q.chapter_id == chapter.id)
+
+        client = Client()
+        client.force_login(student.user)
+
+        chapter_args = [
+            student.student_slug,
+            subject.subject_slug,
+            topic.topic_slug,
+            chapter.chapter_slug,
+        ]
+        quiz_args = chapter_args + [quiz.quiz_slug]
+        # Answer every question, cycling through the choices so some are wrong
+        answers = {
+            str(question.id): str(question.choices[i % len(question.choices)].id)
+            for i, question in enumerate(build_quiz_snapshot(quiz.id).questions)
+            if question.choices
+        }
+
+        scenarios = [
+            Scenario("student_dashboard", reverse("student_dashboard", args=chapter_args[:1])),
+            Scenario("subject_dashboard", reverse("subject_dashboard", args=chapter_args[:2])),
+            Scenario("topic_dashboard", reverse("topic_dashboard", args=chapter_args[:3])),
+            Scenario("chapter_content", reverse("chapter_content", args=chapter_args)),
+            Scenario(
+                "quiz_submit",
+                reverse("chapter_quiz_submit", args=quiz_args),
+                method="post",
+                data=answers,
+                status=302,
+            ),
+            Scenario("quiz_results", reverse("chapter_quiz_results", args=quiz_args)),
+        ]
+        if options["scenarios"]:
+            unknown = set(options["scenarios"]) - {s.name for s in scenarios}
+            if unknown:
+                raise CommandError(f"Unknown scenario(s): {', '.join(sorted(unknown))}")
+            scenarios = [s for s in scenarios if s.name in options["scenarios"]]
+
+        results = {}
+        for scenario in scenarios:
+            results[scenario.name] = run_scenario(
+                client, scenario, options["repeat"], options["warmup"]
+            )
+
+        return {
+            "commit": self.git_commit(),
+            "django": django.get_version(),
+            "database": connection.vendor,
+            "cache": settings.CACHES["default"]["BACKEND"],
+            "dataset": {
+                "grades": options["grades"],
+                "subjects": len(data.subjects),
+                "topics": len(data.topics),
+                "chapters": len(data.chapters),
+                "quizzes": len(data.quizzes),
+                "questions_per_quiz": options["questions"],
+                "students": len(data.students),
+                "completions": data.completions,
+                "seed": options["seed"],
+                "seed_seconds": round(seed_seconds, 2),
+            },
+            "repeat": options["repeat"],
+            "scenarios": results,
+        }
+
+    def git_commit(self):
+        try:
+            return subprocess.run(
+                ["git", "rev-parse", "HEAD"],
+                cwd=settings.BASE_DIR,
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
@@ -0,0 +1,103 @@
+import time
+import uuid
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import (
+    CaptureQueriesContext,
+    override_settings,
+    setup_test_environment,
+    teardown_test_environment,
+)
+from django.urls import reverse
+
+from learn.benchmarks import BENCHMARK_CACHES, summarize
+from learn.models import (
+    Grade,
+    Student,
+    Subject,
+    Topic,
+    Chapter,
+    ChapterQuiz,
+    ChapterQuestion,
+    ChapterChoice,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure query count and latency of chapter_quiz_submit on a generated "
+        "quiz. All generated data is rolled back afterwards and cache writes go "
+        "to a private in-memory cache."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--questions", type=int, default=50)
+        parser.add_argument("--choices", type=int, default=4)
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        try:
+            with override_settings(CACHES=BENCHMARK_CACHES), transaction.atomic():
+                self.run(options)
+                transaction.set_rollback(True)
+        finally:
+            teardown_test_environment()
+
+    def seed(self, questions, choices):
+        tag = uuid.uuid4().hex[:8]
+        user = User.objects.create_user(f"bench-{tag}", f"bench-{tag}@example.com")
+        grade = Grade.objects.create(name=f"Bench {tag}")
+        student = Student.objects.create(user=user, first_name=f"Bench {tag}", grade=grade)
+        subject = Subject.objects.create(grade=grade, name=f"Bench {tag}", thumbnail="bench.jpg")
+        topic = Topic.objects.create(subject=subject, name=f"Bench {tag}", thumbnail="bench.jpg")
+        last = Chapter.objects.order_by("-number").values_list("number", flat=True).first()
+        chapter = Chapter.objects.create(
+            topic=topic,
+            name=f"Bench {tag}",
+            number=(last or 0) + 1,
+            thumbnail="bench.jpg",
+            content="",
+        )
+        quiz = ChapterQuiz.objects.create(chapter=chapter, title=f"Bench {tag}", duration=300)
+
+        answers = {}
+        for number in range(questions):
+            question = ChapterQuestion.objects.create(quiz=quiz, question_text=f"Question {number}")
+            created = ChapterChoice.objects.bulk_create(
+                ChapterChoice(question=question, choice_text=f"Choice {i}", is_correct=i == 0)
+                for i in range(choices)
+            )
+            answers[str(question.id)] = str(created[number % choices].id)
+
+        url = reverse(
+            "chapter_quiz_submit",
+            args=[student.student_slug, subject.subject_slug, topic.topic_slug, chapter.chapter_slug, quiz.quiz_slug],
+        )
+        return user, url, answers
+
+    def run(self, options):
+        user, url, answers = self.seed(options["questions"], options["choices"])
+        client = Client()
+        client.force_login(user)
+
+        timings = []
+        queries = []
+        for _ in range(options["repeat"]):
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                response = client.post(url, answers)
+                timings.append((time.perf_counter() - start) * 1000)
+            assert response.status_code == 302, response.status_code
+            queries.append(len(captured.captured_queries))
+
+        stats = summarize(timings, queries)
+        self.stdout.write(
+            f"questions={options['questions']} repeat={options['repeat']} "
+            f"queries={stats['max_queries']} "
+            f"p50={stats['p50_ms']:.2f}ms "
+            f"p95={stats['p95_ms']:.2f}ms"
+        )
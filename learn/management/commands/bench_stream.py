@@ -0,0 +1,91 @@
+import mimetypes
+import os
+import random
+import statistics
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from django.views.static import serve
+
+from kptt.streaming import stream_file
+from learn.benchmarks import percentile
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare seeking into a lesson video and the memory held per open "
+        "stream between whole-file delivery (django.views.static.serve) and "
+        "byte-range delivery (kptt.streaming.stream_file)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--file",
+            default=os.path.join(settings.BASE_DIR, "static", "test.mp4"),
+            help="Video file to stream",
+        )
+        parser.add_argument("--seeks", type=int, default=20, help="Random seeks per mode")
+        parser.add_argument("--chunk", type=int, default=256 * 1024, help="Bytes a player reads after seeking")
+        parser.add_argument("--streams", type=int, default=50, help="Concurrent open streams")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        path = os.path.abspath(options["file"])
+        if not os.path.isfile(path):
+            raise CommandError(f"{path} does not exist")
+        size = os.path.getsize(path)
+        content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        factory = RequestFactory()
+        rng = random.Random(options["seed"])
+        chunk = min(options["chunk"], size)
+        offsets = [rng.randrange(0, size - chunk + 1) for _ in range(options["seeks"])]
+
+        def whole_file(**headers):
+            request = factory.get("/media/video", headers=headers)
+            return serve(request, os.path.basename(path), document_root=os.path.dirname(path))
+
+        def byte_range(**headers):
+            return stream_file(factory.get("/media/video", headers=headers), path, content_type)
+
+        self.stdout.write(f"{path}: {size / 1024 / 1024:.1f} MiB, reading {chunk // 1024} KiB after each seek")
+        for name, open_stream in (("whole_file", whole_file), ("range", byte_range)):
+            timings = []
+            transferred = 0
+            for offset in offsets:
+                start = time.perf_counter()
+                response = open_stream(Range=f"bytes={offset}-{offset + chunk - 1}")
+                # Without Range support the player has to read up to the offset
+                needed = chunk if response.status_code == 206 else offset + chunk
+                received = 0
+                for block in response.streaming_content:
+                    received += len(block)
+                    if received >= needed:
+                        break
+                response.close()
+                timings.append((time.perf_counter() - start) * 1000)
+                transferred += received
+            timings.sort()
+
+            # Streams a server holds open mid-transfer, one block read from each
+            tracemalloc.start()
+            baseline = tracemalloc.get_traced_memory()[0]
+            responses = []
+            for _ in range(options["streams"]):
+                response = open_stream()
+                next(iter(response.streaming_content))
+                responses.append(response)
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            for response in responses:
+                response.close()
+
+            self.stdout.write(
+                f"{name:<11} seeks={len(timings)} "
+                f"p50={statistics.median(timings):.2f}ms p95={percentile(timings, 0.95):.2f}ms "
+                f"read/seek={transferred / len(timings) / 1024:.0f}KiB "
+                f"held/stream={(current - baseline) / options['streams'] / 1024:.1f}KiB "
+                f"peak={(peak - baseline) / 1024:.0f}KiB"
+            )
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from learn.models import Student
+from learn.progress import rebuild_student_rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per-student topic and subject progress rollups from scratch"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--student",
+            action="append",
+            dest="student_slugs",
+            help="Only rebuild the given student slug (can be repeated)",
+        )
+
+    def handle(self, *args, **options):
+        students = Student.objects.select_related("grade")
+        if options["student_slugs"]:
+            students = students.filter(student_slug__in=options["student_slugs"])
+
+        count = 0
+        for student in students.iterator():
+            rebuild_student_rollups(student)
+            count += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt progress for {count} students"))
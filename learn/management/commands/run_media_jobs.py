@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from learn.jobs import process_media_jobs
+from learn.models import MediaJob
+
+
+class Command(BaseCommand):
+    help = "Run queued media processing jobs (thumbnail renditions, chapter video HLS), polling for new ones"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Drain the due jobs and exit")
+        parser.add_argument("--batch", type=int, default=20, help="Jobs claimed per poll")
+        parser.add_argument("--interval", type=float, default=2.0, help="Seconds between polls")
+
+    def handle(self, *args, **options):
+        while True:
+            jobs = process_media_jobs(options["batch"])
+            for job in jobs:
+                style = self.style.SUCCESS if job.status == MediaJob.DONE else self.style.WARNING
+                self.stdout.write(style(f"{job.kind} {job.file_name}: {job.status}"))
+            if options["once"] and not jobs:
+                break
+            if not jobs:
+                time.sleep(options["interval"])
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from learn.hls import has_hls, segment_video
+from learn.models import Chapter
+
+
+class Command(BaseCommand):
+    help = "Package chapter videos as multi-bitrate HLS (needs ffmpeg), skipping those already packaged."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Package videos again even if their playlist exists.",
+        )
+        parser.add_argument("--chapter", type=int, action="append", dest="chapters", help="Only this chapter id (repeatable).")
+
+    def handle(self, *args, **options):
+        chapters = Chapter.objects.exclude(video="").only("id", "video").order_by("id")
+        if options["chapters"]:
+            chapters = chapters.filter(pk__in=options["chapters"])
+        packaged = skipped = failed = 0
+        for chapter in chapters.iterator():
+            video = chapter.video
+            if not options["force"] and has_hls(video.storage, video.name):
+                skipped += 1
+                continue
+            try:
+                files = segment_video(video.storage, video.name)
+            except (OSError, ValueError) as exc:
+                self.stderr.write(f"{video.name}: {exc}")
+                failed += 1
+            else:
+                self.stdout.write(f"{video.name}: {len(files)} files")
+                packaged += 1
+        self.stdout.write(f"{packaged} packaged, {skipped} already packaged, {failed} failed")
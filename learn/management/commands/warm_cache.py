@@ -0,0 +1,78 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from learn.catalog import grade_catalog
+from learn.models import ChapterQuiz, Grade, Student, StudentSubjectProgress, Subject
+from learn.progress import build_subject_rollup
+from learn.quiz import get_quiz_snapshot
+from learn.students import user_students
+
+
+PARTS = ("catalogs", "quizzes", "progress", "students")
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the cache after a deploy: grade catalogs, quiz snapshots and "
+        "per-user student lists, and build any missing progress rollups"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--only",
+            nargs="+",
+            choices=PARTS,
+            default=PARTS,
+            help="Only warm these parts",
+        )
+        parser.add_argument(
+            "--all-quizzes",
+            action="store_true",
+            help="Also snapshot unpublished quizzes",
+        )
+
+    def handle(self, *args, **options):
+        for part in PARTS:
+            if part in options["only"]:
+                started = time.perf_counter()
+                count = getattr(self, f"warm_{part}")(options)
+                self.stdout.write(f"{part}: {count} warmed in {time.perf_counter() - started:.2f}s")
+
+    def warm_catalogs(self, options):
+        grade_ids = list(Grade.objects.values_list("id", flat=True))
+        for grade_id in grade_ids:
+            grade_catalog(grade_id)
+        return len(grade_ids)
+
+    def warm_quizzes(self, options):
+        quizzes = ChapterQuiz.objects.all()
+        if not options["all_quizzes"]:
+            quizzes = quizzes.filter(publish=True)
+        quiz_ids = list(quizzes.values_list("id", flat=True))
+        for quiz_id in quiz_ids:
+            get_quiz_snapshot(quiz_id)
+        return len(quiz_ids)
+
+    def warm_progress(self, options):
+        # Rollups live in the database; only the missing ones are built
+        built = 0
+        subjects_by_grade = {}
+        for subject in Subject.objects.order_by("id"):
+            subjects_by_grade.setdefault(subject.grade_id, []).append(subject)
+        existing = set(StudentSubjectProgress.objects.values_list("student_id", "subject_id"))
+        for student in Student.objects.order_by("id").iterator():
+            for subject in subjects_by_grade.get(student.grade_id, []):
+                if (student.id, subject.id) not in existing:
+                    build_subject_rollup(student, subject)
+                    built += 1
+        return built
+
+    def warm_students(self, options):
+        users = User.objects.filter(student__isnull=False).distinct()
+        count = 0
+        for user in users.iterator():
+            user_students(user)
+            count += 1
+        return count
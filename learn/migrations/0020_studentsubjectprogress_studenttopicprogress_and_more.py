@@ -0,0 +1,50 @@
+# Generated by Django 5.0.6 on 2026-10-18 12:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learn', '0019_chapterquiz_time_start_alter_chapterquiz_duration'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentSubjectProgress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('completed_chapters', models.PositiveIntegerField(default=0)),
+                ('total_chapters', models.PositiveIntegerField(default=0)),
+                ('completed_topics', models.PositiveIntegerField(default=0)),
+                ('total_topics', models.PositiveIntegerField(default=0)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='subject_progress', to='learn.student')),
+                ('subject', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='student_progress', to='learn.subject')),
+            ],
+            options={
+                'verbose_name_plural': 'Student Subject Progress',
+            },
+        ),
+        migrations.CreateModel(
+            name='StudentTopicProgress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('completed_chapters', models.PositiveIntegerField(default=0)),
+                ('total_chapters', models.PositiveIntegerField(default=0)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='topic_progress', to='learn.student')),
+                ('topic', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='student_progress', to='learn.topic')),
+            ],
+            options={
+                'verbose_name_plural': 'Student Topic Progress',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='studentsubjectprogress',
+            constraint=models.UniqueConstraint(fields=('student', 'subject'), name='unique_student_subject_progress'),
+        ),
+        migrations.AddConstraint(
+            model_name='studenttopicprogress',
+            constraint=models.UniqueConstraint(fields=('student', 'topic'), name='unique_student_topic_progress'),
+        ),
+    ]
@@ -0,0 +1,86 @@
+# Generated by Django 5.0.6 on 2026-10-18 12:08
+
+from collections import defaultdict
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Max, Q, Sum
+
+
+def backfill_attempts(apps, schema_editor):
+    # Scored the way learn.grading does: a correct answer earns its choice's
+    # mark, and the total is each question's highest correct mark
+    ChapterChoice = apps.get_model('learn', 'ChapterChoice')
+    ChapterQuestion = apps.get_model('learn', 'ChapterQuestion')
+    ChapterStudentResponse = apps.get_model('learn', 'ChapterStudentResponse')
+    QuizAttempt = apps.get_model('learn', 'QuizAttempt')
+
+    questions = dict(
+        ChapterQuestion.objects.values_list('quiz').annotate(n=Count('id')).values_list('quiz', 'n')
+    )
+    totals = defaultdict(int)
+    marks = (
+        ChapterChoice.objects.filter(is_correct=True)
+        .values('question', 'question__quiz')
+        .annotate(mark=Max('mark'))
+        .values_list('question__quiz', 'mark')
+        .order_by()
+    )
+    for quiz, mark in marks:
+        totals[quiz] += mark
+    submissions = (
+        ChapterStudentResponse.objects.values('student', 'quiz')
+        .annotate(
+            answered=Count('id'),
+            correct=Count('id', filter=Q(choice__is_correct=True)),
+            score=Sum('choice__mark', filter=Q(choice__is_correct=True), default=0),
+        )
+        .order_by()
+    )
+
+    attempts = []
+    for submission in submissions:
+        total = totals[submission['quiz']]
+        attempts.append(
+            QuizAttempt(
+                student_id=submission['student'],
+                quiz_id=submission['quiz'],
+                score=submission['score'],
+                total=total,
+                percentage=round(submission['score'] / total * 100) if total > 0 else 0,
+                correct_answers=submission['correct'],
+                incorrect_answers=submission['answered'] - submission['correct'],
+                unanswered=max(questions.get(submission['quiz'], 0) - submission['answered'], 0),
+            )
+        )
+    QuizAttempt.objects.bulk_create(attempts)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learn', '0020_studentsubjectprogress_studenttopicprogress_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuizAttempt',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.IntegerField(default=0)),
+                ('total', models.IntegerField(default=0)),
+                ('percentage', models.IntegerField(default=0)),
+                ('correct_answers', models.IntegerField(default=0)),
+                ('incorrect_answers', models.IntegerField(default=0)),
+                ('unanswered', models.IntegerField(default=0)),
+                ('duration', models.PositiveIntegerField(blank=True, null=True)),
+                ('date_submitted', models.DateTimeField(auto_now_add=True)),
+                ('quiz', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attempts', to='learn.chapterquiz')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='quiz_attempts', to='learn.student')),
+            ],
+            options={
+                'get_latest_by': 'date_submitted',
+            },
+        ),
+        migrations.RunPython(backfill_attempts, migrations.RunPython.noop),
+    ]
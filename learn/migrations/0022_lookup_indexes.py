@@ -0,0 +1,64 @@
+# Generated by Django 5.0.6 on 2026-10-18 12:13
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def dedupe_completions(apps, schema_editor):
+    # Keep one row per (student, chapter), preferring a completed one
+    StudentChapterCompletion = apps.get_model('learn', 'StudentChapterCompletion')
+    duplicates = (
+        StudentChapterCompletion.objects.values('student', 'chapter')
+        .annotate(n=Count('id'))
+        .filter(n__gt=1)
+        .order_by()
+    )
+    for duplicate in duplicates:
+        rows = StudentChapterCompletion.objects.filter(
+            student=duplicate['student'], chapter=duplicate['chapter']
+        ).order_by('-completed', '-date_completed', 'id')
+        keep = rows.first()
+        rows.exclude(pk=keep.pk).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learn', '0021_quizattempt'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_completions, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='chapter',
+            index=models.Index(fields=['topic', 'chapter_slug'], name='chapter_topic_slug_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='chapterquiz',
+            index=models.Index(fields=['chapter', 'quiz_slug'], name='quiz_chapter_slug_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='chapterstudentresponse',
+            index=models.Index(fields=['student', 'quiz'], name='response_student_quiz_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quizattempt',
+            index=models.Index(fields=['student', 'quiz', '-date_submitted'], name='attempt_student_quiz_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['user', 'student_slug'], name='student_user_slug_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='subject',
+            index=models.Index(fields=['grade', 'subject_slug'], name='subject_grade_slug_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='topic',
+            index=models.Index(fields=['subject', 'topic_slug'], name='topic_subject_slug_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='studentchaptercompletion',
+            constraint=models.UniqueConstraint(fields=('student', 'chapter'), name='unique_student_chapter_completion'),
+        ),
+    ]
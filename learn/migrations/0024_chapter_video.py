@@ -0,0 +1,23 @@
+# Generated by Django 5.0.6 on 2026-10-18 12:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learn', '0023_imagejob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chapter',
+            name='video',
+            field=models.FileField(blank=True, upload_to='learn/chapter/videos'),
+        ),
+        migrations.AlterField(
+            model_name='imagejob',
+            name='kind',
+            field=models.CharField(choices=[('generate_renditions', 'Generate renditions'), ('delete_renditions', 'Delete renditions'), ('segment_video', 'Segment video (HLS)'), ('delete_video_segments', 'Delete video segments')], max_length=30),
+        ),
+    ]
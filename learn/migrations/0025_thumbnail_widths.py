@@ -0,0 +1,28 @@
+# Generated by Django 5.0.6 on 2026-10-18 13:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learn', '0024_chapter_video'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chapter',
+            name='thumbnail_widths',
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='subject',
+            name='thumbnail_widths',
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='topic',
+            name='thumbnail_widths',
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+    ]
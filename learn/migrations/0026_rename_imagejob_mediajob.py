@@ -0,0 +1,22 @@
+# Generated by Django 5.0.6 on 2026-10-18 13:30
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learn', '0025_thumbnail_widths'),
+    ]
+
+    operations = [
+        migrations.RenameModel(
+            old_name='ImageJob',
+            new_name='MediaJob',
+        ),
+        migrations.RenameIndex(
+            model_name='mediajob',
+            new_name='mediajob_status_run_after_idx',
+            old_name='imagejob_status_run_after_idx',
+        ),
+    ]
@@ -3,6 +3,7 @@ from django.contrib.auth.models import User
 from django.template.defaultfilters import slugify
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 
 
 COLORS = {
@@ -69,6 +70,11 @@ class Student(models.Model):
         max_length=20, choices=tuple(COLORS.items()), default="blue"
     )
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "student_slug"], name="student_user_slug_idx"),
+        ]
+
     def save(self, *args, **kwargs):
         if not self.student_slug:
             self.student_slug = slugify(self.first_name)
@@ -85,16 +91,20 @@ class Subject(models.Model):
     )
     description = models.CharField(default="", max_length=200, null=True, blank=True)
     thumbnail = models.ImageField(upload_to="learn/subject/thumbnails")
+    # Rendition widths recorded by the run_media_jobs worker, None until it
+    # has run; {% responsive_image %} builds the srcset from them
+    thumbnail_widths = models.JSONField(null=True, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["grade", "subject_slug"], name="subject_grade_slug_idx"),
+        ]
 
     def save(self, *args, **kwargs):
         if not self.subject_slug:
             self.subject_slug = slugify(self.name)
         return super().save(*args, **kwargs)
 
-    def delete(self, *args, **kwargs):
-        self.thumbnail.delete()
-        return super().delete(*args, **kwargs)
-
     def __str__(self):
         return self.name + " - " + self.grade.name
 
@@ -107,17 +117,19 @@ class Topic(models.Model):
     topic_slug = models.CharField(max_length=1000, null=True, blank=True)
     description = models.CharField(default="", max_length=200, null=True, blank=True)
     thumbnail = models.ImageField(upload_to="learn/topic/thumbnails")
+    thumbnail_widths = models.JSONField(null=True, blank=True, editable=False)
     review = models.CharField(default="", max_length=600, null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["subject", "topic_slug"], name="topic_subject_slug_idx"),
+        ]
+
     def save(self, *args, **kwargs):
         if not self.topic_slug:
             self.topic_slug = slugify(self.name)
         return super().save(*args, **kwargs)
 
-    def delete(self, *args, **kwargs):
-        self.thumbnail.delete()
-        return super().delete(*args, **kwargs)
-
     def __str__(self):
         return self.name + " - " + self.subject.name + " - " + self.subject.grade.name
 
@@ -129,18 +141,22 @@ class Chapter(models.Model):
     chapter_slug = models.CharField(max_length=1000, null=True, blank=True)
     description = models.CharField(default="", max_length=200, null=True, blank=True)
     thumbnail = models.ImageField(upload_to="learn/chapter/thumbnails")
+    thumbnail_widths = models.JSONField(null=True, blank=True, editable=False)
+    # Packaged as HLS for the player by the run_media_jobs worker (learn.hls)
+    video = models.FileField(upload_to="learn/chapter/videos", blank=True)
     review = models.CharField(default="", max_length=600, null=True, blank=True)
     content = models.TextField()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["topic", "chapter_slug"], name="chapter_topic_slug_idx"),
+        ]
+
     def save(self, *args, **kwargs):
         if not self.chapter_slug:
             self.chapter_slug = slugify(self.name)
         return super().save(*args, **kwargs)
 
-    def delete(self, *args, **kwargs):
-        self.thumbnail.delete()
-        return super().delete(*args, **kwargs)
-
 
 class StudentChapterCompletion(models.Model):
     student = models.ForeignKey(Student, on_delete=models.CASCADE)
@@ -148,6 +164,54 @@ class StudentChapterCompletion(models.Model):
     completed = models.BooleanField(default=False)
     date_completed = models.DateTimeField(null=True, blank=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["student", "chapter"], name="unique_student_chapter_completion"
+            )
+        ]
+
+
+# PROGRESS ROLLUPS
+class StudentTopicProgress(models.Model):
+    student = models.ForeignKey(
+        Student, on_delete=models.CASCADE, related_name="topic_progress"
+    )
+    topic = models.ForeignKey(
+        Topic, on_delete=models.CASCADE, related_name="student_progress"
+    )
+    completed_chapters = models.PositiveIntegerField(default=0)
+    total_chapters = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = "Student Topic Progress"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["student", "topic"], name="unique_student_topic_progress"
+            )
+        ]
+
+
+class StudentSubjectProgress(models.Model):
+    student = models.ForeignKey(
+        Student, on_delete=models.CASCADE, related_name="subject_progress"
+    )
+    subject = models.ForeignKey(
+        Subject, on_delete=models.CASCADE, related_name="student_progress"
+    )
+    completed_chapters = models.PositiveIntegerField(default=0)
+    total_chapters = models.PositiveIntegerField(default=0)
+    completed_topics = models.PositiveIntegerField(default=0)
+    total_topics = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = "Student Subject Progress"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["student", "subject"], name="unique_student_subject_progress"
+            )
+        ]
+
 
 class Quotes(models.Model):
     quote = models.CharField(max_length=500)
@@ -177,6 +241,9 @@ class ChapterQuiz(models.Model):
 
     class Meta:
         verbose_name_plural = "Chapter Quizzes"
+        indexes = [
+            models.Index(fields=["chapter", "quiz_slug"], name="quiz_chapter_slug_idx"),
+        ]
 
 
 class ChapterQuestion(models.Model):
@@ -208,14 +275,86 @@ class ChapterStudentResponse(models.Model):
     quiz = models.ForeignKey(ChapterQuiz, on_delete=models.CASCADE)
     choice = models.ForeignKey(ChapterChoice, on_delete=models.CASCADE)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["student", "quiz"], name="response_student_quiz_idx"),
+        ]
+
     def __str__(self):
         return f"{self.student.first_name} - {self.question.question_text}"
-    
-    def calculate_marks(self):
-        total_marks = sum(
-            choice.mark for choice in self.question.choices.all() #if choice.is_correct
-        )
-        return total_marks   
+
+
+class QuizAttempt(models.Model):
+    student = models.ForeignKey(
+        Student, on_delete=models.CASCADE, related_name="quiz_attempts"
+    )
+    quiz = models.ForeignKey(
+        ChapterQuiz, on_delete=models.CASCADE, related_name="attempts"
+    )
+    score = models.IntegerField(default=0)
+    total = models.IntegerField(default=0)
+    percentage = models.IntegerField(default=0)
+    correct_answers = models.IntegerField(default=0)
+    incorrect_answers = models.IntegerField(default=0)
+    unanswered = models.IntegerField(default=0)
+    duration = models.PositiveIntegerField(null=True, blank=True)
+    date_submitted = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        get_latest_by = "date_submitted"
+        indexes = [
+            models.Index(
+                fields=["student", "quiz", "-date_submitted"],
+                name="attempt_student_quiz_date_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.student.first_name} - {self.quiz.title} ({self.percentage}%)"
+
+
+# BACKGROUND JOBS
+class MediaJob(models.Model):
+    GENERATE_RENDITIONS = "generate_renditions"
+    DELETE_RENDITIONS = "delete_renditions"
+    SEGMENT_VIDEO = "segment_video"
+    DELETE_VIDEO_SEGMENTS = "delete_video_segments"
+    KINDS = (
+        (GENERATE_RENDITIONS, "Generate renditions"),
+        (DELETE_RENDITIONS, "Delete renditions"),
+        (SEGMENT_VIDEO, "Segment video (HLS)"),
+        (DELETE_VIDEO_SEGMENTS, "Delete video segments"),
+    )
+
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUSES = (
+        (PENDING, "Pending"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    )
+
+    kind = models.CharField(max_length=30, choices=KINDS)
+    file_name = models.CharField(max_length=255)
+    status = models.CharField(max_length=10, choices=STATUSES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    last_error = models.TextField(default="", blank=True)
+    run_after = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    date_created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "run_after"], name="mediajob_status_run_after_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} - {self.file_name} ({self.status})"
 
 
 # End Line
@@ -0,0 +1,218 @@
+from django.db import transaction
+from django.db.models import Count, Exists, F, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from .models import (
+    Student,
+    Topic,
+    Chapter,
+    StudentChapterCompletion,
+    StudentTopicProgress,
+    StudentSubjectProgress,
+)
+
+
+def completion_percentage(completed, total):
+    if total > 0:
+        return round((completed / total) * 100)
+    return 0
+
+
+def _completed_chapters_subquery(topic_id):
+    # Completed chapters of a topic for the student of the outer rollup row
+    return Coalesce(
+        Subquery(
+            StudentChapterCompletion.objects.filter(
+                student=OuterRef("student"),
+                chapter__topic_id=topic_id,
+                completed=True,
+            )
+            .order_by()
+            .values("student")
+            .annotate(n=Count("chapter", distinct=True))
+            .values("n")
+        ),
+        0,
+    )
+
+
+def _refresh_subject_rollups(subject_rollups):
+    # Re-sum subject rows from their topic rows, one UPDATE for all given rows
+    topic_rollups = (
+        StudentTopicProgress.objects.filter(
+            student=OuterRef("student"), topic__subject=OuterRef("subject")
+        )
+        .order_by()
+        .values("student")
+    )
+
+    def total(expression, rows=topic_rollups):
+        return Coalesce(Subquery(rows.annotate(n=expression).values("n")), 0)
+
+    subject_rollups.update(
+        completed_chapters=total(Sum("completed_chapters")),
+        total_chapters=total(Sum("total_chapters")),
+        completed_topics=total(
+            Count("pk"),
+            rows=topic_rollups.filter(
+                total_chapters__gt=0, completed_chapters=F("total_chapters")
+            ),
+        ),
+        total_topics=total(Count("pk")),
+    )
+
+
+def build_subject_rollup(student, subject):
+    with transaction.atomic():
+        # Two first reads of a subject would otherwise rebuild its rows at
+        # the same time; the student's row lock makes the second wait for
+        # the first and then count from committed data.
+        Student.objects.select_for_update().only("pk").get(pk=student.pk)
+
+        topics = Topic.objects.filter(subject=subject).annotate(
+            num_total_chapters=Count("chapters", distinct=True),
+            num_completed_chapters=Count(
+                "chapters",
+                filter=Q(
+                    chapters__studentchaptercompletion__student=student,
+                    chapters__studentchaptercompletion__completed=True,
+                ),
+                distinct=True,
+            ),
+        )
+
+        topic_rollups = [
+            StudentTopicProgress(
+                student=student,
+                topic=topic,
+                completed_chapters=topic.num_completed_chapters,
+                total_chapters=topic.num_total_chapters,
+            )
+            for topic in topics
+        ]
+
+        StudentTopicProgress.objects.filter(
+            student=student, topic__subject=subject
+        ).delete()
+        StudentTopicProgress.objects.bulk_create(topic_rollups, ignore_conflicts=True)
+        subject_rollup, created = StudentSubjectProgress.objects.update_or_create(
+            student=student,
+            subject=subject,
+            defaults={
+                "completed_chapters": sum(t.completed_chapters for t in topic_rollups),
+                "total_chapters": sum(t.total_chapters for t in topic_rollups),
+                "completed_topics": sum(
+                    1
+                    for t in topic_rollups
+                    if t.total_chapters > 0
+                    and t.completed_chapters == t.total_chapters
+                ),
+                "total_topics": len(topic_rollups),
+            },
+        )
+
+    return subject_rollup
+
+
+def rebuild_student_rollups(student):
+    StudentSubjectProgress.objects.filter(student=student).delete()
+    StudentTopicProgress.objects.filter(student=student).delete()
+    for subject in student.grade.subjects.all():
+        build_subject_rollup(student, subject)
+
+
+def refresh_student_topic_rollup(student_id, topic_id, subject_id):
+    # A completion flipped: only this student's topic and subject rows move
+    StudentTopicProgress.objects.filter(student_id=student_id, topic_id=topic_id).update(
+        completed_chapters=_completed_chapters_subquery(topic_id)
+    )
+    _refresh_subject_rollups(
+        StudentSubjectProgress.objects.filter(
+            student_id=student_id, subject_id=subject_id
+        )
+    )
+
+
+def refresh_topic_rollups(topic_id, subject_id):
+    # Chapters were added to or removed from a topic: every student's row moves
+    StudentTopicProgress.objects.filter(topic_id=topic_id).update(
+        total_chapters=Chapter.objects.filter(topic_id=topic_id).count(),
+        completed_chapters=_completed_chapters_subquery(topic_id),
+    )
+    _refresh_subject_rollups(
+        StudentSubjectProgress.objects.filter(subject_id=subject_id)
+    )
+
+
+def invalidate_subject_rollups(subject_id):
+    # Topics were added, moved or removed: rebuilt lazily on the next read
+    StudentSubjectProgress.objects.filter(subject_id=subject_id).delete()
+    StudentTopicProgress.objects.filter(topic__subject_id=subject_id).delete()
+
+
+def subject_progress(student, subject):
+    subject_rollup = StudentSubjectProgress.objects.filter(
+        student=student, subject=subject
+    ).first()
+    if subject_rollup is None:
+        subject_rollup = build_subject_rollup(student, subject)
+
+    topic_rollups = (
+        StudentTopicProgress.objects.filter(student=student, topic__subject=subject)
+        .select_related("topic")
+        .order_by("topic_id")
+    )
+
+    topic_data = [
+        {
+            "topic": rollup.topic,
+            "num_completed_chapters": rollup.completed_chapters,
+            "num_total_chapters": rollup.total_chapters,
+            "completion_percentage": completion_percentage(
+                rollup.completed_chapters, rollup.total_chapters
+            ),
+        }
+        for rollup in topic_rollups
+    ]
+
+    return {
+        "topics": [data["topic"] for data in topic_data],
+        "topic_data": topic_data,
+        "number_of_topics": subject_rollup.total_topics,
+        "fully_completed_topics": subject_rollup.completed_topics,
+        "subject_completion_percentage": completion_percentage(
+            subject_rollup.completed_topics, subject_rollup.total_topics
+        ),
+    }
+
+
+def topic_progress(student, topic):
+    # Chapters of the topic flagged with the student's completion in one query
+    chapters = (
+        Chapter.objects.filter(topic=topic)
+        .annotate(
+            is_completed=Exists(
+                StudentChapterCompletion.objects.filter(
+                    student=student, chapter=OuterRef("pk"), completed=True
+                )
+            )
+        )
+        .order_by("number")
+    )
+
+    chapters = list(chapters)
+    number_of_chapters = len(chapters)
+    number_of_completed_chapters = sum(1 for chapter in chapters if chapter.is_completed)
+
+    return {
+        "chapters": chapters,
+        "chapter_order": chapters,
+        "number_of_chapters": number_of_chapters,
+        "number_of_completed_chapters": number_of_completed_chapters,
+        "completion_percentage": completion_percentage(
+            number_of_completed_chapters, number_of_chapters
+        ),
+        "chapter_completion": {
+            chapter.id: chapter.is_completed for chapter in chapters
+        },
+    }
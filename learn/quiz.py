@@ -0,0 +1,118 @@
+from dataclasses import dataclass, field
+
+from django.db.models import Count, Prefetch
+
+from .models import ChapterQuiz, ChapterQuestion, ChapterChoice
+from .versioning import bump_cache_version, versioned_cache
+
+
+QUIZ_SNAPSHOT_TIMEOUT = 60 * 60 * 24
+
+
+# QUIZ SNAPSHOTS
+@dataclass(frozen=True)
+class ChoiceSnapshot:
+    id: int
+    question_id: int
+    choice_text: str
+    is_correct: bool
+    explanation: str
+    mark: int
+
+
+@dataclass(frozen=True)
+class QuestionSnapshot:
+    id: int
+    question_text: str
+    choices: tuple
+
+
+@dataclass(frozen=True)
+class QuizSnapshot:
+    quiz_id: int
+    version: str
+    questions: tuple
+    # choice id -> ChoiceSnapshot, for every choice of the quiz
+    choices: dict = field(hash=False)
+    # question id -> ids of its correct choices
+    correct_choices: dict = field(hash=False)
+    # question id -> marks awarded for a correct answer
+    marks: dict = field(hash=False)
+
+    @property
+    def total_marks(self):
+        return sum(self.marks.values())
+
+
+def _snapshot_prefix(quiz_id):
+    return f"learn:quiz:{quiz_id}:snapshot"
+
+
+def invalidate_quiz_snapshot(quiz_id):
+    bump_cache_version(_snapshot_prefix(quiz_id))
+
+
+def build_quiz_snapshot(quiz_id, version=None):
+    # Quiz questions and their choices in two queries, whatever the quiz size
+    choices = ChapterChoice.objects.only(
+        "id", "question_id", "choice_text", "is_correct", "explanation", "mark"
+    ).order_by("id")
+    questions = (
+        ChapterQuestion.objects.filter(quiz_id=quiz_id)
+        .only("id", "quiz_id", "question_text")
+        .prefetch_related(Prefetch("choices", queryset=choices))
+        .order_by("id")
+    )
+
+    question_snapshots = []
+    choice_snapshots = {}
+    correct_choices = {}
+    marks = {}
+    for question in questions:
+        question_choices = tuple(
+            ChoiceSnapshot(
+                id=choice.id,
+                question_id=question.id,
+                choice_text=choice.choice_text,
+                is_correct=choice.is_correct,
+                explanation=choice.explanation or "",
+                mark=choice.mark,
+            )
+            for choice in question.choices.all()
+        )
+        question_snapshots.append(
+            QuestionSnapshot(
+                id=question.id,
+                question_text=question.question_text,
+                choices=question_choices,
+            )
+        )
+        choice_snapshots.update((choice.id, choice) for choice in question_choices)
+        correct = [choice for choice in question_choices if choice.is_correct]
+        correct_choices[question.id] = frozenset(choice.id for choice in correct)
+        marks[question.id] = max((choice.mark for choice in correct), default=0)
+
+    return QuizSnapshot(
+        quiz_id=quiz_id,
+        version=version,
+        questions=tuple(question_snapshots),
+        choices=choice_snapshots,
+        correct_choices=correct_choices,
+        marks=marks,
+    )
+
+
+def get_quiz_snapshot(quiz):
+    quiz_id = quiz.pk if isinstance(quiz, ChapterQuiz) else quiz
+    return versioned_cache(
+        _snapshot_prefix(quiz_id),
+        lambda version: build_quiz_snapshot(quiz_id, version),
+        QUIZ_SNAPSHOT_TIMEOUT,
+    )
+
+
+# QUIZ LOOKUPS
+def chapter_quizzes(chapter):
+    return ChapterQuiz.objects.filter(chapter=chapter).annotate(
+        number_of_questions=Count("questions")
+    )
@@ -0,0 +1,84 @@
+import posixpath
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+
+# Widths (px) generated for a thumbnail, smallest first. Widths above the
+# upload's own are skipped, so an upload narrower than all of them gets none.
+RENDITION_WIDTHS = (320, 640, 1024)
+# (extension, Pillow format, MIME type, save options), preferred format first
+RENDITION_FORMATS = (
+    ("webp", "WEBP", "image/webp", {"quality": 75, "method": 6}),
+    ("jpg", "JPEG", "image/jpeg", {"quality": 78, "optimize": True, "progressive": True}),
+)
+
+
+def rendition_name(name, width, extension):
+    # learn/chapter/thumbnails/a.jpg -> learn/chapter/thumbnails/renditions/a-jpg-320w.webp
+    # The source extension is kept so a.jpg and a.png get separate renditions
+    directory, filename = posixpath.split(name)
+    stem, source_extension = posixpath.splitext(filename)
+    if source_extension:
+        stem = f"{stem}-{source_extension[1:]}"
+    return posixpath.join(directory, "renditions", f"{stem}-{width}w.{extension}")
+
+
+def rendition_names(name):
+    return [
+        rendition_name(name, width, extension)
+        for width in RENDITION_WIDTHS
+        for extension, _, _, _ in RENDITION_FORMATS
+    ]
+
+
+def rendition_widths(source_width):
+    return [width for width in RENDITION_WIDTHS if width <= source_width]
+
+
+def open_image(storage, name):
+    # Fully decode the upload so truncated or non-image files fail here
+    with storage.open(name, "rb") as f:
+        image = Image.open(f)
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    if image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    return image
+
+
+def generate_renditions(storage, name):
+    # Resized, recompressed copies of an uploaded image in every format and
+    # in each width up to its own (see rendition_widths), without its EXIF
+    # data. Returns the widths made. Raises OSError/ValueError for unreadable
+    # images.
+    image = open_image(storage, name)
+    widths = rendition_widths(image.width)
+
+    created = []
+    for width in widths:
+        resized = image
+        if image.width > width:
+            height = max(round(image.height * width / image.width), 1)
+            resized = image.resize((width, height), Image.LANCZOS)
+        for extension, image_format, _, save_options in RENDITION_FORMATS:
+            buffer = BytesIO()
+            resized.save(buffer, image_format, **save_options)
+            rendition = rendition_name(name, width, extension)
+            # Keep the deterministic name instead of a suffixed duplicate
+            if storage.exists(rendition):
+                storage.delete(rendition)
+            created.append(storage.save(rendition, ContentFile(buffer.getvalue())))
+
+    # Widths left by an earlier run of a since replaced image
+    for rendition in rendition_names(name):
+        if rendition not in created and storage.exists(rendition):
+            storage.delete(rendition)
+    return widths
+
+
+def delete_renditions(storage, name):
+    for rendition in rendition_names(name):
+        if storage.exists(rendition):
+            storage.delete(rendition)
@@ -0,0 +1,283 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import (
+    MediaJob,
+    Grade,
+    Student,
+    Subject,
+    Topic,
+    Chapter,
+    StudentChapterCompletion,
+    ChapterQuiz,
+    ChapterQuestion,
+    ChapterChoice,
+)
+from .catalog import (
+    invalidate_grade_catalog,
+    invalidate_subject_catalogs,
+    invalidate_topic_catalogs,
+)
+from .quiz import invalidate_quiz_snapshot
+from .hls import has_hls
+from .jobs import enqueue_media_job
+from .students import invalidate_user_students
+from .progress import (
+    invalidate_subject_rollups,
+    refresh_student_topic_rollup,
+    refresh_topic_rollups,
+)
+
+
+# PROGRESS ROLLUPS
+def _refresh_completion_rollup(completion):
+    topic = (
+        Chapter.objects.filter(pk=completion.chapter_id)
+        .values_list("topic_id", "topic__subject_id")
+        .first()
+    )
+    if topic is not None:
+        refresh_student_topic_rollup(completion.student_id, *topic)
+
+
+def _refresh_topics(topic_ids):
+    for topic_id, subject_id in Topic.objects.filter(pk__in=topic_ids).values_list(
+        "id", "subject_id"
+    ):
+        refresh_topic_rollups(topic_id, subject_id)
+
+
+@receiver(post_save, sender=StudentChapterCompletion)
+def completion_saved(sender, instance, created, raw=False, **kwargs):
+    # get_or_create on first chapter visit stores an incomplete row: nothing moves
+    if raw or (created and not instance.completed):
+        return
+    _refresh_completion_rollup(instance)
+
+
+@receiver(post_delete, sender=StudentChapterCompletion)
+def completion_deleted(sender, instance, **kwargs):
+    if instance.completed:
+        _refresh_completion_rollup(instance)
+
+
+@receiver(pre_save, sender=Chapter)
+def chapter_pre_save(sender, instance, raw=False, **kwargs):
+    if not raw and instance.pk:
+        previous = (
+            Chapter.objects.filter(pk=instance.pk)
+            .values_list("topic_id", "video")
+            .first()
+        )
+        if previous is not None:
+            instance._previous_topic_id, instance._previous_video = previous
+
+
+@receiver(post_save, sender=Chapter)
+def chapter_saved(sender, instance, created, raw=False, **kwargs):
+    previous_topic_id = getattr(instance, "_previous_topic_id", None)
+    if raw or (not created and previous_topic_id == instance.topic_id):
+        return
+    _refresh_topics({instance.topic_id, previous_topic_id} - {None})
+
+
+@receiver(post_delete, sender=Chapter)
+def chapter_deleted(sender, instance, **kwargs):
+    _refresh_topics([instance.topic_id])
+
+
+@receiver(pre_save, sender=Topic)
+def topic_pre_save(sender, instance, raw=False, **kwargs):
+    if not raw and instance.pk:
+        instance._previous_subject_id = (
+            Topic.objects.filter(pk=instance.pk)
+            .values_list("subject_id", flat=True)
+            .first()
+        )
+
+
+@receiver(post_save, sender=Topic)
+def topic_saved(sender, instance, created, raw=False, **kwargs):
+    previous_subject_id = getattr(instance, "_previous_subject_id", None)
+    if raw or (not created and previous_subject_id == instance.subject_id):
+        return
+    for subject_id in {instance.subject_id, previous_subject_id} - {None}:
+        invalidate_subject_rollups(subject_id)
+
+
+@receiver(post_delete, sender=Topic)
+def topic_deleted(sender, instance, **kwargs):
+    invalidate_subject_rollups(instance.subject_id)
+
+
+# QUIZ SNAPSHOTS
+# Versions are bumped once the change is committed: bumped earlier, a reader
+# could rebuild from the old rows and cache them under the new version.
+@receiver(post_save, sender=ChapterQuiz)
+@receiver(post_delete, sender=ChapterQuiz)
+def quiz_changed(sender, instance, **kwargs):
+    transaction.on_commit(partial(invalidate_quiz_snapshot, instance.pk))
+
+
+@receiver(pre_save, sender=ChapterQuestion)
+def question_pre_save(sender, instance, raw=False, **kwargs):
+    if not raw and instance.pk:
+        instance._previous_quiz_id = (
+            ChapterQuestion.objects.filter(pk=instance.pk)
+            .values_list("quiz_id", flat=True)
+            .first()
+        )
+
+
+@receiver(post_save, sender=ChapterQuestion)
+@receiver(post_delete, sender=ChapterQuestion)
+def question_changed(sender, instance, **kwargs):
+    previous_quiz_id = getattr(instance, "_previous_quiz_id", None)
+    for quiz_id in {instance.quiz_id, previous_quiz_id} - {None}:
+        transaction.on_commit(partial(invalidate_quiz_snapshot, quiz_id))
+
+
+@receiver(post_save, sender=ChapterChoice)
+@receiver(post_delete, sender=ChapterChoice)
+def choice_changed(sender, instance, **kwargs):
+    quiz_id = (
+        ChapterQuestion.objects.filter(pk=instance.question_id)
+        .values_list("quiz_id", flat=True)
+        .first()
+    )
+    if quiz_id is not None:
+        transaction.on_commit(partial(invalidate_quiz_snapshot, quiz_id))
+
+
+# THUMBNAIL RENDITIONS
+@receiver(pre_save, sender=Subject)
+@receiver(pre_save, sender=Topic)
+@receiver(pre_save, sender=Chapter)
+def thumbnail_pre_save(sender, instance, raw=False, **kwargs):
+    # Widths recorded for a replaced image do not apply to the new one
+    if not raw and instance.pk:
+        previous = sender.objects.filter(pk=instance.pk).values_list("thumbnail", flat=True).first()
+        if previous != instance.thumbnail.name:
+            instance.thumbnail_widths = None
+
+
+@receiver(post_save, sender=Subject)
+@receiver(post_save, sender=Topic)
+@receiver(post_save, sender=Chapter)
+def thumbnail_saved(sender, instance, raw=False, **kwargs):
+    # The run_media_jobs worker makes the renditions and records their widths
+    thumbnail = instance.thumbnail
+    if raw or not thumbnail or instance.thumbnail_widths is not None:
+        return
+    enqueue_media_job(MediaJob.GENERATE_RENDITIONS, thumbnail.name)
+
+
+@receiver(post_delete, sender=Subject)
+@receiver(post_delete, sender=Topic)
+@receiver(post_delete, sender=Chapter)
+def thumbnail_deleted(sender, instance, **kwargs):
+    # Also runs for cascades and queryset deletes, which skip Model.delete().
+    # The upload is removed once the delete is committed.
+    thumbnail = instance.thumbnail
+    if thumbnail:
+        enqueue_media_job(MediaJob.DELETE_RENDITIONS, thumbnail.name)
+        transaction.on_commit(partial(thumbnail.storage.delete, thumbnail.name))
+
+
+# CHAPTER VIDEOS
+@receiver(post_save, sender=Chapter)
+def video_saved(sender, instance, created, raw=False, **kwargs):
+    # Only a new or replaced video is packaged, by the run_media_jobs worker;
+    # a replaced video's segments are removed there too, and its upload once
+    # the change is committed
+    previous = getattr(instance, "_previous_video", None)
+    video = instance.video
+    if raw or (not created and previous == video.name):
+        return
+    if previous:
+        enqueue_media_job(MediaJob.DELETE_VIDEO_SEGMENTS, previous)
+        transaction.on_commit(partial(video.storage.delete, previous))
+    if video and not has_hls(video.storage, video.name):
+        enqueue_media_job(MediaJob.SEGMENT_VIDEO, video.name)
+
+
+@receiver(post_delete, sender=Chapter)
+def video_deleted(sender, instance, **kwargs):
+    # Like thumbnail_deleted, also for cascades and queryset deletes
+    video = instance.video
+    if video:
+        enqueue_media_job(MediaJob.DELETE_VIDEO_SEGMENTS, video.name)
+        transaction.on_commit(partial(video.storage.delete, video.name))
+
+
+# STUDENT LISTS
+# Bumped after commit, like the quiz snapshots
+@receiver(pre_save, sender=Student)
+def student_pre_save(sender, instance, raw=False, **kwargs):
+    if not raw and instance.pk:
+        instance._previous_user_id = (
+            Student.objects.filter(pk=instance.pk)
+            .values_list("user_id", flat=True)
+            .first()
+        )
+
+
+@receiver(post_save, sender=Student)
+@receiver(post_delete, sender=Student)
+def student_changed(sender, instance, **kwargs):
+    for user_id in {instance.user_id, getattr(instance, "_previous_user_id", None)} - {None}:
+        transaction.on_commit(partial(invalidate_user_students, user_id))
+
+
+@receiver(post_save, sender=Grade)
+def grade_saved(sender, instance, created, raw=False, **kwargs):
+    # Student cards show the grade name
+    if raw or created:
+        return
+    for user_id in Student.objects.filter(grade=instance).values_list("user_id", flat=True).distinct():
+        transaction.on_commit(partial(invalidate_user_students, user_id))
+
+
+# GRADE CATALOG
+# Bumped after commit, like the quiz snapshots. Parents removed by the same
+# cascade are left to their own receivers.
+@receiver(pre_save, sender=Subject)
+def subject_pre_save(sender, instance, raw=False, **kwargs):
+    if not raw and instance.pk:
+        instance._previous_grade_id = (
+            Subject.objects.filter(pk=instance.pk)
+            .values_list("grade_id", flat=True)
+            .first()
+        )
+
+
+@receiver(post_save, sender=Subject)
+@receiver(post_delete, sender=Subject)
+def subject_catalog_changed(sender, instance, **kwargs):
+    for grade_id in {instance.grade_id, getattr(instance, "_previous_grade_id", None)} - {None}:
+        transaction.on_commit(partial(invalidate_grade_catalog, grade_id))
+
+
+@receiver(post_save, sender=Topic)
+@receiver(post_delete, sender=Topic)
+def topic_catalog_changed(sender, instance, **kwargs):
+    transaction.on_commit(
+        partial(
+            invalidate_subject_catalogs,
+            {instance.subject_id, getattr(instance, "_previous_subject_id", None)} - {None},
+        )
+    )
+
+
+@receiver(post_save, sender=Chapter)
+@receiver(post_delete, sender=Chapter)
+def chapter_catalog_changed(sender, instance, **kwargs):
+    transaction.on_commit(
+        partial(
+            invalidate_topic_catalogs,
+            {instance.topic_id, getattr(instance, "_previous_topic_id", None)} - {None},
+        )
+    )
@@ -0,0 +1,27 @@
+from .models import Student
+from .versioning import bump_cache_version, cache_version, versioned_cache
+
+
+STUDENT_LIST_TIMEOUT = 60 * 60 * 24
+
+
+# PER-USER STUDENT LIST
+def _students_prefix(user_id):
+    return f"learn:user:{user_id}:students"
+
+
+def user_students_version(user_id):
+    # Also keys the cached dashboard fragments, so they change with the list
+    return cache_version(_students_prefix(user_id))
+
+
+def invalidate_user_students(user_id):
+    bump_cache_version(_students_prefix(user_id))
+
+
+def user_students(user):
+    return versioned_cache(
+        _students_prefix(user.pk),
+        lambda version: list(Student.objects.filter(user=user).select_related("grade").order_by("id")),
+        STUDENT_LIST_TIMEOUT,
+    )
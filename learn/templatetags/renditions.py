@@ -0,0 +1,50 @@
+from django import template
+from django.core.files.storage import default_storage
+from django.utils.html import format_html, format_html_join
+
+from learn.renditions import RENDITION_FORMATS, rendition_name
+
+register = template.Library()
+
+
+def _srcset(storage, name, widths, extension):
+    return ", ".join(
+        f"{storage.url(rendition_name(name, width, extension))} {width}w"
+        for width in widths
+    )
+
+
+@register.simple_tag
+def responsive_image(image, widths=None, alt="", sizes="100vw", css_class="", loading="lazy"):
+    # <picture> with a srcset per rendition format; the original upload until
+    # renditions were recorded, or when it is too small to have any. image is
+    # an image field file or the storage name of one, widths its recorded
+    # thumbnail_widths.
+    if not image:
+        return ""
+    storage = getattr(image, "storage", default_storage)
+    name = getattr(image, "name", image)
+    if not widths:
+        return format_html(
+            '<img src="{}" alt="{}" class="{}" loading="{}" />',
+            storage.url(name),
+            alt,
+            css_class,
+            loading,
+        )
+
+    *sources, (fallback_extension, _, _, _) = RENDITION_FORMATS
+    return format_html(
+        '<picture>{}<img src="{}" srcset="{}" sizes="{}" alt="{}" class="{}" loading="{}" /></picture>',
+        format_html_join(
+            "",
+            '<source type="{}" srcset="{}" sizes="{}" />',
+            ((mime_type, _srcset(storage, name, widths, extension), sizes) for extension, _, mime_type, _ in sources),
+        ),
+        storage.url(rendition_name(name, widths[-1], fallback_extension)),
+        _srcset(storage, name, widths, fallback_extension),
+        sizes,
+        alt,
+        css_class,
+        loading,
+    )
@@ -1,3 +1,790 @@
-from django.test import TestCase
+import json
+import os
+import re
+import subprocess
+import tempfile
+from io import BytesIO, StringIO
+from types import SimpleNamespace
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Exists, OuterRef
+from django.http import Http404
+from django.urls import reverse
+from PIL import Image
+from django.test import RequestFactory, TestCase, override_settings
+
+from .models import (
+    Grade,
+    Student,
+    Subject,
+    Topic,
+    Chapter,
+    StudentChapterCompletion,
+    StudentTopicProgress,
+    StudentSubjectProgress,
+    ChapterQuiz,
+    ChapterQuestion,
+    ChapterChoice,
+    ChapterStudentResponse,
+    QuizAttempt,
+    MediaJob,
+)
+from .datagen import generate_learn_data
+from .decorators import resolve_learn_path
+from .views import chapter_quiz_questions
+from .grading import grade_submission, regrade_quiz
+from .hls import (
+    HLS_CONTENT_TYPE,
+    HLS_MASTER,
+    delete_hls,
+    has_hls,
+    hls_directory,
+    hls_variants,
+    player_source,
+    segment_video,
+)
+from .jobs import enqueue_media_job, process_media_jobs
+from .renditions import delete_renditions, generate_renditions, rendition_name
+from .templatetags.renditions import responsive_image
+from .progress import build_subject_rollup, rebuild_student_rollups, subject_progress, topic_progress
+from .catalog import grade_catalog
+from .quiz import get_quiz_snapshot
+from .students import user_students
+
+
+class LearnDataMixin:
+    # A grade with one student and a subject of two topics (2 + 1 chapters)
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("parent", password="pw")
+        cls.grade = Grade.objects.create(name="Grade 1")
+        cls.student = Student.objects.create(user=cls.user, first_name="Ann", grade=cls.grade)
+        cls.subject = Subject.objects.create(grade=cls.grade, name="Math")
+        cls.topic = Topic.objects.create(subject=cls.subject, name="Numbers")
+        cls.other_topic = Topic.objects.create(subject=cls.subject, name="Shapes")
+        cls.chapters = [
+            Chapter.objects.create(topic=cls.topic, name="One", number=1),
+            Chapter.objects.create(topic=cls.topic, name="Two", number=2),
+        ]
+        cls.other_chapter = Chapter.objects.create(topic=cls.other_topic, name="Circles", number=3)
+
+    def complete(self, chapter, completed=True, student=None):
+        completion, _ = StudentChapterCompletion.objects.update_or_create(
+            student=student or self.student, chapter=chapter, defaults={"completed": completed}
+        )
+        return completion
+
+
+class QuizDataMixin(LearnDataMixin):
+    # A quiz on the first chapter: question 1 is worth 2 marks, question 2 one
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.quiz = ChapterQuiz.objects.create(chapter=cls.chapters[0], title="Quiz", duration=300)
+        cls.questions = []
+        cls.right = []
+        cls.wrong = []
+        for number, mark in enumerate((2, 1)):
+            question = ChapterQuestion.objects.create(quiz=cls.quiz, question_text=f"Q{number}")
+            cls.questions.append(question)
+            cls.right.append(
+                ChapterChoice.objects.create(question=question, choice_text="Yes", is_correct=True, mark=mark)
+            )
+            cls.wrong.append(ChapterChoice.objects.create(question=question, choice_text="No"))
+
+
+# PROGRESS
+class ProgressTests(LearnDataMixin, TestCase):
+    def test_topic_progress_flags_completed_chapters(self):
+        self.complete(self.chapters[0])
+        self.complete(self.chapters[1], completed=False)
+
+        with self.assertNumQueries(1):
+            progress = topic_progress(self.student, self.topic)
+
+        self.assertEqual(progress["number_of_chapters"], 2)
+        self.assertEqual(progress["number_of_completed_chapters"], 1)
+        self.assertEqual(progress["completion_percentage"], 50)
+        self.assertEqual(
+            progress["chapter_completion"],
+            {self.chapters[0].id: True, self.chapters[1].id: False},
+        )
+
+    def test_subject_progress_counts_fully_completed_topics(self):
+        self.complete(self.chapters[0])
+        self.complete(self.other_chapter)
+
+        progress = subject_progress(self.student, self.subject)
+
+        self.assertEqual(progress["number_of_topics"], 2)
+        self.assertEqual(progress["fully_completed_topics"], 1)
+        self.assertEqual(progress["subject_completion_percentage"], 50)
+        by_topic = {data["topic"]: data for data in progress["topic_data"]}
+        self.assertEqual(by_topic[self.topic]["num_completed_chapters"], 1)
+        self.assertEqual(by_topic[self.topic]["completion_percentage"], 50)
+        self.assertEqual(by_topic[self.other_topic]["completion_percentage"], 100)
+
+    def test_other_students_do_not_count(self):
+        other = Student.objects.create(user=self.user, first_name="Ben", grade=self.grade)
+        self.complete(self.chapters[0], student=other)
+
+        self.assertEqual(topic_progress(self.student, self.topic)["number_of_completed_chapters"], 0)
+        self.assertEqual(subject_progress(self.student, self.subject)["fully_completed_topics"], 0)
+
+
+# PROGRESS ROLLUPS
+class ProgressRollupTests(LearnDataMixin, TestCase):
+    def setUp(self):
+        subject_progress(self.student, self.subject)
+
+    def rollups(self):
+        topics = {
+            rollup.topic_id: (rollup.completed_chapters, rollup.total_chapters)
+            for rollup in StudentTopicProgress.objects.filter(student=self.student)
+        }
+        subject = StudentSubjectProgress.objects.filter(student=self.student, subject=self.subject).values_list(
+            "completed_chapters", "total_chapters", "completed_topics", "total_topics"
+        ).first()
+        return topics, subject
+
+    def assertMatchesRebuild(self):
+        current = self.rollups()
+        rebuild_student_rollups(self.student)
+        self.assertEqual(current, self.rollups())
+
+    def test_completion_updates_only_the_students_rows(self):
+        self.complete(self.other_chapter)
+
+        topics, subject = self.rollups()
+        self.assertEqual(topics[self.other_topic.id], (1, 1))
+        self.assertEqual(subject, (1, 3, 1, 2))
+        self.assertMatchesRebuild()
+
+    def test_uncompleting_and_deleting_a_completion(self):
+        self.complete(self.chapters[0])
+        self.complete(self.chapters[0], completed=False)
+        self.assertEqual(self.rollups()[0][self.topic.id], (0, 2))
+
+        self.complete(self.chapters[1]).delete()
+        self.assertEqual(self.rollups()[0][self.topic.id], (0, 2))
+        self.assertMatchesRebuild()
+
+    def test_chapter_added_moved_and_deleted(self):
+        self.complete(self.other_chapter)
+        chapter = Chapter.objects.create(topic=self.other_topic, name="Squares", number=4)
+        self.assertEqual(self.rollups()[1], (1, 4, 0, 2))
+
+        chapter.topic = self.topic
+        chapter.save()
+        topics, subject = self.rollups()
+        self.assertEqual((topics[self.topic.id], topics[self.other_topic.id]), ((0, 3), (1, 1)))
+        self.assertEqual(subject, (1, 4, 1, 2))
+
+        self.other_chapter.delete()
+        self.assertEqual(self.rollups()[1], (0, 3, 0, 2))
+        self.assertMatchesRebuild()
+
+    def test_topic_changes_rebuild_the_subject_on_next_read(self):
+        Topic.objects.create(subject=self.subject, name="Empty")
+        self.assertIsNone(self.rollups()[1])
+
+        progress = subject_progress(self.student, self.subject)
+        self.assertEqual(progress["number_of_topics"], 3)
+        self.assertMatchesRebuild()
+
+
+# QUIZ SNAPSHOTS
+class QuizSnapshotTests(QuizDataMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_changes_invalidate_the_snapshot_after_commit(self):
+        snapshot = get_quiz_snapshot(self.quiz.pk)
+        self.assertEqual(snapshot.marks, {self.questions[0].id: 2, self.questions[1].id: 1})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.right[1].mark = 5
+            self.right[1].save()
+            # Not committed yet: readers keep the snapshot of the committed rows
+            self.assertEqual(get_quiz_snapshot(self.quiz.pk).version, snapshot.version)
+
+        self.assertEqual(get_quiz_snapshot(self.quiz.pk).marks[self.questions[1].id], 5)
+
+
+# GRADING
+class GradingTests(QuizDataMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def submit_url(self):
+        return reverse(
+            "chapter_quiz_submit",
+            args=[
+                self.student.student_slug,
+                self.subject.subject_slug,
+                self.topic.topic_slug,
+                self.chapters[0].chapter_slug,
+                self.quiz.quiz_slug,
+            ],
+        )
+
+    def test_marks_come_from_the_correct_choice(self):
+        snapshot = get_quiz_snapshot(self.quiz.pk)
+
+        result = grade_submission(snapshot, {self.questions[0].id: self.right[0].id})
+        self.assertEqual((result.score, result.total, result.percentage), (2, 3, 67))
+        self.assertEqual((result.correct_answers, result.incorrect_answers, result.unanswered), (1, 0, 1))
+
+        result = grade_submission(
+            snapshot, {self.questions[0].id: self.wrong[0].id, self.questions[1].id: self.right[1].id}
+        )
+        self.assertEqual((result.score, result.correct_answers, result.incorrect_answers), (1, 1, 1))
+
+    def test_submit_stores_the_attempt_and_replaces_responses(self):
+        self.client.force_login(self.user)
+        for choices in ((self.wrong[0], self.wrong[1]), (self.right[0], self.wrong[1])):
+            response = self.client.post(self.submit_url(), {str(c.question_id): str(c.id) for c in choices})
+            self.assertEqual(response.status_code, 302)
+
+        attempt = QuizAttempt.objects.filter(student=self.student, quiz=self.quiz).latest()
+        self.assertEqual((attempt.score, attempt.total, attempt.correct_answers), (2, 3, 1))
+        self.assertEqual(QuizAttempt.objects.filter(student=self.student, quiz=self.quiz).count(), 2)
+        self.assertEqual(
+            set(ChapterStudentResponse.objects.filter(student=self.student).values_list("choice_id", flat=True)),
+            {self.right[0].id, self.wrong[1].id},
+        )
+
+    def test_submit_rejects_a_choice_of_another_question(self):
+        self.client.force_login(self.user)
+        response = self.client.post(self.submit_url(), {str(self.questions[0].id): str(self.right[1].id)})
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(QuizAttempt.objects.exists())
+
+    def test_regrade_updates_each_students_latest_attempt(self):
+        self.client.force_login(self.user)
+        self.client.post(self.submit_url(), {str(self.questions[1].id): str(self.wrong[1].id)})
+        self.client.post(self.submit_url(), {str(self.questions[1].id): str(self.right[1].id)})
+        first, latest = QuizAttempt.objects.order_by("date_submitted", "id")
+
+        # The answer key is corrected: "No" was the right answer
+        ChapterChoice.objects.filter(pk=self.right[1].pk).update(is_correct=False)
+        ChapterChoice.objects.filter(pk=self.wrong[1].pk).update(is_correct=True, mark=4)
+
+        self.assertEqual(regrade_quiz(self.quiz), 1)
+        latest.refresh_from_db()
+        first.refresh_from_db()
+        self.assertEqual((latest.score, latest.total, latest.correct_answers, latest.unanswered), (0, 6, 0, 1))
+        self.assertEqual((first.score, first.total), (0, 3))
+
+
+# LEARN PATHS
+# The views render templates; {% static %} from the manifest storage would
+# need a collected STATIC_ROOT
+PLAIN_STATIC_STORAGES = {
+    **settings.STORAGES,
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+
+
+@override_settings(STORAGES=PLAIN_STATIC_STORAGES)
+class LearnPathTests(QuizDataMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.other_user = User.objects.create_user("other", password="pw")
+        cls.other_student = Student.objects.create(user=cls.other_user, first_name="Ben", grade=cls.grade)
+
+    def slugs(self, student):
+        return [
+            student.student_slug,
+            self.subject.subject_slug,
+            self.topic.topic_slug,
+            self.chapters[0].chapter_slug,
+            self.quiz.quiz_slug,
+        ]
+
+    def test_other_users_students_are_not_found(self):
+        self.client.force_login(self.user)
+        for name, levels in (
+            ("student_dashboard", 1),
+            ("subject_dashboard", 2),
+            ("chapter_dashboard", 4),
+            ("chapter_quiz_overview", 5),
+        ):
+            with self.subTest(name):
+                own = self.client.get(reverse(name, args=self.slugs(self.student)[:levels]))
+                other = self.client.get(reverse(name, args=self.slugs(self.other_student)[:levels]))
+                self.assertEqual((own.status_code, other.status_code), (200, 404))
+
+    def test_shared_slug_resolves_to_the_users_own_student(self):
+        twin = Student.objects.create(user=self.other_user, first_name="Ann", grade=self.grade)
+        self.assertEqual(twin.student_slug, self.student.student_slug)
+
+        self.assertEqual(resolve_learn_path(self.user, "ann")["student"], self.student)
+        self.assertEqual(resolve_learn_path(self.other_user, "ann")["student"], twin)
+
+    def test_quiz_question_is_resolved_within_the_path(self):
+        other_quiz = ChapterQuiz.objects.create(chapter=self.chapters[0], title="Other", duration=60)
+        elsewhere = ChapterQuestion.objects.create(quiz=other_quiz, question_text="Elsewhere")
+        request = RequestFactory().get("/")
+        request.user = self.user
+        slugs = dict(zip(("student_slug", "subject_slug", "topic_slug", "chapter_slug", "quiz_slug"), self.slugs(self.student)))
+
+        response = chapter_quiz_questions(request, question_id=self.questions[0].id, **slugs)
+
+        self.assertEqual(response.status_code, 200)
+        with self.assertRaises(Http404):
+            chapter_quiz_questions(request, question_id=elsewhere.id, **slugs)
+        with self.assertRaises(Http404):
+            slugs["student_slug"] = self.other_student.student_slug
+            chapter_quiz_questions(request, question_id=self.questions[0].id, **slugs)
+
+
+# QUERY PLANS
+# Tables that grow with the number of students; a full scan of any of them
+# on a request path is a missing index.
+LARGE_TABLES = (
+    Student._meta.db_table,
+    StudentChapterCompletion._meta.db_table,
+    ChapterStudentResponse._meta.db_table,
+    QuizAttempt._meta.db_table,
+)
+
+FULL_SCAN = {
+    "sqlite": r"\bSCAN (\w+)(?! USING (?:COVERING )?INDEX)",
+    "postgresql": r"Seq Scan on (\w+)",
+}
+
+
+@skipUnless(connection.vendor in FULL_SCAN, "No plan check for this database")
+class QueryPlanTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # 10 subjects x 10 topics x 5 chapters, half completed by each of 400
+        # students: about 100k completions
+        data = generate_learn_data(subjects=10, topics=10, chapters=5, questions=5, students=400)
+        if connection.vendor == "sqlite":
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+        cls.student = data.students[0]
+        cls.quiz = data.quizzes[-1]
+        cls.chapter = cls.quiz.chapter
+
+    def test_plans_are_checked_at_100k_completions(self):
+        self.assertGreaterEqual(StudentChapterCompletion.objects.count(), 90_000)
+
+    def explain(self, sql, params):
+        prefix = "EXPLAIN QUERY PLAN " if connection.vendor == "sqlite" else "EXPLAIN "
+        with connection.cursor() as cursor:
+            cursor.execute(prefix + sql, params)
+            return "\n".join(" ".join(map(str, row)) for row in cursor.fetchall())
+
+    def assertUsesIndexes(self, plan):
+        scanned = [
+            table
+            for table in re.findall(FULL_SCAN[connection.vendor], plan)
+            if table in LARGE_TABLES
+        ]
+        self.assertEqual(scanned, [], plan)
+
+    def test_view_lookups_use_indexes(self):
+        queries = {
+            "student lookup": Student.objects.filter(
+                user=self.student.user, student_slug=self.student.student_slug
+            ),
+            "completion get_or_create": StudentChapterCompletion.objects.filter(
+                student=self.student, chapter=self.chapter
+            ),
+            "topic progress": Chapter.objects.filter(topic=self.chapter.topic).annotate(
+                is_completed=Exists(
+                    StudentChapterCompletion.objects.filter(
+                        student=self.student, chapter=OuterRef("pk"), completed=True
+                    )
+                )
+            ),
+            "quiz responses": ChapterStudentResponse.objects.filter(
+                student=self.student, quiz=self.quiz
+            ),
+            "latest attempt": QuizAttempt.objects.filter(
+                student=self.student, quiz=self.quiz
+            ).order_by("-date_submitted"),
+        }
+        for name, query in queries.items():
+            with self.subTest(name):
+                self.assertUsesIndexes(query.explain())
+
+    def test_learn_path_lookups_use_indexes(self):
+        captured = []
+
+        def capture(execute, sql, params, many, context):
+            captured.append((sql, params))
+            return execute(sql, params, many, context)
+
+        topic = self.chapter.topic
+        with connection.execute_wrapper(capture):
+            resolve_learn_path(
+                self.student.user,
+                self.student.student_slug,
+                subject_slug=topic.subject.subject_slug,
+                topic_slug=topic.topic_slug,
+                chapter_slug=self.chapter.chapter_slug,
+                quiz_slug=self.quiz.quiz_slug,
+            )
+        self.assertTrue(captured)
+        for sql, params in captured:
+            with self.subTest(sql):
+                self.assertUsesIndexes(self.explain(sql, params))
+
+    def test_chapter_completion_is_unique(self):
+        StudentChapterCompletion.objects.filter(student=self.student, chapter=self.chapter).delete()
+        StudentChapterCompletion.objects.create(student=self.student, chapter=self.chapter)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            StudentChapterCompletion.objects.create(student=self.student, chapter=self.chapter)
+
+
+# THUMBNAIL RENDITIONS
+class RenditionTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.storage = FileSystemStorage(location=directory.name, base_url="/media/")
+
+    def upload(self, width, name="thumbs/a.png", image_format="PNG"):
+        buffer = BytesIO()
+        Image.new("RGB", (width, width // 2), "red").save(buffer, image_format)
+        return self.storage.save(name, ContentFile(buffer.getvalue()))
+
+    def test_widths_above_the_source_are_not_made(self):
+        name = self.upload(700)
+
+        self.assertEqual(generate_renditions(self.storage, name), [320, 640])
+        with self.storage.open(rendition_name(name, 640, "jpg")) as f:
+            self.assertEqual(Image.open(f).width, 640)
+        self.assertFalse(self.storage.exists(rendition_name(name, 1024, "jpg")))
+
+    def test_small_images_get_no_renditions(self):
+        name = self.upload(200)
+
+        self.assertEqual(generate_renditions(self.storage, name), [])
+        self.assertEqual(self.storage.listdir("thumbs"), ([], ["a.png"]))
+        html = responsive_image(SimpleNamespace(storage=self.storage, name=name), [])
+        self.assertEqual(html, '<img src="/media/thumbs/a.png" alt="" class="" loading="lazy" />')
+
+    def test_regenerating_drops_widths_that_no_longer_apply(self):
+        name = self.upload(1200)
+        self.assertEqual(generate_renditions(self.storage, name), [320, 640, 1024])
+
+        with self.storage.open(name, "wb") as f:
+            Image.new("RGB", (400, 200), "blue").save(f, "PNG")
+        self.assertEqual(generate_renditions(self.storage, name), [320])
+        self.assertFalse(self.storage.exists(rendition_name(name, 1024, "jpg")))
+
+    def test_same_stem_uploads_keep_separate_renditions(self):
+        png = self.upload(700)
+        jpg = self.upload(400, "thumbs/a.jpg", "JPEG")
+        generate_renditions(self.storage, png)
+        generate_renditions(self.storage, jpg)
+
+        delete_renditions(self.storage, jpg)
+        with self.storage.open(rendition_name(png, 320, "webp")) as f:
+            self.assertEqual(Image.open(f).width, 320)
+        self.assertTrue(self.storage.exists(rendition_name(png, 640, "jpg")))
+        self.assertFalse(self.storage.exists(rendition_name(jpg, 320, "webp")))
+
+    def test_srcset_comes_from_the_recorded_widths(self):
+        image = SimpleNamespace(storage=self.storage, name="thumbs/a.png")
+
+        with mock.patch.object(FileSystemStorage, "exists") as exists:
+            html = responsive_image(image, [320, 640])
+
+        exists.assert_not_called()
+        self.assertIn('srcset="/media/thumbs/renditions/a-png-320w.webp 320w, /media/thumbs/renditions/a-png-640w.webp 640w"', html)
+        self.assertIn('src="/media/thumbs/renditions/a-png-640w.jpg"', html)
+
+
+# BACKGROUND JOBS
+class MediaTestMixin:
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        media = self.settings(MEDIA_ROOT=directory.name)
+        media.enable()
+        self.addCleanup(media.disable)
+
+    def jobs(self, kind):
+        return set(MediaJob.objects.filter(kind=kind).values_list("file_name", flat=True))
+
+
+class UploadCleanupTests(MediaTestMixin, LearnDataMixin, TestCase):
+    def test_cascade_delete_removes_thumbnails_after_commit(self):
+        subject = Subject.objects.create(
+            grade=self.grade, name="Art", thumbnail=ContentFile(b"subject", name="s.jpg")
+        )
+        topic = Topic.objects.create(subject=subject, name="Colour", thumbnail=ContentFile(b"topic", name="t.jpg"))
+        names = {subject.thumbnail.name, topic.thumbnail.name}
+        storage = subject.thumbnail.storage
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Subject.objects.filter(pk=subject.pk).delete()
+            # Until the delete commits the uploads stay
+            self.assertTrue(all(storage.exists(name) for name in names))
+
+        self.assertEqual(self.jobs(MediaJob.DELETE_RENDITIONS), names)
+        self.assertFalse(any(storage.exists(name) for name in names))
+
+
+class ThumbnailJobTests(MediaTestMixin, LearnDataMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def png(self, width):
+        buffer = BytesIO()
+        Image.new("RGB", (width, width // 2), "red").save(buffer, "PNG")
+        return ContentFile(buffer.getvalue(), name="art.png")
+
+    def test_worker_records_widths_for_the_catalog(self):
+        subject = Subject.objects.create(grade=self.grade, name="Art", thumbnail=self.png(700))
+        self.assertEqual(self.jobs(MediaJob.GENERATE_RENDITIONS), {subject.thumbnail.name})
+        self.assertEqual(grade_catalog(self.grade.pk)[-1].thumbnail_widths, ())
+
+        process_media_jobs()
+
+        subject.refresh_from_db()
+        self.assertEqual(subject.thumbnail_widths, [320, 640])
+        self.assertEqual(grade_catalog(self.grade.pk)[-1].thumbnail_widths, (320, 640))
+
+    def test_replaced_thumbnail_forgets_its_widths(self):
+        subject = Subject.objects.create(grade=self.grade, name="Art", thumbnail=self.png(700))
+        process_media_jobs()
+        subject.refresh_from_db()
+
+        subject.description = "Colours"
+        subject.save()
+        self.assertEqual(MediaJob.objects.count(), 1)
+
+        subject.thumbnail = self.png(1200)
+        subject.save()
+        self.assertIsNone(subject.thumbnail_widths)
+        self.assertEqual(MediaJob.objects.filter(status=MediaJob.PENDING).count(), 1)
+
+
+class VideoJobTests(MediaTestMixin, LearnDataMixin, TestCase):
+    def add_video(self, chapter):
+        chapter.video = ContentFile(b"video", name="lesson.mp4")
+        chapter.save()
+        return chapter.video.name
+
+    def test_only_new_or_replaced_videos_are_segmented(self):
+        chapter = Chapter.objects.create(
+            topic=self.topic, name="Film", number=4, video=ContentFile(b"video", name="film.mp4")
+        )
+        first = chapter.video.name
+        self.assertEqual(self.jobs(MediaJob.SEGMENT_VIDEO), {first})
+
+        # Edits that keep the video queue nothing, even once the job is done
+        MediaJob.objects.update(status=MediaJob.DONE)
+        chapter.name = "Film 2"
+        chapter.save()
+        self.assertEqual(MediaJob.objects.count(), 1)
+
+        second = self.add_video(chapter)
+        self.assertEqual(self.jobs(MediaJob.SEGMENT_VIDEO), {first, second})
+        self.assertEqual(self.jobs(MediaJob.DELETE_VIDEO_SEGMENTS), {first})
+
+    def test_replaced_or_cleared_upload_is_deleted_after_commit(self):
+        chapter = self.chapters[0]
+        first = self.add_video(chapter)
+        storage = chapter.video.storage
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second = self.add_video(chapter)
+            self.assertTrue(storage.exists(first))
+        self.assertFalse(storage.exists(first))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            chapter.video = None
+            chapter.save()
+        self.assertFalse(storage.exists(second))
+        self.assertEqual(self.jobs(MediaJob.DELETE_VIDEO_SEGMENTS), {first, second})
+
+    def test_running_job_is_not_queued_again(self):
+        name = self.add_video(self.chapters[0])
+        MediaJob.objects.update(status=MediaJob.RUNNING)
+
+        enqueue_media_job(MediaJob.SEGMENT_VIDEO, name)
+
+        self.assertEqual(MediaJob.objects.filter(kind=MediaJob.SEGMENT_VIDEO).count(), 1)
+
+    def test_cascade_delete_removes_video_after_commit(self):
+        name = self.add_video(self.chapters[0])
+        storage = self.chapters[0].video.storage
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Topic.objects.filter(pk=self.topic.pk).delete()
+            self.assertTrue(storage.exists(name))
+
+        self.assertEqual(self.jobs(MediaJob.DELETE_VIDEO_SEGMENTS), {name})
+        self.assertFalse(storage.exists(name))
+
+
+# HLS PACKAGING
+class HlsTests(MediaTestMixin, LearnDataMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.chapter = self.chapters[0]
+        self.chapter.video = ContentFile(b"video", name="lesson.mp4")
+        self.chapter.save()
+        self.video = self.chapter.video
+        self.height = 720
+        run = mock.patch("learn.hls.subprocess.run", side_effect=self.fake_run)
+        self.subprocess_run = run.start()
+        self.addCleanup(run.stop)
+
+    def fake_run(self, command, **kwargs):
+        if command[0] == settings.HLS_FFPROBE:
+            streams = [{"codec_type": "video", "height": self.height}, {"codec_type": "audio"}]
+            return subprocess.CompletedProcess(command, 0, json.dumps({"streams": streams}), "")
+        # ffmpeg: a playlist and a segment per variant, then the master
+        output = os.path.dirname(os.path.dirname(command[-1]))
+        stream_map = command[command.index("-var_stream_map") + 1]
+        for entry in stream_map.split():
+            variant = os.path.join(output, entry.rsplit("name:", 1)[1])
+            os.makedirs(variant)
+            for filename in ("index.m3u8", "segment-000.ts"):
+                with open(os.path.join(variant, filename), "w") as f:
+                    f.write(filename)
+        with open(os.path.join(output, HLS_MASTER), "w") as f:
+            f.write("#EXTM3U")
+        return subprocess.CompletedProcess(command, 0, "", "")
+
+    def ffmpeg_calls(self):
+        return [call.args[0] for call in self.subprocess_run.call_args_list if call.args[0][0] == settings.HLS_FFMPEG]
+
+    def test_variants_for_short_uploads(self):
+        self.assertEqual([name for name, *_ in hls_variants(1080)], ["360p", "540p", "720p"])
+        self.assertEqual([name for name, *_ in hls_variants(540)], ["360p", "540p"])
+        # Below the lowest variant the upload's own even height is kept
+        self.assertEqual(hls_variants(240), [("360p", 240, 800, 96)])
+        self.assertEqual(hls_variants(239), [("360p", 238, 800, 96)])
+
+    def test_master_playlist_is_saved_last(self):
+        self.height = 540
+
+        created = segment_video(self.video.storage, self.video.name)
+
+        directory = hls_directory(self.video.name)
+        self.assertEqual(created[-1], f"{directory}/{HLS_MASTER}")
+        self.assertEqual(
+            sorted(created[:-1]),
+            [
+                f"{directory}/{variant}/{filename}"
+                for variant in ("360p", "540p")
+                for filename in ("index.m3u8", "segment-000.ts")
+            ],
+        )
+        self.assertIn("v:0,a:0,name:360p v:1,a:1,name:540p", self.ffmpeg_calls()[0])
+
+    def test_player_falls_back_to_the_upload_until_packaged(self):
+        self.assertEqual(player_source(self.video), (self.video.url, "video/mp4"))
+
+        segment_video(self.video.storage, self.video.name)
+        master = f"{hls_directory(self.video.name)}/{HLS_MASTER}"
+        self.assertEqual(player_source(self.video), (self.video.storage.url(master), HLS_CONTENT_TYPE))
+
+        delete_hls(self.video.storage, self.video.name)
+        self.assertFalse(self.video.storage.exists(hls_directory(self.video.name)))
+        self.assertEqual(player_source(self.video), (self.video.url, "video/mp4"))
+
+    def test_segment_videos_skips_packaged_videos_unless_forced(self):
+        def segment_videos(*args):
+            stdout = StringIO()
+            call_command("segment_videos", *args, stdout=stdout)
+            return stdout.getvalue().splitlines()[-1]
+
+        self.assertEqual(segment_videos(), "1 packaged, 0 already packaged, 0 failed")
+        self.assertTrue(has_hls(self.video.storage, self.video.name))
+        self.assertEqual(segment_videos(), "0 packaged, 1 already packaged, 0 failed")
+        self.assertEqual(len(self.ffmpeg_calls()), 1)
+
+        self.assertEqual(segment_videos("--force"), "1 packaged, 0 already packaged, 0 failed")
+        self.assertEqual(len(self.ffmpeg_calls()), 2)
+
+
+# STUDENT LISTS
+class StudentListTests(LearnDataMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_list_changes_after_commit(self):
+        self.assertEqual(user_students(self.user), [self.student])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            other = Student.objects.create(user=self.user, first_name="Ben", grade=self.grade)
+            self.assertEqual(user_students(self.user), [self.student])
+
+        self.assertEqual(user_students(self.user), [self.student, other])
+
+
+# CACHE WARMUP
+class WarmCacheTests(QuizDataMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        ChapterQuiz.objects.filter(pk=self.quiz.pk).update(publish=True)
+
+    def warm_cache(self, *args):
+        stdout = StringIO()
+        call_command("warm_cache", *args, stdout=stdout)
+        return [line.split(":")[0] for line in stdout.getvalue().splitlines()]
+
+    def test_fills_the_caches_and_builds_missing_rollups(self):
+        other = Student.objects.create(user=self.user, first_name="Ben", grade=self.grade)
+        subject_progress(other, self.subject)
+
+        with mock.patch(
+            "learn.management.commands.warm_cache.build_subject_rollup", wraps=build_subject_rollup
+        ) as build:
+            self.assertEqual(self.warm_cache(), ["catalogs", "quizzes", "progress", "students"])
+
+        build.assert_called_once_with(self.student, self.subject)
+        self.assertTrue(StudentSubjectProgress.objects.filter(student=self.student, subject=self.subject).exists())
+        with self.assertNumQueries(0):
+            grade_catalog(self.grade.pk)
+            get_quiz_snapshot(self.quiz.pk)
+            user_students(self.user)
+
+    def test_only_warms_the_given_parts(self):
+        self.assertEqual(self.warm_cache("--only", "catalogs"), ["catalogs"])
+
+        with self.assertNumQueries(0):
+            grade_catalog(self.grade.pk)
+        with self.assertNumQueries(1):
+            user_students(self.user)
+        self.assertFalse(StudentSubjectProgress.objects.exists())
+
+
+# GRADE CATALOG
+class GradeCatalogTests(LearnDataMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_catalog_changes_after_commit(self):
+        self.assertEqual([s.number_of_chapters for s in grade_catalog(self.grade.pk)], [3])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Chapter.objects.create(topic=self.other_topic, name="Squares", number=4)
+            self.assertEqual([s.number_of_chapters for s in grade_catalog(self.grade.pk)], [3])
+
+        self.assertEqual([s.number_of_chapters for s in grade_catalog(self.grade.pk)], [4])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.topic.delete()
+        self.assertEqual([s.number_of_topics for s in grade_catalog(self.grade.pk)], [1])
@@ -0,0 +1,31 @@
+import uuid
+
+from django.core.cache import cache
+
+
+# VERSIONED CACHE ENTRIES
+# An entry lives under "<prefix>:<version>" next to a "<prefix>:version"
+# token. Bumping the token retires the entry without deleting it: readers
+# move to a new key and the old one expires on its own.
+def cache_version(prefix):
+    key = f"{prefix}:version"
+    version = cache.get(key)
+    if version is None:
+        # Unknown or evicted version: start a fresh one so no stale entry is read
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+def bump_cache_version(prefix):
+    cache.set(f"{prefix}:version", uuid.uuid4().hex, None)
+
+
+def versioned_cache(prefix, build, timeout):
+    # The current entry, made by build(version) when it is not cached
+    version = cache_version(prefix)
+    value = cache.get(f"{prefix}:{version}")
+    if value is None:
+        value = build(version)
+        cache.set(f"{prefix}:{version}", value, timeout)
+    return value
@@ -3,21 +3,25 @@ from django.shortcuts import redirect
 from .forms import StudentGradeFormSet, StudentProgressForm
 from .models import (
     Student,
-    Subject,
-    Topic,
     Chapter,
     StudentChapterCompletion,
     ChapterQuiz,
-    ChapterQuestion,
-    ChapterChoice,
     ChapterStudentResponse,
+    QuizAttempt,
     Quotes,
 )
+from .progress import subject_progress, topic_progress
+from .decorators import learn_path
+from .quiz import get_quiz_snapshot, chapter_quizzes
+from .grading import grade_submission
+from .catalog import grade_catalog
+from .hls import player_source
+from .students import STUDENT_LIST_TIMEOUT, user_students, user_students_version
 from django.contrib.auth.decorators import login_required
-from django.shortcuts import get_object_or_404
 from django.contrib import messages
-from django.utils.http import urlencode
-from django.urls import reverse
+from django.db import transaction
+from django.http import Http404
+from django.utils import timezone
 
 
 # Create your views here.
@@ -28,12 +32,13 @@ def index_learn(request):
 
 @login_required
 def user_dashboard(request):
-    student = Student.objects.filter(user=request.user)
-    number_of_students = student.count()
+    student = user_students(request.user)
 
     context = {
         "student": student,
-        "number_of_students": number_of_students,
+        "number_of_students": len(student),
+        "students_version": user_students_version(request.user.pk),
+        "students_cache_timeout": STUDENT_LIST_TIMEOUT,
     }
 
     return render(request, "main_user_dashboard.html", context=context)
@@ -56,9 +61,9 @@ def manage_grade(request):
 
 
 @login_required
-def student_dashboard(request, student_slug):
-    student = get_object_or_404(Student, student_slug=student_slug)
-    subjects = Subject.objects.filter(grade=student.grade)
+@learn_path
+def student_dashboard(request, student):
+    subjects = grade_catalog(student.grade_id)
 
     content = {
         "student": student,
@@ -69,145 +74,27 @@ def student_dashboard(request, student_slug):
 
 
 @login_required
-def subject_dashboard(request, subject_slug, student_slug):
-    student = get_object_or_404(Student, student_slug=student_slug)
-    subject = get_object_or_404(Subject, subject_slug=subject_slug, grade=student.grade)
-    topics = Topic.objects.filter(subject=subject)
-    number_of_topics = topics.count()
-
-    topic_data = []
-    fully_completed_topics = 0
-    for topic in topics:
-        chapters = Chapter.objects.filter(topic=topic)
-        completed_chapters = StudentChapterCompletion.objects.filter(
-            student=student, chapter__in=chapters, completed=True
-        ).values_list("chapter__id", flat=True)
-        num_completed_chapters = completed_chapters.count()
-        num_total_chapters = chapters.count()
-
-        if num_total_chapters > 0:
-            completion_percentage = round(
-                (num_completed_chapters / num_total_chapters) * 100
-            )
-        else:
-            completion_percentage = 0
-
-        topic_data.append(
-            {
-                "topic": topic,
-                "num_completed_chapters": num_completed_chapters,
-                "num_total_chapters": num_total_chapters,
-                "completion_percentage": completion_percentage,
-            }
-        )
-
-        if completion_percentage == 100:
-            fully_completed_topics += 1
-
-        subject_completion_percentage = round(
-            (fully_completed_topics / number_of_topics) * 100
-        )
-
+@learn_path
+def subject_dashboard(request, student, subject):
     context = {
         "student": student,
         "subject": subject,
-        "topics": topics,
-        "topic_data": topic_data,
-        "number_of_topics": number_of_topics,
-        "fully_completed_topics": fully_completed_topics,
-        "subject_completion_percentage": subject_completion_percentage,
+        **subject_progress(student, subject),
     }
 
     return render(request, "student/subject/dashboard.html", context)
 
 
-def subject_details(request, subject_slug, student_slug, topic_slug):
-    student = get_object_or_404(Student, student_slug=student_slug)
-    subject = get_object_or_404(Subject, subject_slug=subject_slug, grade=student.grade)
-    topics = Topic.objects.filter(subject=subject)
-
-    number_of_topics = topics.count()
-
-    specific_topic = Topic.objects.get(topic_slug=topic_slug)
-    chapters_for_topic = specific_topic.objects.filter(topic=specific_topic)
-
-    content = {
-        "subject": subject,
-        "topics": topics,
-        "student": student,
-        "number_of_topics": number_of_topics,
-        "chapters_for_topic": chapters_for_topic,
-    }
-
-    return render(request, "student/subject/details.html", content)
-
-
-def dashboard_subject_details(request, subject_slug, student_slug, topic_slug):
-    student = get_object_or_404(Student, student_slug=student_slug)
-    subject = get_object_or_404(Subject, subject_slug=subject_slug, grade=student.grade)
-    topics = Topic.objects.filter(subject=subject)
-
-    number_of_topics = topics.count()
-
-    topic = Topic.objects.get(topic_slug=topic_slug)
-    chapters = Chapter.objects.filter(topic=topic)
-
-    completed_chapters = StudentChapterCompletion.objects.filter(
-        student=student, chapter__in=chapters, completed=True
-    ).values_list("chapter__id", flat=True)
-
-    content = {
-        "subject": subject,
-        "topics": topics,
-        "student": student,
-        "number_of_topics": number_of_topics,
-    }
-
-    return render(request, "student/include/subject_details.html", content)
-
-
 # TOPIC VIEWS
-def topic_dashboard(request, student_slug, subject_slug, topic_slug):
-    student = Student.objects.get(student_slug=student_slug)
-    subject = Subject.objects.get(subject_slug=subject_slug)
-    topic = Topic.objects.get(topic_slug=topic_slug)
-    chapters = Chapter.objects.filter(topic=topic)
-    chapter_order = chapters.order_by("number")
-
-    number_of_chapters = chapters.count()
-
-    completed_chapters = StudentChapterCompletion.objects.filter(
-        student=student, chapter__in=chapters, completed=True
-    ).values_list("chapter__id", flat=True)
-
-    completed_chapter_ids = StudentChapterCompletion.objects.filter(
-        student=student, chapter__topic=topic, completed=True
-    ).values_list("chapter__id", flat=True)
-
-    chapter_completion = {
-        chapter.id: chapter.id in completed_chapter_ids for chapter in chapters
-    }
-
-    number_of_completed_chapters = completed_chapters.count()
-
-    if number_of_chapters > 0:
-        completion_percentage = round(
-            (number_of_completed_chapters / number_of_chapters) * 100
-        )
-    else:
-        completion_percentage = 0
-
+@login_required
+@learn_path
+def topic_dashboard(request, student, subject, topic):
     context = {
         "student": student,
         "subject": subject,
         "topic": topic,
-        "chapters": chapters,
-        "subject_slug": subject_slug,
-        "chapter_order": chapter_order,
-        "number_of_chapters": number_of_chapters,
-        "number_of_completed_chapters": number_of_completed_chapters,
-        "completion_percentage": completion_percentage,
-        "chapter_completion": chapter_completion,
+        "subject_slug": subject.subject_slug,
+        **topic_progress(student, topic),
     }
 
     return render(request, "student/topic/dashboard.html", context)
@@ -215,30 +102,25 @@ def topic_dashboard(request, student_slug, subject_slug, topic_slug):
 
 # CHAPTER VIEWS
 @login_required
-def chapter_dashboard(request, student_slug, subject_slug, topic_slug, chapter_slug):
-    student = Student.objects.get(student_slug=student_slug)
-    subject = Subject.objects.filter(subject_slug=subject_slug)
-    topic = Topic.objects.get(topic_slug=topic_slug)
+@learn_path
+def chapter_dashboard(request, student, subject, topic, chapter):
     chapters = Chapter.objects.filter(topic=topic)
 
-    single_subject = subject.get(subject_slug=subject_slug)
-    single_chapter = chapters.get(chapter_slug=chapter_slug)
-
     chapter_status, created = StudentChapterCompletion.objects.get_or_create(
-        student=student, chapter=single_chapter
+        student=student, chapter=chapter
     )
 
-    quizzes = ChapterQuiz.objects.filter(chapter=single_chapter)
+    quizzes = ChapterQuiz.objects.filter(chapter=chapter)
 
     context = {
         "student": student,
         "subject": subject,
         "topic": topic,
         "chapters": chapters,
-        "subject_slug": subject_slug,
-        "chapter_slug": chapter_slug,
-        "single_subject": single_subject,
-        "single_chapter": single_chapter,
+        "subject_slug": subject.subject_slug,
+        "chapter_slug": chapter.chapter_slug,
+        "single_subject": subject,
+        "single_chapter": chapter,
         "chapter_status": chapter_status,
         "quizzes": quizzes,
     }
@@ -246,24 +128,15 @@ def chapter_dashboard(request, student_slug, subject_slug, topic_slug, chapter_s
 
 
 @login_required
-def chapter_content(request, student_slug, subject_slug, topic_slug, chapter_slug):
-    student = Student.objects.get(student_slug=student_slug)
-    subject = Subject.objects.filter(subject_slug=subject_slug)
-    topic = Topic.objects.get(topic_slug=topic_slug)
+@learn_path
+def chapter_content(request, student, subject, topic, chapter):
     chapters = Chapter.objects.filter(topic=topic)
 
-    single_subject = subject.get(subject_slug=subject_slug)
-    single_chapter = chapters.get(chapter_slug=chapter_slug)
-
-    next_chapter = (
-        chapters.filter(number__gt=single_chapter.number).order_by("number").first()
-    )
-    prev_chapter = (
-        chapters.filter(number__lt=single_chapter.number).order_by("number").last()
-    )
+    next_chapter = chapters.filter(number__gt=chapter.number).order_by("number").first()
+    prev_chapter = chapters.filter(number__lt=chapter.number).order_by("number").last()
 
     chapter_status, created = StudentChapterCompletion.objects.get_or_create(
-        student=student, chapter=single_chapter
+        student=student, chapter=chapter
     )
 
     if request.method == "POST":
@@ -272,79 +145,66 @@ def chapter_content(request, student_slug, subject_slug, topic_slug, chapter_slu
             form.save()
             return redirect(
                 "chapter_dashboard",
-                student_slug,
-                subject_slug,
-                topic_slug,
-                chapter_slug,
+                student.student_slug,
+                subject.subject_slug,
+                topic.topic_slug,
+                chapter.chapter_slug,
             )
     else:
         form = StudentProgressForm(instance=chapter_status)
 
-    quizzes = ChapterQuiz.objects.filter(chapter=single_chapter)
+    quizzes = ChapterQuiz.objects.filter(chapter=chapter)
+
+    video_url, video_type = player_source(chapter.video) if chapter.video else (None, None)
 
     context = {
         "student": student,
         "subject": subject,
         "topic": topic,
         "chapters": chapters,
-        "subject_slug": subject_slug,
-        "chapter_slug": chapter_slug,
+        "subject_slug": subject.subject_slug,
+        "chapter_slug": chapter.chapter_slug,
         "next_chapter": next_chapter,
         "prev_chapter": prev_chapter,
-        "single_subject": single_subject,
-        "single_chapter": single_chapter,
+        "single_subject": subject,
+        "single_chapter": chapter,
         "chapter_completion_form": form,
         "chapter_status": chapter_status,
         "quizzes": quizzes,
+        "video_url": video_url,
+        "video_type": video_type,
     }
     return render(request, "student/chapter/content/content.html", context)
 
 
 # CHAPTER QUIZ VIEWS
-@login_required(login_url="login")
-def chapter_quiz_overview(
-    request, student_slug, subject_slug, topic_slug, chapter_slug, quiz_slug
-):
-    student = get_object_or_404(Student, student_slug=student_slug)
-    subject = get_object_or_404(Subject, subject_slug=subject_slug)
-    topic = get_object_or_404(Topic, topic_slug=topic_slug, subject=subject)
-    chapter = get_object_or_404(Chapter, chapter_slug=chapter_slug, topic=topic)
-    quiz = get_object_or_404(ChapterQuiz, quiz_slug=quiz_slug, chapter=chapter)
-    questions = ChapterQuestion.objects.filter(quiz=quiz)
-    responses = ChapterStudentResponse.objects.filter(quiz=quiz, student=student)
-    quizzes = ChapterQuiz.objects.filter(chapter=chapter)
+def start_quiz_timer(request, quiz):
+    request.session[f"quiz_{quiz.id}_started"] = timezone.now().timestamp()
 
-    time_min = round(quiz.duration / 60)
 
-    quiz_submitted = ChapterStudentResponse.objects.filter(
-        student=student, quiz=quiz
-    ).exists()
+def stop_quiz_timer(request, quiz):
+    started = request.session.pop(f"quiz_{quiz.id}_started", None)
+    if started is None:
+        return None
+    return max(round(timezone.now().timestamp() - started), 0)
 
-    correct_choices = 0
-    incorrect_choices = 0
-    selected_choices = {}
-    correct_questions = []
-    incorrect_questions = []
 
-    for response in responses:
-        question = response.question
-        selected_choice = response.choice
-        selected_choices[question] = selected_choice
+def latest_quiz_attempt(student, quiz):
+    return (
+        QuizAttempt.objects.filter(student=student, quiz=quiz)
+        .order_by("-date_submitted", "-id")
+        .first()
+    )
 
-        if selected_choice.is_correct:
-            correct_choices += 1
-            correct_questions.append(question)
-        else:
-            incorrect_choices += 1
-            incorrect_questions.append(question)
 
-    if len(questions) == 0:
-        percentage = 0
-    else:
-        percentage = round((correct_choices / len(questions)) * 100)
+@login_required(login_url="login")
+@learn_path
+def chapter_quiz_overview(request, student, subject, topic, chapter, quiz):
+    questions = get_quiz_snapshot(quiz).questions
+    quizzes = chapter_quizzes(chapter)
+    attempt = latest_quiz_attempt(student, quiz)
 
-    number_correct = len(correct_questions)
-    number_incorrect = len(incorrect_questions)
+    time_min = round(quiz.duration / 60)
 
     context = {
         "student": student,
@@ -354,36 +214,26 @@ def chapter_quiz_overview(
         "quizzes": quizzes,
         "quiz": quiz,
         "questions": questions,
-        "selected_choices": selected_choices,
-        "correct_choices": correct_choices,
-        "incorrect_choices": incorrect_choices,
-        "number_correct": number_correct,
-        "number_incorrect": number_incorrect,
-        "percentage": percentage,
-        "quiz_submitted": quiz_submitted,
+        "attempt": attempt,
+        "correct_choices": attempt.correct_answers if attempt else 0,
+        "incorrect_choices": attempt.incorrect_answers if attempt else 0,
+        "number_correct": attempt.correct_answers if attempt else 0,
+        "number_incorrect": attempt.incorrect_answers if attempt else 0,
+        "percentage": attempt.percentage if attempt else 0,
+        "quiz_submitted": attempt is not None,
         "time_min": time_min,
     }
     return render(request, "student/chapter/quizzes/dashboard.html", context)
 
 
 @login_required(login_url="login")
-def chapter_quiz_content(
-    request,
-    student_slug,
-    subject_slug,
-    topic_slug,
-    chapter_slug,
-    quiz_slug,
-):
-    student = get_object_or_404(Student, student_slug=student_slug)
-    subject = get_object_or_404(Subject, subject_slug=subject_slug)
-    topic = get_object_or_404(Topic, topic_slug=topic_slug, subject=subject)
-    chapter = get_object_or_404(Chapter, chapter_slug=chapter_slug, topic=topic)
+@learn_path
+def chapter_quiz_content(request, student, subject, topic, chapter, quiz):
+    quizzes = chapter_quizzes(chapter)
 
-    quizzes = ChapterQuiz.objects.filter(chapter=chapter)
-    quiz = get_object_or_404(ChapterQuiz, quiz_slug=quiz_slug, chapter=chapter)
+    questions = get_quiz_snapshot(quiz).questions
 
-    questions = ChapterQuestion.objects.filter(quiz=quiz)
+    start_quiz_timer(request, quiz)
 
     context = {
         "student": student,
@@ -398,26 +248,16 @@ def chapter_quiz_content(
 
 
 @login_required(login_url="login")
-def chapter_quiz_questions(
-    request,
-    student_slug,
-    subject_slug,
-    topic_slug,
-    chapter_slug,
-    quiz_slug,
-    question_id,
-):
-    student = get_object_or_404(Student, student_slug=student_slug)
-    subject = get_object_or_404(Subject, subject_slug=subject_slug)
-    topic = get_object_or_404(Topic, topic_slug=topic_slug, subject=subject)
-    chapter = get_object_or_404(Chapter, chapter_slug=chapter_slug, topic=topic)
-
-    quizzes = ChapterQuiz.objects.filter(chapter=chapter)
-    quiz = get_object_or_404(ChapterQuiz, quiz_slug=quiz_slug, chapter=chapter)
+@learn_path
+def chapter_quiz_questions(request, student, subject, topic, chapter, quiz, question_id):
+    quizzes = chapter_quizzes(chapter)
 
-    questions = ChapterQuestion.objects.filter(quiz=quiz)
+    questions = get_quiz_snapshot(quiz).questions
 
-    question = ChapterQuestion.objects.get(id=question_id)
+    # Only a question of the quiz in the URL
+    question = next((question for question in questions if str(question.id) == str(question_id)), None)
+    if question is None:
+        raise Http404("No question matches the given query.")
 
     context = {
         "student": student,
@@ -434,53 +274,59 @@ def chapter_quiz_questions(
 
 
 @login_required(login_url="login")
-def chapter_quiz_submit(
-    request, student_slug, subject_slug, topic_slug, chapter_slug, quiz_slug
-):
-    student = get_object_or_404(Student, student_slug=student_slug)
-    subject = get_object_or_404(Subject, subject_slug=subject_slug)
-    topic = get_object_or_404(Topic, topic_slug=topic_slug, subject=subject)
-    chapter = get_object_or_404(Chapter, chapter_slug=chapter_slug, topic=topic)
-    quiz = get_object_or_404(ChapterQuiz, quiz_slug=quiz_slug)
-    questions = ChapterQuestion.objects.filter(quiz=quiz)
+@learn_path
+def chapter_quiz_submit(request, student, subject, topic, chapter, quiz):
+    snapshot = get_quiz_snapshot(quiz)
+    questions = snapshot.questions
 
     if request.method == "POST":
-        # Delete previous responses for this student and quiz
-        ChapterStudentResponse.objects.filter(student=student, quiz=quiz).delete()
-
-        # Process the form data
-        score = 0
-        total_questions = len(questions)
-        unanswered_questions = []
+        answers = {}
+        responses = []
 
+        # Process the form data; the snapshot only holds this quiz's choices
         for question in questions:
             answer_id = request.POST.get(str(question.id))
-            if answer_id:
-                # Check if the answer is correct
-                choice = get_object_or_404(ChapterChoice, id=answer_id)
-                ChapterStudentResponse.objects.create(
+            if not answer_id:
+                # Unanswered question
+                continue
+
+            choice = snapshot.choices.get(int(answer_id)) if answer_id.isdigit() else None
+            if choice is None or choice.question_id != question.id:
+                raise Http404("Invalid choice")
+
+            answers[question.id] = choice.id
+            responses.append(
+                ChapterStudentResponse(
                     student=student,
-                    question=question,
+                    question_id=question.id,
                     quiz=quiz,
-                    choice=choice,
+                    choice_id=choice.id,
                 )
-                if choice.is_correct:
-                    score += 1
-            else:
-                # Unanswered question
-                unanswered_questions.append(question)
+            )
 
-        # Calculate the percentage score
-        percentage_score = round((score / total_questions) * 100)
+        result = grade_submission(snapshot, answers)
+
+        # Replace previous responses for this student and quiz in one transaction
+        with transaction.atomic():
+            ChapterStudentResponse.objects.filter(student=student, quiz=quiz).delete()
+            ChapterStudentResponse.objects.bulk_create(responses)
+            QuizAttempt.objects.create(
+                student=student,
+                quiz=quiz,
+                duration=stop_quiz_timer(request, quiz),
+                **result.as_attempt_fields(),
+            )
+
+        return redirect(
+            "chapter_quiz_results",
+            student.student_slug,
+            subject.subject_slug,
+            topic.topic_slug,
+            chapter.chapter_slug,
+            quiz.quiz_slug,
+        )
 
-        query_params = {
-            "score": score,
-            "total_questions": total_questions,
-            "unanswered_questions": ",".join([str(q.id) for q in unanswered_questions]),
-            "percentage_score": percentage_score,
-        }
-        redirect_url = f"{reverse('chapter_quiz_results', args=[student_slug, subject_slug, topic_slug, chapter_slug, quiz_slug])}?{urlencode(query_params)}"
-        return redirect(redirect_url)
+    start_quiz_timer(request, quiz)
 
     context = {
         "student": student,
@@ -494,55 +340,43 @@ def chapter_quiz_submit(
 
 
 @login_required(login_url="login")
-def chapter_quiz_results(
-    request, student_slug, subject_slug, topic_slug, chapter_slug, quiz_slug
-):
-    student = get_object_or_404(Student, student_slug=student_slug)
-    subject = get_object_or_404(Subject, subject_slug=subject_slug)
-    topic = get_object_or_404(Topic, topic_slug=topic_slug, subject=subject)
-    chapter = get_object_or_404(Chapter, chapter_slug=chapter_slug, topic=topic)
-    quiz = get_object_or_404(ChapterQuiz, quiz_slug=quiz_slug, chapter=chapter)
-    questions = ChapterQuestion.objects.filter(quiz=quiz)
+@learn_path
+def chapter_quiz_results(request, student, subject, topic, chapter, quiz):
+    questions = get_quiz_snapshot(quiz).questions
     responses = ChapterStudentResponse.objects.filter(quiz=quiz, student=student)
-    quizzes = ChapterQuiz.objects.filter(chapter=chapter)
+    quizzes = chapter_quizzes(chapter)
+    attempt = latest_quiz_attempt(student, quiz)
+
+    answered_choice_ids = dict(responses.values_list("question_id", "choice_id"))
 
-    correct_choices = 0
-    incorrect_choices = 0
     selected_choices = {}
     correct_questions = []
     incorrect_questions = []
+    unanswered_questions = []
 
-    for response in responses:
-        question = response.question
-        selected_choice = response.choice
-        selected_choices[question] = selected_choice
+    for question in questions:
+        choice_id = answered_choice_ids.get(question.id)
+        selected_choice = next(
+            (choice for choice in question.choices if choice.id == choice_id), None
+        )
+
+        if selected_choice is None:
+            unanswered_questions.append(question)
+            continue
 
+        selected_choices[question] = selected_choice
         if selected_choice.is_correct:
-            correct_choices += 1
             correct_questions.append(question)
         else:
-            incorrect_choices += 1
             incorrect_questions.append(question)
 
-    number_unanswered_questions = len(questions) - len(responses)
-
-    unanswered_questions = []
-    answered_question_ids = [response.question.id for response in responses]
-    for question in questions.exclude(id__in=answered_question_ids):
-        choices = list(
-            question.choices.values("id", "choice_text", "is_correct", "explanation")
-        )
-        unanswered_questions.append(
-            {"question_text": question.question_text, "choices": choices}
-        )
-
-    if len(questions) == 0:
-        percentage = 0
-    else:
-        percentage = round((correct_choices / len(questions)) * 100)
-
     number_correct = len(correct_questions)
     number_incorrect = len(incorrect_questions)
+    number_unanswered_questions = len(unanswered_questions)
+
+    correct_choices = attempt.correct_answers if attempt else number_correct
+    incorrect_choices = attempt.incorrect_answers if attempt else number_incorrect
+    percentage = attempt.percentage if attempt else 0
 
     if percentage >= 100:
         color = "#05A000"